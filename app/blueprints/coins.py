@@ -0,0 +1,51 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from app.database.manager import db_manager
+from app.database.query import CoinRepository
+from app.sevice import CoinService
+from app.config import settings
+
+router = APIRouter(tags=["coins"])
+
+
+def get_db_session():
+    """依赖注入：获取只读数据库会话"""
+    db = db_manager.get_read_session()
+    try:
+        yield db
+    finally:
+        db_manager.close_session(db)
+
+
+def get_coin_service(db: Session = Depends(get_db_session)):
+    """依赖注入：获取币种服务"""
+    return CoinService(CoinRepository(db))
+
+
+# 需在 /coins/{coin_id} 之前注册
+@router.get("/coins/search")
+def search_coins(
+    q: str = Query(..., min_length=1, description="symbol / 名称 / 交易对"),
+    limit: int = Query(settings.COIN_SEARCH_DEFAULT_LIMIT, ge=1, le=settings.COIN_SEARCH_MAX_LIMIT),
+    service: CoinService = Depends(get_coin_service),
+):
+    """全文搜索币种，按相关度与市值排序"""
+    return [coin.model_dump() for coin in service.search_coins(q, limit)]
+
+
+@router.get("/coins/{coin_id}")
+def get_coin(coin_id: str, service: CoinService = Depends(get_coin_service)):
+    """根据ID获取币种"""
+    coin = service.get_coin_by_id(coin_id)
+    if coin is None:
+        raise HTTPException(status_code=404, detail="Coin not found")
+    return coin.model_dump()
+
+
+@router.get("/exchange_spots/{exchange_spot_id}")
+def get_exchange_spot(exchange_spot_id: int, service: CoinService = Depends(get_coin_service)):
+    """根据ID获取现货交易对及所属币种"""
+    exchange_spot = service.get_exchange_spot(exchange_spot_id)
+    if exchange_spot is None:
+        raise HTTPException(status_code=404, detail="Exchange spot not found")
+    return {**exchange_spot.model_dump(), "coin": exchange_spot.coin.model_dump() if exchange_spot.coin else None}
@@ -0,0 +1,20 @@
+from fastapi import APIRouter, Query
+from app.search_index import search_index
+from app.config import settings
+
+router = APIRouter(prefix="/quick_search", tags=["quick_search"])
+
+
+@router.get("")
+async def quick_search(
+    q: str = Query(..., min_length=1, description="symbol / 名称 / 合约地址 / 交易对前缀"),
+    limit: int = Query(settings.QUICK_SEARCH_DEFAULT_LIMIT, ge=1, le=settings.QUICK_SEARCH_MAX_LIMIT),
+):
+    """前缀自动补全，按市值排序，symbol 完全匹配的排在最前"""
+    return [entry._asdict() for entry in search_index.search(q, limit)]
+
+
+@router.get("/stats")
+async def quick_search_stats():
+    """索引规模统计"""
+    return search_index.stats()
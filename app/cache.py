@@ -0,0 +1,169 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Hashable, Iterable, NamedTuple, Optional, Set
+from app.config import settings
+import datetime
+import sys
+import time
+
+
+@dataclass
+class CacheMetrics:
+    """缓存命中与淘汰统计"""
+    hits: int = 0
+    misses: int = 0
+    expirations: int = 0
+    evictions: int = 0
+    invalidations: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hit_rate, 4),
+            "expirations": self.expirations,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+class _Entry(NamedTuple):
+    value: Any
+    expires_at: float
+    size: int
+    tags: frozenset
+
+
+def estimate_size(value: Any) -> int:
+    """估算缓存值占用的字节数（元组按元素浅层累加）"""
+    size = sys.getsizeof(value)
+    if isinstance(value, tuple):
+        size += sum(sys.getsizeof(item) for item in value)
+    return size
+
+
+class TTLCache:
+    """
+    进程内 TTL + LRU 缓存
+
+    - 每个键可单独指定 TTL，过期在读取时惰性清理
+    - 超过条目数或内存上限时按 LRU 淘汰
+    - 键可附带标签，写入方按标签批量失效
+    只在事件循环线程中使用，不加锁
+    """
+
+    def __init__(self, maxsize: int, max_bytes: int, default_ttl: float):
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self.metrics = CacheMetrics()
+        self._data: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._tags: Dict[str, Set[Hashable]] = {}
+        self._bytes = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self._data.get(key)
+        if entry is None:
+            self.metrics.misses += 1
+            return None
+        if entry.expires_at <= time.monotonic():
+            self._remove(key)
+            self.metrics.expirations += 1
+            self.metrics.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.metrics.hits += 1
+        return entry.value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None, tags: Iterable[str] = ()):
+        if key in self._data:
+            self._remove(key)
+        entry = _Entry(
+            value=value,
+            expires_at=time.monotonic() + (self.default_ttl if ttl is None else ttl),
+            size=estimate_size(value),
+            tags=frozenset(tags),
+        )
+        self._data[key] = entry
+        self._bytes += entry.size
+        for tag in entry.tags:
+            self._tags.setdefault(tag, set()).add(key)
+        while self._data and (len(self._data) > self.maxsize or self._bytes > self.max_bytes):
+            self._remove(next(iter(self._data)))
+            self.metrics.evictions += 1
+
+    def delete(self, key: Hashable):
+        if key in self._data:
+            self._remove(key)
+            self.metrics.invalidations += 1
+
+    def invalidate_tags(self, tags: Iterable[str]) -> int:
+        """失效带有任一标签的键，返回失效的条目数"""
+        removed = 0
+        for tag in tags:
+            for key in self._tags.pop(tag, set()):
+                if key in self._data:
+                    self._remove(key)
+                    removed += 1
+        self.metrics.invalidations += removed
+        return removed
+
+    def clear(self):
+        self._data.clear()
+        self._tags.clear()
+        self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {"entries": len(self._data), "bytes": self._bytes, **self.metrics.as_dict()}
+
+    def _remove(self, key: Hashable):
+        entry = self._data.pop(key)
+        self._bytes -= entry.size
+        for tag in entry.tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def __len__(self):
+        return len(self._data)
+
+
+# ---------------------------
+# 价格缓存
+# ---------------------------
+class CachedPrice(NamedTuple):
+    """缓存的价格，只保存标量而不是 ORM 对象"""
+    coin_id: str
+    price: Optional[float]
+    updated_at: datetime.datetime
+
+
+price_cache = TTLCache(
+    maxsize=settings.PRICE_CACHE_MAX_ENTRIES,
+    max_bytes=settings.PRICE_CACHE_MAX_BYTES,
+    default_ttl=settings.PRICE_CACHE_TTL_SECONDS,
+)
+
+
+def price_cache_key(coin_id: Optional[str], contract_address: Optional[str]) -> str:
+    return f"price:{coin_id}:{contract_address}"
+
+
+def contract_price_cache_key(chain_name: str, contract_address: str) -> str:
+    return f"price:contract:{chain_name}:{contract_address}"
+
+
+def coin_price_tag(coin_id: str) -> str:
+    return f"coin:{coin_id}"
+
+
+def invalidate_coin_prices(coin_ids: Iterable[str]) -> int:
+    """价格写入后调用，失效这些币种的全部价格缓存"""
+    return price_cache.invalidate_tags(coin_price_tag(coin_id) for coin_id in coin_ids)
@@ -1,12 +1,16 @@
 from app.crawlers.core import BaseCrawler
 from arkm import AsyncArkmClient, SyncArkmClient
 from app.config import settings
+import asyncio
 import logging
 
 logger = logging.getLogger(__name__)
 
 class ArkmCrawler(BaseCrawler):
+    provider = "arkm"
+
     def __init__(self):
+        super().__init__()
         self.arkm_async_client = AsyncArkmClient(cookie=settings.COOKIE)
         self.arkm_sync_client = SyncArkmClient(cookie=settings.COOKIE)
 
@@ -15,9 +19,10 @@ class ArkmCrawler(BaseCrawler):
         path = f"/token/holders/{token_id}?groupByEntity=true"
         try:
             if use_sync:
-                response = self.arkm_sync_client.get(path=path)
+                # 同步客户端在线程中执行，避免阻塞事件循环
+                response = await self._request(asyncio.to_thread, self.arkm_sync_client.get, path=path)
             else:
-                response = await self.arkm_async_client.get(path=path)
+                response = await self._request(self.arkm_async_client.get, path=path)
             return response
         except Exception as e:
             logger.error(f"Error fetching token holders for {token_id}: {e}")
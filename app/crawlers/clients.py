@@ -0,0 +1,62 @@
+from typing import Dict, Optional
+from app.crawlers.coingecko import CoingeckoCrawler
+from app.crawlers.coinmarketcap import CoinMarketCapCrawler
+from app.crawlers.arkm import ArkmCrawler
+import ccxt.pro as ccxt
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# 价格同步使用的 ccxt 交易所
+CCXT_EXCHANGES = ['okx', 'binance', 'coinbase', 'bybit', 'gateio', 'kucoin']
+
+
+class CrawlerClients:
+    """
+    进程级共享的爬虫与 ccxt 客户端
+
+    SDK 客户端只在进程内创建一次，所有 DataProcessor 复用；
+    ccxt 交易所对象在第一次访问时才创建
+    """
+
+    def __init__(self):
+        self.cg_crawler = CoingeckoCrawler()
+        self.cmc_crawler = CoinMarketCapCrawler()
+        self.arkm_crawler = ArkmCrawler()
+        self._ccxt_clients: Optional[Dict[str, ccxt.Exchange]] = None
+
+    @property
+    def ccxt_clients(self) -> Dict[str, ccxt.Exchange]:
+        if self._ccxt_clients is None:
+            # 判断操作系统是否为Windows，Windows下需要设置代理，否则会报错
+            ccxt_config = {}
+            if os.name == 'nt':
+                ccxt_config = {'https_proxy': 'http://127.0.0.1:7890'}
+            self._ccxt_clients = {
+                exchange: getattr(ccxt, exchange)(ccxt_config) for exchange in CCXT_EXCHANGES
+            }
+            logger.info(f"Created {len(self._ccxt_clients)} CCXT clients")
+        return self._ccxt_clients
+
+    async def close(self):
+        """关闭已创建的 ccxt 连接"""
+        if self._ccxt_clients is None:
+            return
+        for exchange_id, client in self._ccxt_clients.items():
+            try:
+                await client.close()
+            except Exception as e:
+                logger.error(f"Failed to close CCXT client {exchange_id}: {e}")
+        self._ccxt_clients = None
+
+
+_clients: Optional[CrawlerClients] = None
+
+
+def get_crawler_clients() -> CrawlerClients:
+    """获取进程级共享的客户端集合"""
+    global _clients
+    if _clients is None:
+        _clients = CrawlerClients()
+    return _clients
@@ -1,18 +1,32 @@
 from app.crawlers.core import BaseCrawler
 from coingecko_sdk import AsyncCoingecko
 from app.config import settings
+from typing import AsyncIterator
+import asyncio
 import logging
 
 logger = logging.getLogger(__name__)
 
+# /exchanges/{id}/tickers 每页固定返回100条
+TICKERS_PAGE_SIZE = 100
+
+
+class TickerPagesTruncated(Exception):
+    """交易对分页达到 CG_TICKER_MAX_PAGES 上限，已产出的数据不完整"""
+    pass
+
+
 class CoingeckoCrawler(BaseCrawler):
+    provider = "cg"
+
     def __init__(self):
+        super().__init__()
         self.cg = AsyncCoingecko(demo_api_key=settings.CG_API_KEY, environment='demo')
 
     async def fetch_coins_list(self):
         """获取币种列表"""
         try:
-            response = await self.cg.coins.list.get(include_platform=True)
+            response = await self._request(self.cg.coins.list.get, include_platform=True)
             return response
         except Exception as e:
             logger.error(f"Error fetching coins list: {e}")
@@ -21,38 +35,92 @@ class CoingeckoCrawler(BaseCrawler):
     async def fetch_markets_data(self, vs_currency: str = "usd", page: int = 1):
         """获取市场数据"""
         try:
-            response = await self.cg.coins.markets.get(vs_currency=vs_currency, page=page)
+            response = await self._request(self.cg.coins.markets.get, vs_currency=vs_currency, page=page)
             return response
         except Exception as e:
             logger.error(f"Error fetching markets data: {e}")
             return []
 
-    async def fetch_exchange_tickers(self, exchange_id: str):
+    async def fetch_exchange_tickers(self, exchange_id: str, page: int = 1):
         """获取交易所交易对"""
         try:
-            response = await self.cg.exchanges.tickers.get(id=exchange_id)
-            return response.tickers
+            return await self._fetch_exchange_tickers_page(exchange_id, page)
         except Exception as e:
             logger.error(f"Error fetching exchange tickers for {exchange_id}: {e}")
             return []
 
+    async def iter_exchange_tickers(
+        self,
+        exchange_id: str,
+        page_concurrency: int = None,
+        max_pages: int = None
+    ) -> AsyncIterator[list]:
+        """
+        分页获取交易所交易对（异步流）
+
+        每轮并发请求 page_concurrency 页，按完成顺序逐页产出；
+        某页不足一整页即视为最后一页。请求失败时异常直接抛出；
+        达到 max_pages 仍未取完时抛出 TickerPagesTruncated，由调用方判断该交易所数据是否完整
+        """
+        page_concurrency = page_concurrency or settings.CG_TICKER_PAGE_CONCURRENCY
+        max_pages = max_pages or settings.CG_TICKER_MAX_PAGES
+
+        next_page = 1
+        while next_page <= max_pages:
+            pages = range(next_page, min(next_page + page_concurrency, max_pages + 1))
+            tasks = [
+                asyncio.create_task(self._fetch_exchange_tickers_page(exchange_id, page))
+                for page in pages
+            ]
+            exhausted = False
+            try:
+                for task in asyncio.as_completed(tasks):
+                    tickers = await task
+                    if len(tickers) < TICKERS_PAGE_SIZE:
+                        exhausted = True
+                    if tickers:
+                        yield tickers
+            finally:
+                for task in tasks:
+                    if not task.done():
+                        task.cancel()
+            if exhausted:
+                return
+            next_page = pages[-1] + 1
+        raise TickerPagesTruncated(f"Reached max ticker pages ({max_pages}) for {exchange_id}")
+
+    async def _fetch_exchange_tickers_page(self, exchange_id: str, page: int):
+        response = await self._request(self.cg.exchanges.tickers.get, id=exchange_id, page=page)
+        return response.tickers or []
+
     async def fetch_derivatives_tickers(self, exchange_id: str):
         """获取衍生品交易所交易对"""
         try:
-            response = await self.cg.derivatives.exchanges.get_id(
-                id=exchange_id,
-                include_tickers='unexpired'
-            )
-            return response.tickers
+            return await self._fetch_derivatives_tickers(exchange_id)
         except Exception as e:
             logger.error(f"Error fetching derivatives tickers for {exchange_id}: {e}")
             return []
 
+    async def iter_derivatives_tickers(self, exchange_id: str) -> AsyncIterator[list]:
+        """获取衍生品交易所交易对（异步流，接口本身不分页，只产出一页）"""
+        tickers = await self._fetch_derivatives_tickers(exchange_id)
+        if tickers:
+            yield tickers
+
+    async def _fetch_derivatives_tickers(self, exchange_id: str):
+        response = await self._request(
+            self.cg.derivatives.exchanges.get_id,
+            id=exchange_id,
+            include_tickers='unexpired'
+        )
+        return response.tickers or []
+
     async def fetch_simple_price(self, ids: list[str]):
         """获取简单价格"""
         concat_with_dot = ','.join(ids)
         try:
-            response = await self.cg.simple.price.get(
+            response = await self._request(
+                self.cg.simple.price.get,
                 ids=concat_with_dot,
                 vs_currencies='usd'
             )
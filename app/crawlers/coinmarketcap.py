@@ -1,19 +1,55 @@
 from app.crawlers.core import BaseCrawler
 from coinmarketcapapi import CoinMarketCapAPI
+from concurrent.futures import ThreadPoolExecutor
 from app.config import settings
+import asyncio
 import logging
+import threading
 
 logger = logging.getLogger(__name__)
 
+# /v1/cryptocurrency/listings/latest 单次请求的 limit 上限
+CMC_MAX_PAGE_SIZE = 5000
+
+
 class CoinMarketCapCrawler(BaseCrawler):
+    provider = "cmc"
+
     def __init__(self):
-        self.cmc = CoinMarketCapAPI(api_key=settings.CMC_API_KEY)
-
-    def fetch_listings_latest(self, limit: int = 2000):
-        """获取最新上市列表"""
-        try:
-            response = self.cmc.cryptocurrency_listings_latest(limit=limit)
-            return response.data
-        except Exception as e:
-            logger.error(f"Error fetching CMC listings: {e}")
-            return []
+        super().__init__()
+        # CoinMarketCapAPI 基于同步 requests，调用放到专用线程池中执行，避免阻塞事件循环
+        self._executor = ThreadPoolExecutor(
+            max_workers=settings.CMC_FETCH_CONCURRENCY, thread_name_prefix="cmc-crawler"
+        )
+        # requests.Session 不保证线程安全，每个工作线程使用独立的客户端
+        self._local = threading.local()
+
+    def _client(self) -> CoinMarketCapAPI:
+        if not hasattr(self._local, "cmc"):
+            self._local.cmc = CoinMarketCapAPI(api_key=settings.CMC_API_KEY)
+        return self._local.cmc
+
+    def _listings_latest(self, start: int, limit: int):
+        return self._client().cryptocurrency_listings_latest(start=start, limit=limit).data
+
+    async def _fetch_listings_page(self, start: int, limit: int):
+        loop = asyncio.get_running_loop()
+        return await self._request(loop.run_in_executor, self._executor, self._listings_latest, start, limit)
+
+    async def fetch_listings_latest(self, limit: int = None, page_size: int = None):
+        """获取最新上市列表（按 start/limit 分页并发获取）"""
+        limit = limit or settings.CMC_LISTINGS_LIMIT
+        page_size = min(page_size or settings.CMC_LISTINGS_PAGE_SIZE, CMC_MAX_PAGE_SIZE)
+        starts = range(1, limit + 1, page_size)
+        pages = await asyncio.gather(
+            *(self._fetch_listings_page(start, min(page_size, limit - start + 1)) for start in starts),
+            return_exceptions=True
+        )
+
+        listings = []
+        for start, page in zip(starts, pages):
+            if isinstance(page, Exception):
+                logger.error(f"Error fetching CMC listings from {start}: {page}")
+                continue
+            listings.extend(page or [])
+        return listings
@@ -1,7 +1,219 @@
-from abc import ABC, abstractmethod
-from typing import List, Dict, Any
+from abc import ABC
+from typing import Any, Callable, Dict, Optional
+from app.config import settings
+import asyncio
+import inspect
+import logging
+import random
+import time
+
+logger = logging.getLogger(__name__)
+
+# 可重试的 HTTP 状态码
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+# CoinMarketCap 的分钟级/IP 限流错误码（日/月额度耗尽不重试）
+CMC_RETRYABLE_ERROR_CODES = {1008, 1011}
 
-class BaseCrawler(ABC):
-    """爬虫基类"""
 
+class CircuitOpenError(Exception):
+    """熔断器打开时直接拒绝请求"""
     pass
+
+
+class TokenBucket:
+    """
+    异步令牌桶
+
+    令牌不足时预占令牌（余额可为负）并按欠额计算等待时间，
+    临界区内没有 await，因此无需锁，也不绑定具体事件循环
+    """
+
+    def __init__(self, rate_per_minute: float, burst: int = 1):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated_at = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    async def acquire(self):
+        """获取一个令牌，必要时等待"""
+        self._refill()
+        self.tokens -= 1
+        if self.tokens < 0:
+            await asyncio.sleep(-self.tokens / self.rate)
+
+
+class CircuitBreaker:
+    """
+    熔断器
+
+    连续失败达到阈值后打开，reset_seconds 后进入半开状态，
+    只放行一个试探请求，成功则关闭，失败则重新打开
+    """
+
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_in_flight = False
+
+    @property
+    def is_open(self) -> bool:
+        return self.opened_at is not None
+
+    def allow(self) -> bool:
+        if self.opened_at is None:
+            return True
+        if time.monotonic() - self.opened_at < self.reset_seconds or self._trial_in_flight:
+            return False
+        # 半开：放行一个试探请求
+        self._trial_in_flight = True
+        return True
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        self._trial_in_flight = False
+        if self.failures >= self.failure_threshold:
+            if self.opened_at is None:
+                logger.warning(f"Circuit opened after {self.failures} consecutive failures")
+            self.opened_at = time.monotonic()
+
+    def release_trial(self):
+        """请求未得出结论（如被取消）时释放试探名额，不改变熔断状态"""
+        self._trial_in_flight = False
+
+
+# 同一服务商的所有爬虫实例共享限流器与熔断器
+_rate_limiters: Dict[str, TokenBucket] = {}
+_circuit_breakers: Dict[str, CircuitBreaker] = {}
+
+
+def get_rate_limiter(provider: str) -> TokenBucket:
+    """获取服务商的令牌桶，限速读取 Settings.<PROVIDER>_RATE_LIMIT_PER_MINUTE"""
+    if provider not in _rate_limiters:
+        _rate_limiters[provider] = TokenBucket(
+            rate_per_minute=getattr(settings, f"{provider.upper()}_RATE_LIMIT_PER_MINUTE"),
+            burst=settings.CRAWLER_RATE_LIMIT_BURST
+        )
+    return _rate_limiters[provider]
+
+
+def get_circuit_breaker(provider: str) -> CircuitBreaker:
+    """获取服务商的熔断器"""
+    if provider not in _circuit_breakers:
+        _circuit_breakers[provider] = CircuitBreaker(
+            failure_threshold=settings.CRAWLER_CIRCUIT_FAILURE_THRESHOLD,
+            reset_seconds=settings.CRAWLER_CIRCUIT_RESET_SECONDS
+        )
+    return _circuit_breakers[provider]
+
+
+def _status_code(exc: Exception) -> Optional[int]:
+    """从各 SDK 的异常中提取 HTTP 状态码"""
+    for attr in ("status_code", "status"):
+        value = getattr(exc, attr, None)
+        if isinstance(value, int):
+            return value
+    response = getattr(exc, "response", None)
+    value = getattr(response, "status_code", None)
+    return value if isinstance(value, int) else None
+
+
+def is_retryable(exc: Exception) -> bool:
+    """429/5xx、超时与连接错误可重试"""
+    status = _status_code(exc)
+    if status is not None:
+        return status in RETRYABLE_STATUS_CODES
+    # CoinMarketCapAPIError 把状态放在 rep.error_code 中
+    rep = getattr(exc, "rep", None)
+    if rep is not None:
+        return getattr(rep, "error_code", None) in CMC_RETRYABLE_ERROR_CODES
+    if isinstance(exc, (asyncio.TimeoutError, TimeoutError, ConnectionError, OSError)):
+        return True
+    return any("Timeout" in cls.__name__ or "Connection" in cls.__name__ for cls in type(exc).__mro__)
+
+
+def _retry_after(exc: Exception) -> Optional[float]:
+    """读取 Retry-After 响应头（秒）"""
+    headers = getattr(exc, "headers", None) or getattr(getattr(exc, "response", None), "headers", None)
+    if not headers:
+        return None
+    try:
+        return float(headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt: int, retry_after: Optional[float] = None) -> float:
+    """指数退避 + full jitter，优先遵守 Retry-After"""
+    cap = min(settings.CRAWLER_BACKOFF_MAX_SECONDS, settings.CRAWLER_BACKOFF_BASE_SECONDS * 2 ** (attempt - 1))
+    delay = random.uniform(0, cap)
+    if retry_after is not None:
+        delay = max(delay, min(retry_after, settings.CRAWLER_BACKOFF_MAX_SECONDS))
+    return delay
+
+
+class BaseCrawler(ABC):
+    """爬虫基类：所有请求统一经过限流、重试与熔断"""
+
+    # 服务商标识，对应 Settings 中的 <PROVIDER>_RATE_LIMIT_PER_MINUTE
+    provider: str = ""
+
+    def __init__(self):
+        self.rate_limiter = get_rate_limiter(self.provider)
+        self.circuit_breaker = get_circuit_breaker(self.provider)
+
+    async def _request(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        调用 SDK 方法（同步或异步均可）
+
+        可重试错误按指数退避重试 CRAWLER_MAX_RETRIES 次，
+        重试耗尽后计入熔断器并抛出原异常
+        """
+        # 只在第一次尝试前检查熔断器：半开状态下试探请求的重试不能被自己占用的试探名额拒绝
+        if not self.circuit_breaker.allow():
+            raise CircuitOpenError(f"Circuit open for provider {self.provider}")
+        settled = False
+        try:
+            attempt = 0
+            while True:
+                await self.rate_limiter.acquire()
+                try:
+                    result = func(*args, **kwargs)
+                    if inspect.isawaitable(result):
+                        result = await result
+                except Exception as e:
+                    if not is_retryable(e):
+                        # 非限流/服务端错误说明服务商可用，不计入熔断
+                        self.circuit_breaker.record_success()
+                        settled = True
+                        raise
+                    attempt += 1
+                    if attempt > settings.CRAWLER_MAX_RETRIES:
+                        self.circuit_breaker.record_failure()
+                        settled = True
+                        raise
+                    delay = backoff_delay(attempt, _retry_after(e))
+                    logger.warning(
+                        f"{self.provider} request failed ({e}), retry {attempt}/{settings.CRAWLER_MAX_RETRIES} "
+                        f"in {delay:.2f}s"
+                    )
+                    await asyncio.sleep(delay)
+                    continue
+                self.circuit_breaker.record_success()
+                settled = True
+                return result
+        finally:
+            # 取消等未计入熔断器的退出路径，释放可能占用的试探名额
+            if not settled:
+                self.circuit_breaker.release_trial()
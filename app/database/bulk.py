@@ -0,0 +1,77 @@
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+from app.config import settings
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+
+def chunked(items: Sequence[Any], chunk_size: Optional[int] = None) -> Iterable[Sequence[Any]]:
+    """按固定大小切分序列"""
+    chunk_size = chunk_size or settings.BULK_UPSERT_CHUNK_SIZE
+    for i in range(0, len(items), chunk_size):
+        yield items[i:i + chunk_size]
+
+
+def upsert_statement(
+    dialect_name: str,
+    model,
+    index_elements: Sequence[str],
+    update_fields: Optional[Sequence[str]] = None,
+):
+    """
+    按数据库方言生成 upsert 语句（不含 VALUES，行数据在执行时以参数列表传入）
+
+    - sqlite / postgresql：INSERT ... ON CONFLICT (index_elements) DO UPDATE / DO NOTHING
+    - mysql：INSERT ... ON DUPLICATE KEY UPDATE，冲突判断依赖表上的唯一索引，
+      不更新时把第一个唯一键字段赋值为自身以保持行不变
+    """
+    if dialect_name == "mysql":
+        stmt = mysql_insert(model)
+        fields = update_fields or index_elements[:1]
+        return stmt.on_duplicate_key_update({field: stmt.inserted[field] for field in fields})
+
+    if dialect_name == "sqlite":
+        stmt = sqlite_insert(model)
+    elif dialect_name == "postgresql":
+        stmt = postgresql_insert(model)
+    else:
+        raise ValueError(f"Bulk upsert is not supported for database dialect: {dialect_name}")
+
+    if update_fields:
+        return stmt.on_conflict_do_update(
+            index_elements=list(index_elements),
+            set_={field: stmt.excluded[field] for field in update_fields}
+        )
+    return stmt.on_conflict_do_nothing(index_elements=list(index_elements))
+
+
+def bulk_upsert(
+    session: Session,
+    model,
+    rows: List[Dict[str, Any]],
+    index_elements: Sequence[str],
+    update_fields: Optional[Sequence[str]] = None,
+    chunk_size: Optional[int] = None,
+    commit: bool = True,
+) -> int:
+    """
+    批量 upsert，语句按会话绑定的数据库方言生成（见 upsert_statement）
+
+    - rows 中每个字典的键必须一致
+    - 以参数列表执行（executemany），语句只编译一次，由驱动/方言按批次合并为多行 INSERT
+    - update_fields 为空时冲突行保持不变
+    - 直接对表（model.__table__）执行，绕过 ORM 批量插入：带 Python 默认值的模型在 ORM 下会退化为逐行执行
+    - commit=True 时每个 chunk 单独提交，避免长时间占用写锁
+    """
+    if not rows:
+        return 0
+
+    stmt = upsert_statement(session.get_bind().dialect.name, model.__table__, index_elements, update_fields)
+    written = 0
+    for chunk in chunked(rows, chunk_size):
+        session.execute(stmt, list(chunk))
+        written += len(chunk)
+        if commit:
+            session.commit()
+    return written
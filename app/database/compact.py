@@ -0,0 +1,93 @@
+"""
+一次性压缩 arkm_entities / labels 中的重复行
+
+用法（建议在服务停止时执行）：
+    python -m app.database.compact
+
+init_db 启动时也会对缺少唯一索引的表（旧版本建的库）执行一次压缩，
+驻留写入的 ON CONFLICT 依赖这些唯一索引
+"""
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+from app.database.interning import entity_interner, label_interner
+import logging
+
+logger = logging.getLogger(__name__)
+
+# (表名, 唯一键字段, 可为空的键字段, holders 外键字段, 唯一索引名)
+COMPACT_TARGETS = [
+    ("arkm_entities", ("name", "type"), "type", "entity_id", "uq_entity_name_type"),
+    ("labels", ("name", "chain_type"), "chain_type", "label_id", "uq_label_name_chain"),
+]
+
+
+def compact_table(engine: Engine, table: str, key_fields, nullable_field: str, holder_fk: str, index_name: str) -> int:
+    """
+    合并重复行：holders 外键指向每组最小 id，删除其余行并补建唯一索引
+
+    映射表使用普通表而非临时表：MySQL 不允许在一条语句中两次引用同一临时表（错误 1137）
+    """
+    keys = ", ".join(key_fields)
+    join_on = " AND ".join(f"t.{field} = k.{field}" for field in key_fields)
+    map_table = f"{table}_compact_map"
+
+    with engine.begin() as conn:
+        # 空值归一化为空字符串，保证唯一键可比较
+        conn.execute(text(f"UPDATE {table} SET {nullable_field} = '' WHERE {nullable_field} IS NULL"))
+        conn.execute(text(f"DROP TABLE IF EXISTS {map_table}"))
+        conn.execute(text(
+            f"CREATE TABLE {map_table} AS "
+            f"SELECT t.id AS old_id, k.keep_id AS keep_id FROM {table} t "
+            f"JOIN (SELECT {keys}, MIN(id) AS keep_id FROM {table} GROUP BY {keys}) k ON {join_on} "
+            f"WHERE t.id <> k.keep_id"
+        ))
+        conn.execute(text(f"CREATE INDEX {map_table}_old ON {map_table} (old_id)"))
+        merged = conn.execute(text(f"SELECT COUNT(*) FROM {map_table}")).scalar()
+
+        conn.execute(text(
+            f"UPDATE holders SET {holder_fk} = "
+            f"(SELECT keep_id FROM {map_table} WHERE old_id = holders.{holder_fk}) "
+            f"WHERE {holder_fk} IN (SELECT old_id FROM {map_table})"
+        ))
+        conn.execute(text(f"DELETE FROM {table} WHERE id IN (SELECT old_id FROM {map_table})"))
+        conn.execute(text(f"DROP TABLE {map_table}"))
+        # MySQL 不支持 CREATE INDEX IF NOT EXISTS，先检查索引是否已存在
+        if index_name not in {index["name"] for index in inspect(conn).get_indexes(table)}:
+            conn.execute(text(f"CREATE UNIQUE INDEX {index_name} ON {table} ({keys})"))
+
+    logger.info(f"Compacted {table}: merged {merged} duplicate rows")
+    return merged
+
+
+def compact_entities_and_labels(engine: Engine) -> dict:
+    """压缩实体与标签表，返回每张表合并的行数"""
+    result = {
+        table: compact_table(engine, table, key_fields, nullable_field, holder_fk, index_name)
+        for table, key_fields, nullable_field, holder_fk, index_name in COMPACT_TARGETS
+    }
+    # id 已被改写，清空本进程的驻留缓存
+    entity_interner.cache.clear()
+    label_interner.cache.clear()
+    return result
+
+
+def ensure_unique_keys(engine: Engine) -> dict:
+    """只压缩缺少唯一索引的表（已建索引的表直接跳过），返回每张被压缩的表合并的行数"""
+    inspector = inspect(engine)
+    result = {}
+    for table, key_fields, nullable_field, holder_fk, index_name in COMPACT_TARGETS:
+        if index_name in {index["name"] for index in inspector.get_indexes(table)}:
+            continue
+        logger.info(f"Unique index {index_name} is missing, compacting {table}")
+        result[table] = compact_table(engine, table, key_fields, nullable_field, holder_fk, index_name)
+    if result:
+        entity_interner.cache.clear()
+        label_interner.cache.clear()
+    return result
+
+
+if __name__ == "__main__":
+    from app.database.manager import db_manager
+    logging.basicConfig(level=logging.INFO)
+    db_manager.init_db()
+    print(compact_entities_and_labels(db_manager.engine))
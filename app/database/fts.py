@@ -0,0 +1,108 @@
+"""
+SQLite FTS5 币种全文索引
+
+coin_search 以 coin_id（UNINDEXED 列）关联 coins 表，列为 symbol、name 以及该币种全部现货/合约交易对名称。
+coins 的主键为 TEXT，其 rowid 是隐式的，VACUUM 可能重新编号，因此不能用 rowid 关联。
+虚拟表不在 SQLModel 元数据中，由 ensure_coin_search 创建，采集任务写库后调用 refresh_coin_search 同步。
+非 SQLite 数据库下各函数直接跳过，查询回退为 LIKE 前缀匹配。
+"""
+from sqlalchemy import Column, MetaData, Table, Text, bindparam, literal_column, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+from app.database.bulk import chunked
+from typing import Iterable, Optional
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+# 只用于构造查询，不参与 create_all
+coin_search = Table(
+    "coin_search", MetaData(),
+    Column("coin_id", Text, primary_key=True),
+    Column("symbol", Text),
+    Column("name", Text),
+    Column("pairs", Text),
+)
+
+# bm25 列权重（按列顺序）：coin_id 不参与匹配，symbol > name > pairs
+BM25_WEIGHTS = (0.0, 10.0, 5.0, 1.0)
+
+COIN_SEARCH_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS coin_search USING fts5("
+    "coin_id UNINDEXED, symbol, name, pairs, tokenize = 'unicode61', prefix = '2 3')"
+)
+
+_COLUMNS = "coin_id, symbol, name, pairs"
+
+_ROWS_SELECT = """
+    SELECT c.id, c.symbol, c.name,
+           (SELECT group_concat(pair, ' ') FROM (
+                SELECT spot_name AS pair FROM exchange_spots WHERE coin_id = c.id
+                UNION
+                SELECT contract_name AS pair FROM exchange_contracts WHERE coin_id = c.id
+           ))
+    FROM coins c
+"""
+
+
+def ensure_coin_search(engine: Engine):
+    """创建 FTS5 虚拟表，首次创建时全量填充；旧版本按 rowid 关联的表会被重建"""
+    if engine.dialect.name != "sqlite":
+        return
+    with engine.begin() as conn:
+        exists = conn.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'coin_search'"
+        )).first()
+        if exists:
+            columns = {row[1] for row in conn.execute(text("PRAGMA table_info(coin_search)"))}
+            if "coin_id" in columns:
+                return
+            logger.info("Rebuilding coin_search keyed on coin_id")
+            conn.execute(text("DROP TABLE coin_search"))
+        try:
+            conn.execute(text(COIN_SEARCH_DDL))
+        except OperationalError as e:
+            logger.error(f"FTS5 is not available in this SQLite build, full-text search disabled: {e}")
+            return
+        conn.execute(text(f"INSERT INTO coin_search ({_COLUMNS}) {_ROWS_SELECT}"))
+    logger.info("Created coin_search FTS5 table")
+
+
+def refresh_coin_search(session: Session, coin_ids: Optional[Iterable[str]] = None) -> int:
+    """重写指定币种（为 None 时为全部币种）的全文索引行并提交，已删除的币种只删除索引行"""
+    if session.get_bind().dialect.name != "sqlite":
+        return 0
+    if coin_ids is None:
+        session.execute(text("DELETE FROM coin_search"))
+        session.execute(text(f"INSERT INTO coin_search ({_COLUMNS}) {_ROWS_SELECT}"))
+        session.commit()
+        return session.execute(text("SELECT count(*) FROM coin_search")).scalar()
+
+    coin_ids = sorted(set(coin_ids))
+    delete_stmt = text(
+        "DELETE FROM coin_search WHERE coin_id IN :coin_ids"
+    ).bindparams(bindparam("coin_ids", expanding=True))
+    insert_stmt = text(
+        f"INSERT INTO coin_search ({_COLUMNS}) {_ROWS_SELECT} WHERE c.id IN :coin_ids"
+    ).bindparams(bindparam("coin_ids", expanding=True))
+    for chunk in chunked(coin_ids):
+        session.execute(delete_stmt, {"coin_ids": list(chunk)})
+        session.execute(insert_stmt, {"coin_ids": list(chunk)})
+        session.commit()
+    return len(coin_ids)
+
+
+def to_match_query(search_term: str) -> Optional[str]:
+    """把用户输入转换为 FTS5 查询：按非字母数字切词，每个词作为带引号的前缀词，词之间为 AND"""
+    tokens = [token for token in re.split(r"[^\w]+", search_term.lower()) if token]
+    if not tokens:
+        return None
+    return " ".join(f'"{token}"*' for token in tokens)
+
+
+def coin_search_rank():
+    weights = ", ".join(str(weight) for weight in BM25_WEIGHTS)
+    return literal_column(f"bm25(coin_search, {weights})")
+
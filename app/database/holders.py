@@ -0,0 +1,243 @@
+from sqlalchemy.orm import Session
+from app.database.models import Holder, CoinHolding, HolderSyncCheckpoint
+from app.database.bulk import bulk_upsert, chunked
+from app.database.interning import entity_interner, label_interner
+from app.crawlers.arkm import ArkmCrawler
+from app.config import settings
+from typing import AsyncContextManager, Callable, Dict, Iterable, List, Optional, Set, Tuple
+from contextlib import nullcontext
+from datetime import datetime, timedelta, timezone
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class HolderIngestionWorker:
+    """
+    代币持有者同步任务
+
+    - Arkham 请求异步并发（ARKM_FETCH_CONCURRENCY）
+    - 每批代币使用独立的 Session，一个事务内批量写入 Holder/ARKMEntity/Label/CoinHolding
+    - 持仓按代币与当前数据差分：新增、更新余额、删除已退出的持有者；
+      返回空持有者列表的代币只有在上一次快照也为空时才删除持仓，避免接口异常时清空数据
+    - ARKMEntity/Label 通过驻留器按唯一键复用，不再为每个新地址创建重复行
+    - 每个代币写入后记录检查点，中断后重新运行会跳过本周期内已同步的代币
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        arkm_crawler: ArkmCrawler,
+        concurrency: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        write_lock: Optional[Callable[[], AsyncContextManager]] = None,
+    ):
+        self.session_factory = session_factory
+        # 只在写入批次时持有，抓取 Arkham 数据期间不占用写锁
+        self.write_lock = write_lock or nullcontext
+        self.arkm_crawler = arkm_crawler
+        self.concurrency = concurrency or settings.ARKM_FETCH_CONCURRENCY
+        self.batch_size = batch_size or settings.HOLDER_INGESTION_BATCH_SIZE
+
+    async def run(self, coin_ids: Iterable[str], resume: bool = True) -> int:
+        """同步代币持有者，返回变更（新增/更新/删除）的持仓行数"""
+        coin_ids = sorted(set(coin_ids))
+        pending = self._pending_coin_ids(coin_ids) if resume else coin_ids
+        batches = list(chunked(pending, self.batch_size))
+        logger.info(f"Holder ingestion: {len(pending)}/{len(coin_ids)} tokens pending in {len(batches)} batches")
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def fetch(coin_id: str):
+            async with semaphore:
+                return coin_id, await self.arkm_crawler.fetch_token_holders(coin_id)
+
+        total = 0
+        for index, batch in enumerate(batches, start=1):
+            responses = await asyncio.gather(*(fetch(coin_id) for coin_id in batch))
+            try:
+                async with self.write_lock():
+                    total += self._write_batch(responses)
+            except Exception as e:
+                logger.error(f"Failed to write holder batch {index}/{len(batches)}: {e}")
+                continue
+            logger.info(f"Holder ingestion progress: batch {index}/{len(batches)}, {total} holdings changed")
+        return total
+
+    def _pending_coin_ids(self, coin_ids: List[str]) -> List[str]:
+        """过滤掉本刷新周期内已同步的代币"""
+        cutoff = datetime.now(timezone.utc) - timedelta(minutes=settings.TOKEN_HOLDERS_REFRESH_INTERVAL_MINUTES)
+        session = self.session_factory()
+        try:
+            synced = {
+                row[0] for row in session.query(HolderSyncCheckpoint.coin_id).filter(
+                    HolderSyncCheckpoint.synced_at >= cutoff
+                ).all()
+            }
+        finally:
+            session.close()
+        return [coin_id for coin_id in coin_ids if coin_id not in synced]
+
+    @staticmethod
+    def _parse_holders(response: dict) -> List[Tuple[str, str, dict, dict, dict]]:
+        """解析 Arkham 响应，返回 (chain, address, entity_info, label_info, holder_data)"""
+        parsed = []
+        for chain, holders in (response.get('addressTopHolders') or {}).items():
+            for holder_data in holders or []:
+                address_info = holder_data.get('address') or {}
+                address = address_info.get('address')
+                if not address:
+                    continue
+                parsed.append((
+                    chain,
+                    address,
+                    address_info.get('arkhamEntity') or {},
+                    address_info.get('arkhamLabel') or {},
+                    holder_data,
+                ))
+        return parsed
+
+    def _write_batch(self, responses: List[Tuple[str, dict]]) -> int:
+        """在一个事务中写入一批代币的持有者数据"""
+        # 抓取失败的代币不写检查点，下次运行会重试
+        parsed = {coin_id: self._parse_holders(response) for coin_id, response in responses if response}
+        if not parsed:
+            return 0
+
+        now = datetime.now(timezone.utc)
+        new_holders: Dict[str, Tuple[str, dict, dict]] = {}
+        entity_keys: Dict[str, Tuple] = {}
+        label_keys: Dict[str, Tuple] = {}
+        session = self.session_factory()
+        try:
+            addresses = list({address for holders in parsed.values() for _, address, _, _, _ in holders})
+            holder_ids = self._load_holder_ids(session, addresses)
+
+            # 新持有者：同一地址只取第一次出现的数据
+            for holders in parsed.values():
+                for chain, address, entity_info, label_info, _ in holders:
+                    if address not in holder_ids and address not in new_holders:
+                        new_holders[address] = (chain, entity_info, label_info)
+
+            if new_holders:
+                # 实体/标签按唯一键驻留，已存在的直接复用 id
+                entity_keys = {
+                    address: (entity_info.get('name'), entity_info.get('type'))
+                    for address, (_, entity_info, _) in new_holders.items()
+                }
+                label_keys = {
+                    address: (label_info.get('name'), chain)
+                    for address, (chain, _, label_info) in new_holders.items()
+                }
+                entity_ids = entity_interner.resolve(session, entity_keys.values())
+                label_ids = label_interner.resolve(session, label_keys.values())
+
+                bulk_upsert(
+                    session, Holder,
+                    [
+                        {
+                            "address": address,
+                            "chain_type": chain,
+                            "entity_id": entity_ids[entity_interner.normalize(entity_keys[address])],
+                            "label_id": label_ids[label_interner.normalize(label_keys[address])],
+                            "updated_at": now,
+                        }
+                        for address, (chain, _, _) in new_holders.items()
+                    ],
+                    index_elements=["address"],
+                    commit=False
+                )
+                holder_ids.update(self._load_holder_ids(session, list(new_holders)))
+
+            holding_rows: Dict[Tuple[str, int], dict] = {}
+            for coin_id, holders in parsed.items():
+                for _, address, _, _, holder_data in holders:
+                    holder_id = holder_ids[address]
+                    holding_rows.setdefault((coin_id, holder_id), {
+                        "coin_id": coin_id,
+                        "holder_id": holder_id,
+                        "balance": holder_data.get('balance'),
+                        "usd_value": holder_data.get('usd'),
+                        "updated_at": now,
+                    })
+
+            # 与当前持仓做差分：新增/余额变化的 upsert，已退出的持有者删除
+            current = self._load_holdings(session, list(parsed))
+            changed_rows = [
+                row for key, row in holding_rows.items()
+                if key not in current or current[key][1:] != (row["balance"], row["usd_value"])
+            ]
+            unconfirmed = self._unconfirmed_empty(session, [coin_id for coin_id, holders in parsed.items() if not holders])
+            if unconfirmed:
+                logger.warning(f"Empty holder list for {len(unconfirmed)} tokens, keep existing holdings until confirmed")
+            exited_ids = [
+                holding_id for key, (holding_id, _, _) in current.items()
+                if key not in holding_rows and key[0] not in unconfirmed
+            ]
+            inserted = sum(1 for row in changed_rows if (row["coin_id"], row["holder_id"]) not in current)
+
+            bulk_upsert(
+                session, CoinHolding, changed_rows,
+                index_elements=["coin_id", "holder_id"],
+                update_fields=["balance", "usd_value", "updated_at"],
+                commit=False
+            )
+            for chunk in chunked(exited_ids):
+                session.query(CoinHolding).filter(CoinHolding.id.in_(chunk)).delete(synchronize_session=False)
+
+            bulk_upsert(
+                session, HolderSyncCheckpoint,
+                [
+                    {"coin_id": coin_id, "holders_count": len(holders), "synced_at": now}
+                    for coin_id, holders in parsed.items()
+                ],
+                index_elements=["coin_id"],
+                update_fields=["holders_count", "synced_at"],
+                commit=False
+            )
+            session.commit()
+            logger.debug(
+                f"Holdings synced: {inserted} inserted, {len(changed_rows) - inserted} updated, "
+                f"{len(exited_ids)} deleted"
+            )
+            return len(changed_rows) + len(exited_ids)
+        except Exception:
+            session.rollback()
+            entity_interner.forget(entity_keys.values())
+            label_interner.forget(label_keys.values())
+            raise
+        finally:
+            session.close()
+
+    @staticmethod
+    def _unconfirmed_empty(session: Session, coin_ids: List[str]) -> Set[str]:
+        """返回空列表的代币中，上一次快照不为空（或没有快照）的代币，这些代币本次不删除持仓"""
+        previous = {}
+        for chunk in chunked(coin_ids):
+            previous.update(
+                session.query(HolderSyncCheckpoint.coin_id, HolderSyncCheckpoint.holders_count).filter(
+                    HolderSyncCheckpoint.coin_id.in_(chunk)
+                ).all()
+            )
+        return {coin_id for coin_id in coin_ids if previous.get(coin_id) != 0}
+
+    @staticmethod
+    def _load_holdings(session: Session, coin_ids: List[str]) -> Dict[Tuple[str, int], Tuple[int, float, float]]:
+        """加载代币当前持仓：(coin_id, holder_id) -> (id, balance, usd_value)"""
+        holdings = {}
+        for chunk in chunked(coin_ids):
+            for row in session.query(
+                CoinHolding.id, CoinHolding.coin_id, CoinHolding.holder_id, CoinHolding.balance, CoinHolding.usd_value
+            ).filter(CoinHolding.coin_id.in_(chunk)).all():
+                holdings[(row.coin_id, row.holder_id)] = (row.id, row.balance, row.usd_value)
+        return holdings
+
+    @staticmethod
+    def _load_holder_ids(session: Session, addresses: List[str]) -> Dict[str, int]:
+        holder_ids = {}
+        for chunk in chunked(addresses):
+            holder_ids.update(
+                session.query(Holder.address, Holder.id).filter(Holder.address.in_(chunk)).all()
+            )
+        return holder_ids
@@ -0,0 +1,103 @@
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Session
+from app.database.models import ARKMEntity, Label
+from app.database.bulk import chunked, upsert_statement
+from app.config import settings
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, Optional, Tuple
+
+
+class LRUCache:
+    """简单的进程内 LRU 缓存"""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data: OrderedDict = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        value = self._data.get(key)
+        if value is not None:
+            self._data.move_to_end(key)
+        return value
+
+    def put(self, key: Hashable, value: Any):
+        self._data[key] = value
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def discard(self, key: Hashable):
+        self._data.pop(key, None)
+
+    def clear(self):
+        self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class KeyInterner:
+    """
+    唯一键驻留
+
+    把 (name, type) / (name, chain_type) 这类唯一键批量解析为已有行的 id：
+    先查 LRU，未命中的按唯一键一次 IN 查询，仍不存在的批量插入后再查回 id；
+    插入时忽略唯一键冲突（并发写入者可能已插入同一键），再查回的 id 即为已存在的行
+    """
+
+    def __init__(self, model, key_fields: Tuple[str, ...], maxsize: Optional[int] = None):
+        self.model = model
+        self.key_fields = key_fields
+        self.cache = LRUCache(maxsize or settings.INTERN_CACHE_SIZE)
+
+    @staticmethod
+    def normalize(key: Tuple) -> Tuple:
+        # 空值统一为空字符串，保证唯一键可比较
+        return tuple(value or '' for value in key)
+
+    def resolve(self, session: Session, keys: Iterable[Tuple]) -> Dict[Tuple, int]:
+        """批量解析唯一键，返回 key -> id（key 已归一化）"""
+        resolved: Dict[Tuple, int] = {}
+        missing = []
+        for key in {self.normalize(key) for key in keys}:
+            cached_id = self.cache.get(key)
+            if cached_id is None:
+                missing.append(key)
+            else:
+                resolved[key] = cached_id
+        if not missing:
+            return resolved
+
+        found = self._lookup(session, missing)
+        absent = [key for key in missing if key not in found]
+        if absent:
+            stmt = upsert_statement(session.get_bind().dialect.name, self.model.__table__, self.key_fields)
+            session.execute(stmt, [dict(zip(self.key_fields, key)) for key in absent])
+            found.update(self._lookup(session, absent))
+
+        for key in missing:
+            self.cache.put(key, found[key])
+        resolved.update(found)
+        return resolved
+
+    def forget(self, keys: Iterable[Tuple]):
+        """事务回滚时移除本次解析的键，避免缓存指向未提交的行"""
+        for key in keys:
+            self.cache.discard(self.normalize(key))
+
+    def _lookup(self, session: Session, keys) -> Dict[Tuple, int]:
+        columns = [getattr(self.model, field) for field in self.key_fields]
+        found = {}
+        for chunk in chunked(keys):
+            # 按 id 倒序，存在历史重复行时保留最小的 id
+            rows = session.query(self.model.id, *columns).filter(
+                tuple_(*columns).in_(chunk)
+            ).order_by(self.model.id.desc()).all()
+            for row in rows:
+                found[tuple(row[1:])] = row[0]
+        return found
+
+
+# 进程级共享的驻留器
+entity_interner = KeyInterner(ARKMEntity, ("name", "type"))
+label_interner = KeyInterner(Label, ("name", "chain_type"))
@@ -0,0 +1,256 @@
+from dataclasses import dataclass
+from sqlalchemy import delete
+from sqlalchemy.orm import Session
+from apscheduler.schedulers.base import BaseScheduler
+from apscheduler.triggers.interval import IntervalTrigger
+from app.database.models import JobRun
+from app.database.processor import DataProcessor
+from app.crawlers.clients import CrawlerClients
+from app.config import settings
+from typing import Any, AsyncContextManager, Callable, Dict, List, Optional, Sequence, Tuple
+from datetime import datetime, timedelta, timezone
+from contextlib import asynccontextmanager
+from functools import partial
+import asyncio
+import heapq
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class JobSpec:
+    """定时任务定义：DataProcessor 上的方法名、运行间隔（分钟）与依赖的任务"""
+    name: str
+    method: str
+    interval_minutes: Callable[[], int]
+    depends_on: Tuple[str, ...] = ()
+    enabled: Callable[[], bool] = lambda: True
+
+
+# 按依赖顺序声明：币种列表 -> 交易对 -> 价格 -> 持有者，依赖必须在前面声明
+JOBS: Tuple[JobSpec, ...] = (
+    JobSpec("coins", "initialize_coins_data", lambda: settings.COIN_LIST_REFRESH_INTERVAL_MINUTES),
+    JobSpec("exchange_pairs", "update_exchange_data", lambda: settings.EXCHANGE_DATA_REFRESH_INTERVAL_MINUTES, ("coins",)),
+    JobSpec("market_data", "update_market_data", lambda: settings.MARKET_DATA_REFRESH_INTERVAL_MINUTES, ("coins",)),
+    JobSpec("cg_prices", "update_exchange_prices_with_cg", lambda: settings.EXCHANGE_DATA_REFRESH_INTERVAL_MINUTES, ("exchange_pairs",)),
+    JobSpec(
+        "ccxt_prices", "update_exchange_prices_with_ccxt", lambda: settings.CCXT_PRICE_REFRESH_INTERVAL_MINUTES, ("exchange_pairs",),
+        # 开启行情推送时不再轮询 ccxt REST 行情
+        enabled=lambda: not settings.PRICE_STREAM_ENABLED
+    ),
+    # 压缩只需要已有的价格点，不依赖上游最近一次运行成功
+    JobSpec("price_history", "compact_price_history", lambda: settings.PRICE_HISTORY_COMPACT_INTERVAL_MINUTES),
+    JobSpec("holders", "update_top_project_token_holders", lambda: settings.TOKEN_HOLDERS_REFRESH_INTERVAL_MINUTES, ("exchange_pairs",)),
+)
+
+
+class PriorityLock:
+    """
+    互斥锁，等待者按 (优先级, 到达顺序) 获得锁，数值小的优先
+
+    用于串行化所有写库阶段：多个写入者同时等待时，上游任务先写
+    """
+
+    def __init__(self):
+        self._locked = False
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._sequence = 0
+
+    def locked(self) -> bool:
+        return self._locked
+
+    async def acquire(self, priority: int):
+        if not self._locked and not self._waiters:
+            self._locked = True
+            return
+        future = asyncio.get_running_loop().create_future()
+        self._sequence += 1
+        heapq.heappush(self._waiters, (priority, self._sequence, future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            # 已被唤醒但随即取消，把锁交给下一个等待者
+            if future.done() and not future.cancelled():
+                self.release()
+            raise
+
+    def release(self):
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                # 锁直接移交给等待者，保持 locked
+                future.set_result(None)
+                return
+        self._locked = False
+
+
+class JobOrchestrator:
+    """
+    定时任务编排
+
+    - 每次运行创建独立的 Session 与 DataProcessor（爬虫/ccxt 客户端共享），运行结束即关闭；
+      DataProcessor 在网络抓取与等待写锁前结束读事务，Session 只在查询/写入期间占用连接
+    - 每个任务同一时间只运行一个实例：调度器 max_instances=1 + coalesce，手动触发时正在运行则跳过
+    - 依赖：上游任务正在运行时等待其结束；上游最近一次运行未成功时跳过本次运行（记为 skipped），
+      上游按自己的周期重试成功后下游恢复
+    - 写锁：只在写库阶段持有（DataProcessor/持有者同步/行情推送的 write_lock），抓取阶段并发进行；
+      同时等待时按依赖顺序（币种列表 -> 交易对 -> 价格 -> 持有者）获得锁，行情推送优先
+    - 每次运行的等待时间（等待上游与写锁）、运行时间、写入行数与错误记录到 job_runs，
+      超过 JOB_RUNS_RETENTION_DAYS 的记录自动清理
+    """
+
+    # 非定时任务的写入者（行情推送）每次只写一小批，优先获得写锁
+    STREAM_PRIORITY = -1
+
+    def __init__(self, session_factory: Callable[[], Session], clients: CrawlerClients, jobs: Sequence[JobSpec] = JOBS):
+        self.session_factory = session_factory
+        self.clients = clients
+        self.jobs: Dict[str, JobSpec] = {}
+        for job in jobs:
+            missing = [name for name in job.depends_on if name not in self.jobs]
+            if missing:
+                raise ValueError(f"Job {job.name} depends on undeclared or later jobs: {missing}")
+            self.jobs[job.name] = job
+        # 声明顺序即依赖顺序，作为获得写锁的优先级
+        self._priority = {name: index for index, name in enumerate(self.jobs)}
+        self._lock = PriorityLock()
+        # 任务名 -> 本次运行结束时完成的 Future，下游任务据此等待上游
+        self._running: Dict[str, asyncio.Future] = {}
+        self._started: Dict[str, float] = {}
+        self._wait_seconds: Dict[str, float] = {}
+        self._last_runs: Dict[str, Dict[str, Any]] = {}
+
+    def enabled_jobs(self) -> List[JobSpec]:
+        return [job for job in self.jobs.values() if job.enabled()]
+
+    def schedule(self, scheduler: BaseScheduler):
+        """把启用的任务注册到调度器"""
+        for job in self.enabled_jobs():
+            scheduler.add_job(
+                self.run, IntervalTrigger(minutes=job.interval_minutes()), args=[job.name],
+                id=job.name, name=job.name, max_instances=1, coalesce=True, replace_existing=True
+            )
+
+    def write_lock(self, name: str) -> Callable[[], AsyncContextManager]:
+        """写库阶段使用的锁，name 为任务名（决定优先级）或其他写入者的名称"""
+        return partial(self._write_lock, name)
+
+    @asynccontextmanager
+    async def _write_lock(self, name: str):
+        started = time.perf_counter()
+        await self._lock.acquire(self._priority.get(name, self.STREAM_PRIORITY))
+        if name in self._running:
+            self._wait_seconds[name] = self._wait_seconds.get(name, 0.0) + time.perf_counter() - started
+        try:
+            yield
+        finally:
+            self._lock.release()
+
+    async def run_all(self, skip: Sequence[str] = ()) -> Dict[str, Optional[int]]:
+        """按依赖顺序依次运行全部启用的任务"""
+        return {job.name: await self.run(job.name) for job in self.enabled_jobs() if job.name not in skip}
+
+    async def run(self, name: str) -> Optional[int]:
+        """运行一次任务，返回写入行数；任务已在运行、被跳过或失败时返回 None"""
+        job = self.jobs[name]
+        if name in self._running:
+            logger.info(f"Job {name} is already running, skip")
+            return None
+        done = asyncio.get_running_loop().create_future()
+        self._running[name] = done
+        self._started[name] = time.perf_counter()
+        self._wait_seconds[name] = 0.0
+        try:
+            blocked_by = await self._wait_for_dependencies(job)
+            return await self._execute(job, blocked_by)
+        finally:
+            self._running.pop(name, None)
+            self._started.pop(name, None)
+            self._wait_seconds.pop(name, None)
+            done.set_result(None)
+
+    async def _wait_for_dependencies(self, job: JobSpec) -> Optional[str]:
+        """等待正在运行的上游任务结束，返回最近一次运行未成功的上游任务名"""
+        started = time.perf_counter()
+        for dependency in job.depends_on:
+            running = self._running.get(dependency)
+            if running is not None:
+                logger.info(f"Job {job.name} waiting for upstream job {dependency}")
+                # shield：下游被取消时不影响上游的完成标记
+                await asyncio.shield(running)
+        self._wait_seconds[job.name] += time.perf_counter() - started
+        for dependency in job.depends_on:
+            last_run = self._last_runs.get(dependency)
+            if last_run is not None and last_run["status"] != "success":
+                return dependency
+        return None
+
+    async def _execute(self, job: JobSpec, blocked_by: Optional[str] = None) -> Optional[int]:
+        # 运行时间从进入 run 开始计算，包含等待上游任务的时间
+        started = self._started.get(job.name, time.perf_counter())
+        started_at = datetime.now(timezone.utc) - timedelta(seconds=time.perf_counter() - started)
+        rows, error, status = None, None, "success"
+        if blocked_by is not None:
+            status = "skipped"
+            error = f"upstream job {blocked_by} {self._last_runs[blocked_by]['status']}"
+            logger.warning(f"Job {job.name} skipped: {error}")
+        else:
+            session = self.session_factory()
+            try:
+                processor = DataProcessor(session, self.clients, write_lock=self.write_lock(job.name))
+                rows = await getattr(processor, job.method)()
+            except Exception as e:
+                status = "failed"
+                error = f"{type(e).__name__}: {e}"
+                logger.exception(f"Job {job.name} failed")
+            finally:
+                session.close()
+        duration = time.perf_counter() - started
+        wait_seconds = self._wait_seconds.get(job.name, 0.0)
+        run = {
+            "job_name": job.name,
+            "status": status,
+            "started_at": started_at,
+            "wait_seconds": wait_seconds,
+            "duration_seconds": duration,
+            "rows": rows if isinstance(rows, int) else None,
+            "error": error[:512] if error else None,
+        }
+        self._last_runs[job.name] = run
+        logger.info(f"Job {job.name} {status} in {duration:.2f}s (waited {wait_seconds:.2f}s), rows={run['rows']}")
+        try:
+            async with self._write_lock(job.name):
+                self._record(run)
+        except Exception as e:
+            logger.error(f"Failed to record job run {job.name}: {e}")
+        return run["rows"]
+
+    def _record(self, run: Dict[str, Any]):
+        session = self.session_factory()
+        try:
+            session.add(JobRun(**run))
+            if settings.JOB_RUNS_RETENTION_DAYS:
+                cutoff = run["started_at"] - timedelta(days=settings.JOB_RUNS_RETENTION_DAYS)
+                session.execute(delete(JobRun).where(JobRun.job_name == run["job_name"], JobRun.started_at < cutoff))
+            session.commit()
+        finally:
+            session.close()
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.perf_counter()
+        return {
+            "running": {name: round(now - started, 3) for name, started in self._started.items()},
+            "write_lock_held": self._lock.locked(),
+            "last_runs": {
+                name: {
+                    "status": run["status"],
+                    "started_at": run["started_at"].isoformat(),
+                    "wait_seconds": round(run["wait_seconds"], 3),
+                    "duration_seconds": round(run["duration_seconds"], 3),
+                    "rows": run["rows"],
+                }
+                for name, run in self._last_runs.items()
+            },
+        }
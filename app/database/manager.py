@@ -1,44 +1,169 @@
 from sqlmodel import create_engine, Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy import event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from app.database.fts import ensure_coin_search
 from app.config import settings
+from functools import partial
 import logging
-from typing import Any
+from typing import Optional
 
 logger = logging.getLogger(__name__)
 
+# 同步驱动 -> 异步驱动
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "mysql": "mysql+aiomysql",
+}
+
+
+def to_async_url(db_url: str) -> str:
+    """把同步数据库 URL 转换为对应异步驱动的 URL"""
+    url = make_url(db_url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for database backend: {backend}")
+    return url.set(drivername=ASYNC_DRIVERS[backend]).render_as_string(hide_password=False)
+
+
+def is_sqlite_file(db_url: str) -> bool:
+    """是否为文件型 SQLite（内存库的每个连接都是独立的库，不能拆分读写连接）"""
+    url = make_url(db_url)
+    return url.get_backend_name() == "sqlite" and url.database not in (None, "", ":memory:")
+
+
+def server_pool_options() -> dict:
+    """PostgreSQL/MySQL 的连接池参数"""
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT_SECONDS,
+        "pool_recycle": settings.DB_POOL_RECYCLE_SECONDS,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+
+
+def apply_sqlite_pragmas(dbapi_connection, connection_record, read_only: bool = False):
+    """新建连接时设置 SQLite 调优参数"""
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute(f"PRAGMA busy_timeout={settings.SQLITE_BUSY_TIMEOUT_MS}")
+        if not read_only:
+            # journal_mode 持久化在库文件中，由写连接设置即可
+            cursor.execute(f"PRAGMA journal_mode={settings.SQLITE_JOURNAL_MODE}")
+        cursor.execute(f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA mmap_size={settings.SQLITE_MMAP_SIZE}")
+        # 负数表示以 KiB 为单位
+        cursor.execute(f"PRAGMA cache_size=-{settings.SQLITE_CACHE_SIZE_KB}")
+        if read_only:
+            cursor.execute("PRAGMA query_only=ON")
+    finally:
+        cursor.close()
+
+
 class DatabaseManager:
+    """
+    数据库引擎与会话
+
+    数据库地址取自 DATABASE_URL，未配置时使用本地 SQLite 文件。
+
+    文件型 SQLite 下读写分离：
+    - engine：写引擎，一个常驻连接 + SQLITE_WRITER_MAX_OVERFLOW 个溢出连接，采集任务通过 get_session() 使用；
+      写入由任务编排器的写锁串行，抓取期间不占用连接
+    - read_engine / async_engine：只读连接池（query_only），API 查询使用
+    WAL 模式下读连接不会被写事务阻塞
+
+    PostgreSQL/MySQL 下读写共用一个按 DB_POOL_* 配置的连接池
+    """
+
     def __init__(self, db_url: str = None):
         if db_url is None:
-            db_url = f"sqlite:///{settings.DB_PATH}"
+            db_url = settings.DATABASE_URL or f"sqlite:///{settings.DB_PATH}"
 
-        self.engine = create_engine(db_url, echo=settings.DEBUG)
-        self.__cache = {}
+        self.db_url = db_url
+        self.backend = make_url(db_url).get_backend_name()
+        self.sqlite_file = is_sqlite_file(db_url)
+        if self.sqlite_file:
+            # 溢出连接覆盖同时占用写连接的写锁持有者、事件循环上的读查询与交易对映射重新加载，
+            # 连接池阻塞会冻结整个事件循环；写入由写锁与 SQLite 串行化
+            self.engine = self._tune(create_engine(
+                db_url, echo=settings.DEBUG,
+                pool_size=1, max_overflow=settings.SQLITE_WRITER_MAX_OVERFLOW
+            ))
+            self.read_engine = self._tune(create_engine(
+                db_url, echo=settings.DEBUG,
+                pool_size=settings.SQLITE_READ_POOL_SIZE, max_overflow=0
+            ), read_only=True)
+        elif self.backend == "sqlite":
+            self.engine = create_engine(db_url, echo=settings.DEBUG)
+            self.read_engine = self.engine
+        else:
+            self.engine = create_engine(db_url, echo=settings.DEBUG, **server_pool_options())
+            self.read_engine = self.engine
+        # 异步引擎在第一次使用时创建，只跑采集任务的进程不需要异步驱动
+        self._async_engine: Optional[AsyncEngine] = None
+
+    def _tune(self, engine: Engine, read_only: bool = False) -> Engine:
+        event.listen(engine, "connect", partial(apply_sqlite_pragmas, read_only=read_only))
+        return engine
+
+    @property
+    def async_engine(self) -> AsyncEngine:
+        """异步引擎，供 API 查询使用（文件型 SQLite 下为只读连接池）"""
+        if self._async_engine is None:
+            if self.sqlite_file:
+                self._async_engine = create_async_engine(
+                    to_async_url(self.db_url), echo=settings.DEBUG,
+                    pool_size=settings.SQLITE_READ_POOL_SIZE, max_overflow=0
+                )
+                self._tune(self._async_engine.sync_engine, read_only=True)
+            elif self.backend == "sqlite":
+                self._async_engine = create_async_engine(to_async_url(self.db_url), echo=settings.DEBUG)
+            else:
+                self._async_engine = create_async_engine(
+                    to_async_url(self.db_url), echo=settings.DEBUG, **server_pool_options()
+                )
+        return self._async_engine
 
     def init_db(self):
         """初始化数据库表结构"""
         try:
             # 使用 SQLModel 的方式创建所有表
             from app.database.models import SQLModel
+            from app.database.compact import ensure_unique_keys
             SQLModel.metadata.create_all(self.engine)
+            # create_all 不会给已存在的表补建索引，旧库需先合并重复行再建唯一索引
+            ensure_unique_keys(self.engine)
+            ensure_coin_search(self.engine)
             logger.info("Database tables created successfully")
         except Exception as e:
             logger.error(f"Error creating database tables: {e}")
 
     def get_session(self) -> Session:
-        """获取数据库会话"""
+        """获取数据库会话（写引擎）"""
         return Session(self.engine)
 
+    def get_read_session(self) -> Session:
+        """获取只读数据库会话"""
+        return Session(self.read_engine)
+
     def close_session(self, session):
         """关闭数据库会话"""
         session.close()
 
-    def set_cache(self, key: str, value: Any):
-        """设置缓存"""
-        self.__cache[key] = value
+    def get_async_session(self) -> AsyncSession:
+        """获取异步只读会话（提交后不过期，结果在会话关闭后仍可读取）"""
+        return AsyncSession(self.async_engine, expire_on_commit=False)
+
+    async def dispose(self):
+        """释放连接池"""
+        if self._async_engine is not None:
+            await self._async_engine.dispose()
+        self.read_engine.dispose()
+        self.engine.dispose()
 
-    def get_cache(self, key: str) -> Any:
-        """获取缓存"""
-        return self.__cache.get(key)
-    def delete_cache(self, key: str):
-        """删除缓存"""
-        self.__cache.pop(key, None)
 
+# 进程内共享的数据库管理器，API 与采集任务使用同一组连接池
+db_manager = DatabaseManager()
@@ -0,0 +1,32 @@
+from dataclasses import dataclass, field
+from typing import Any, Dict, List
+
+
+@dataclass
+class PriceRefreshMetrics:
+    """单次价格刷新的统计指标"""
+    batches: int = 0
+    failed_batches: int = 0
+    rows_updated: int = 0
+    elapsed_seconds: float = 0.0
+    batch_latencies: List[float] = field(default_factory=list)
+
+    @property
+    def avg_latency(self) -> float:
+        if not self.batch_latencies:
+            return 0.0
+        return sum(self.batch_latencies) / len(self.batch_latencies)
+
+    @property
+    def max_latency(self) -> float:
+        return max(self.batch_latencies, default=0.0)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "batches": self.batches,
+            "failed_batches": self.failed_batches,
+            "rows_updated": self.rows_updated,
+            "elapsed_seconds": round(self.elapsed_seconds, 3),
+            "avg_latency": round(self.avg_latency, 3),
+            "max_latency": round(self.max_latency, 3),
+        }
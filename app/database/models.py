@@ -1,6 +1,6 @@
 from sqlmodel import SQLModel, Field, Relationship
 from typing import List, Optional
-from sqlalchemy import Column, String, UniqueConstraint, Index
+from sqlalchemy import Column, Float, String, UniqueConstraint, Index
 import datetime
 
 
@@ -112,6 +112,33 @@ class ExchangeContract(SQLModel, table=True):
     coin: Coin = Relationship(back_populates="exchange_contracts")
 
 
+# ---------------------------
+# 交易所价格表（每个币种在每个交易所现货/合约市场的最新行情）
+# ---------------------------
+class VenuePrice(SQLModel, table=True):
+    __tablename__ = "venue_prices"
+    __table_args__ = (
+        # 唯一键同时用于批量 upsert 与按交易所的快照范围扫描
+        Index("uq_venue_price", "exchange_name", "market_type", "coin_id", unique=True),
+        {'mysql_engine': 'InnoDB', 'mysql_charset': 'utf8mb4'}
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    coin_id: str = Field(foreign_key="coins.id", nullable=False)
+    # 与 exchange_spots/exchange_contracts 的 exchange_name 一致（CMC 交易所名）
+    exchange_name: str = Field(nullable=False)
+    # spot / swap
+    market_type: str = Field(nullable=False)
+    # 成交额最大的交易对，如 BTC/USDT
+    pair_name: str = Field(nullable=False)
+    price: float = Field(nullable=False)
+    bid: Optional[float] = None
+    ask: Optional[float] = None
+    # 24 小时计价币成交额
+    volume: Optional[float] = None
+    updated_at: datetime.datetime = Field(default_factory=datetime.datetime.utcnow)
+
+
 # =========================================================
 # Holder（持有者地址）
 # =========================================================
@@ -159,6 +186,9 @@ class CoinHolding(SQLModel, table=True):
     __table_args__ = (
         UniqueConstraint("coin_id", "holder_id"),
         Index("idx_coin_holding", "coin_id", "holder_id"),
+        # 持仓游标分页：按 (usd_value, id) 排序
+        Index("idx_coin_holding_value", "coin_id", "usd_value", "id"),
+        Index("idx_holding_value", "usd_value", "id"),
         {'mysql_engine': 'InnoDB', 'mysql_charset': 'utf8mb4'}
     )
 
@@ -181,6 +211,7 @@ class ARKMEntity(SQLModel, table=True):
     __tablename__ = "arkm_entities"
     __table_args__ = (
         Index("idx_entity_name", "name"),
+        Index("uq_entity_name_type", "name", "type", unique=True),
         {'mysql_engine': 'InnoDB', 'mysql_charset': 'utf8mb4'}
     )
 
@@ -201,6 +232,7 @@ class Label(SQLModel, table=True):
     __table_args__ = (
         Index("idx_label_name", "name"),
         Index("idx_label_chain", "chain_type"),
+        Index("uq_label_name_chain", "name", "chain_type", unique=True),
         {'mysql_engine': 'InnoDB', 'mysql_charset': 'utf8mb4'}
     )
 
@@ -212,3 +244,91 @@ class Label(SQLModel, table=True):
     # 一个 label 可被多个 holder 使用
     holders: List["Holder"] = Relationship(back_populates="label")
 
+
+
+# =========================================================
+# HolderSyncCheckpoint（持有者同步检查点）
+# =========================================================
+class HolderSyncCheckpoint(SQLModel, table=True):
+    __tablename__ = "holder_sync_checkpoints"
+    __table_args__ = (
+        Index("idx_holder_sync_at", "synced_at"),
+        {'mysql_engine': 'InnoDB', 'mysql_charset': 'utf8mb4'}
+    )
+
+    coin_id: str = Field(foreign_key="coins.id", primary_key=True)
+    holders_count: int = 0
+    synced_at: datetime.datetime = Field(default_factory=datetime.datetime.utcnow)
+
+
+# =========================================================
+# 价格历史
+# coin_key 为 supply_info.id（整数，比 coin_id 字符串紧凑），时间为 UTC 秒级时间戳，
+# 价格与市值为单精度浮点；SQLite 下为 WITHOUT ROWID 表，按主键聚簇存放
+# =========================================================
+class PricePoint(SQLModel, table=True):
+    """原始价格点（只追加），由价格任务写入，压缩任务汇总后按保留期删除"""
+    __tablename__ = "price_points"
+    __table_args__ = (
+        Index("idx_price_point_ts", "ts"),
+        {'mysql_engine': 'InnoDB', 'mysql_charset': 'utf8mb4', 'sqlite_with_rowid': False}
+    )
+
+    coin_key: int = Field(foreign_key="supply_info.id", primary_key=True)
+    ts: int = Field(primary_key=True)
+    price: Optional[float] = Field(default=None, sa_column=Column(Float(precision=24)))
+    market_cap: Optional[float] = Field(default=None, sa_column=Column(Float(precision=24)))
+
+
+class PriceBar(SQLModel, table=True):
+    """OHLC 汇总（1m / 1h / 1d），按 (coin_key, interval_seconds, bucket_start) 范围扫描"""
+    __tablename__ = "price_bars"
+    __table_args__ = (
+        Index("idx_price_bar_interval_start", "interval_seconds", "bucket_start"),
+        {'mysql_engine': 'InnoDB', 'mysql_charset': 'utf8mb4', 'sqlite_with_rowid': False}
+    )
+
+    coin_key: int = Field(foreign_key="supply_info.id", primary_key=True)
+    interval_seconds: int = Field(primary_key=True)
+    bucket_start: int = Field(primary_key=True)
+    open: float = Field(sa_column=Column(Float(precision=24), nullable=False))
+    high: float = Field(sa_column=Column(Float(precision=24), nullable=False))
+    low: float = Field(sa_column=Column(Float(precision=24), nullable=False))
+    close: float = Field(sa_column=Column(Float(precision=24), nullable=False))
+    market_cap: Optional[float] = Field(default=None, sa_column=Column(Float(precision=24)))
+    # 汇总的原始价格点数
+    points: int = 0
+
+
+class PriceHistoryWatermark(SQLModel, table=True):
+    """各汇总粒度已压缩到的位置（下一次从该桶的前一个桶开始重算）"""
+    __tablename__ = "price_history_watermarks"
+    __table_args__ = (
+        {'mysql_engine': 'InnoDB', 'mysql_charset': 'utf8mb4'},
+    )
+
+    interval_seconds: int = Field(primary_key=True)
+    compacted_until: int = 0
+
+
+# =========================================================
+# JobRun（定时任务运行记录）
+# =========================================================
+class JobRun(SQLModel, table=True):
+    __tablename__ = "job_runs"
+    __table_args__ = (
+        Index("idx_job_run_name_started", "job_name", "started_at"),
+        {'mysql_engine': 'InnoDB', 'mysql_charset': 'utf8mb4'}
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    job_name: str = Field(sa_column=Column(String(64), nullable=False))
+    # success / failed / skipped（上游任务最近一次运行未成功）
+    status: str = Field(sa_column=Column(String(16), nullable=False))
+    started_at: datetime.datetime
+    # 等待上游任务与写锁的时间（包含在运行时间内）
+    wait_seconds: float = 0.0
+    duration_seconds: float = 0.0
+    # 任务返回的写入行数
+    rows: Optional[int] = None
+    error: Optional[str] = Field(default=None, sa_column=Column(String(512)))
@@ -0,0 +1,212 @@
+from sqlalchemy import delete, func
+from sqlalchemy.orm import Session
+from app.database.models import SupplyInfo, PricePoint, PriceBar, PriceHistoryWatermark
+from app.database.bulk import bulk_upsert, chunked
+from app.config import settings
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from datetime import datetime
+import numpy as np
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# 汇总粒度名称 -> 秒数
+INTERVAL_SECONDS = {"1m": 60, "1h": 3600, "1d": 86400}
+
+# 汇总链：目标粒度 <- 来源粒度（0 表示原始价格点）
+ROLLUP_SOURCES = ((60, 0), (3600, 60), (86400, 3600))
+
+
+def retention_days(interval_seconds: int) -> int:
+    """各粒度的保留天数，0 表示永久保留"""
+    return {
+        0: settings.PRICE_HISTORY_RAW_RETENTION_DAYS,
+        60: settings.PRICE_HISTORY_1M_RETENTION_DAYS,
+        3600: settings.PRICE_HISTORY_1H_RETENTION_DAYS,
+        86400: settings.PRICE_HISTORY_1D_RETENTION_DAYS,
+    }[interval_seconds]
+
+
+def record_price_points(
+    session: Session,
+    points: Dict[str, Tuple[Optional[float], Optional[float]]],
+    now: datetime,
+    update_fields: Sequence[str] = ("price", "market_cap"),
+) -> int:
+    """
+    追加原始价格点 coin_id -> (价格, 市值)，需在 supply_info 写入之后调用（coin_key 取 supply_info.id）
+
+    同一币种同一秒的重复写入按 update_fields 覆盖
+    """
+    if not points:
+        return 0
+    coin_keys: Dict[str, int] = {}
+    for chunk in chunked(list(points)):
+        coin_keys.update(session.query(SupplyInfo.coin_id, SupplyInfo.id).filter(SupplyInfo.coin_id.in_(chunk)).all())
+    ts = int(now.timestamp())
+    rows = [
+        {"coin_key": coin_keys[coin_id], "ts": ts, "price": price, "market_cap": market_cap}
+        for coin_id, (price, market_cap) in points.items()
+        if coin_id in coin_keys and (price is not None or market_cap is not None)
+    ]
+    return bulk_upsert(
+        session, PricePoint, rows,
+        index_elements=["coin_key", "ts"],
+        update_fields=list(update_fields)
+    )
+
+
+def rollup(
+    coin_key: np.ndarray, ts: np.ndarray,
+    open_: np.ndarray, high: np.ndarray, low: np.ndarray, close: np.ndarray,
+    market_cap: np.ndarray, points: np.ndarray, interval_seconds: int
+) -> Dict[str, np.ndarray]:
+    """
+    把价格点或更细粒度的 K 线按 (coin_key, 桶) 汇总为 OHLC
+
+    开盘取桶内最早一条的 open，收盘取最晚一条的 close，市值取最晚的非空值
+    """
+    bucket = ts // interval_seconds * interval_seconds
+    order = np.lexsort((ts, bucket, coin_key))
+    coin_key, bucket = coin_key[order], bucket[order]
+    open_, high, low, close = open_[order], high[order], low[order], close[order]
+    market_cap, points = market_cap[order], points[order]
+
+    boundary = np.ones(len(order), dtype=bool)
+    boundary[1:] = (coin_key[1:] != coin_key[:-1]) | (bucket[1:] != bucket[:-1])
+    starts = np.flatnonzero(boundary)
+    ends = np.append(starts[1:], len(order)) - 1
+
+    # 每组最后一个非空市值的位置，组内没有时小于组起点
+    valid_index = np.where(np.isnan(market_cap), -1, np.arange(len(order)))
+    last_valid = np.maximum.accumulate(valid_index)[ends]
+    group_market_cap = np.where(last_valid >= starts, market_cap[np.maximum(last_valid, 0)], np.nan)
+    return {
+        "coin_key": coin_key[starts],
+        "bucket_start": bucket[starts],
+        "open": open_[starts],
+        "high": np.maximum.reduceat(high, starts),
+        "low": np.minimum.reduceat(low, starts),
+        "close": close[ends],
+        "market_cap": group_market_cap,
+        "points": np.add.reduceat(points, starts),
+    }
+
+
+class PriceHistoryCompactor:
+    """
+    价格历史压缩任务
+
+    - 依次把原始点汇总为 1m，1m 汇总为 1h，1h 汇总为 1d，按 (coin_key, interval_seconds, bucket_start) upsert
+    - 每个粒度从上次水位的前一个桶开始重算（当前未结束的桶每次都会被覆盖）
+    - 汇总后按保留期删除过期的原始点与 K 线
+    在线程中运行，每次使用独立的 Session
+    """
+
+    def __init__(self, session_factory: Callable[[], Session]):
+        self.session_factory = session_factory
+
+    def run(self, now: Optional[float] = None) -> Dict[str, int]:
+        now = int(now if now is not None else time.time())
+        started = time.perf_counter()
+        result: Dict[str, int] = {}
+        session = self.session_factory()
+        try:
+            for interval_seconds, source_interval in ROLLUP_SOURCES:
+                result[f"bars_{interval_seconds}"] = self._compact(session, interval_seconds, source_interval, now)
+            result["deleted"] = self._apply_retention(session, now)
+        finally:
+            session.close()
+        logger.info(f"Price history compacted in {time.perf_counter() - started:.2f}s: {result}")
+        return result
+
+    def _compact(self, session: Session, interval_seconds: int, source_interval: int, now: int) -> int:
+        watermark = session.get(PriceHistoryWatermark, interval_seconds)
+        if watermark is not None:
+            start = watermark.compacted_until - interval_seconds
+        else:
+            first = self._first_source_ts(session, source_interval)
+            if first is None:
+                return 0
+            start = first // interval_seconds * interval_seconds
+
+        columns = self._load_source(session, source_interval, start)
+        written = 0
+        if len(columns[0]):
+            bars = rollup(*columns, interval_seconds)
+            rows = [
+                {
+                    "coin_key": coin_key, "interval_seconds": interval_seconds, "bucket_start": bucket_start,
+                    "open": open_, "high": high, "low": low, "close": close,
+                    "market_cap": None if market_cap != market_cap else market_cap,
+                    "points": points,
+                }
+                for coin_key, bucket_start, open_, high, low, close, market_cap, points in zip(
+                    *(bars[key].tolist() for key in
+                      ("coin_key", "bucket_start", "open", "high", "low", "close", "market_cap", "points"))
+                )
+            ]
+            written = bulk_upsert(
+                session, PriceBar, rows,
+                index_elements=["coin_key", "interval_seconds", "bucket_start"],
+                update_fields=["open", "high", "low", "close", "market_cap", "points"]
+            )
+
+        bulk_upsert(
+            session, PriceHistoryWatermark,
+            [{"interval_seconds": interval_seconds, "compacted_until": now // interval_seconds * interval_seconds}],
+            index_elements=["interval_seconds"],
+            update_fields=["compacted_until"]
+        )
+        return written
+
+    @staticmethod
+    def _first_source_ts(session: Session, source_interval: int) -> Optional[int]:
+        if source_interval == 0:
+            return session.query(func.min(PricePoint.ts)).scalar()
+        return session.query(func.min(PriceBar.bucket_start)).filter(
+            PriceBar.interval_seconds == source_interval
+        ).scalar()
+
+    @staticmethod
+    def _load_source(session: Session, source_interval: int, start: int) -> List[np.ndarray]:
+        """读取来源数据为列：coin_key, ts, open, high, low, close, market_cap, points（空值转为 NaN）"""
+        if source_interval == 0:
+            rows = session.query(PricePoint.coin_key, PricePoint.ts, PricePoint.price, PricePoint.market_cap).filter(
+                PricePoint.ts >= start, PricePoint.price.is_not(None)
+            ).all()
+            coin_key, ts, price, market_cap = (list(column) for column in zip(*rows)) if rows else ([],) * 4
+            price = np.asarray(price, dtype=np.float64)
+            return [
+                np.asarray(coin_key, dtype=np.int64), np.asarray(ts, dtype=np.int64),
+                price, price, price, price,
+                np.asarray(market_cap, dtype=np.float64), np.ones(len(rows), dtype=np.int64),
+            ]
+
+        rows = session.query(
+            PriceBar.coin_key, PriceBar.bucket_start, PriceBar.open, PriceBar.high, PriceBar.low, PriceBar.close,
+            PriceBar.market_cap, PriceBar.points
+        ).filter(PriceBar.interval_seconds == source_interval, PriceBar.bucket_start >= start).all()
+        columns = [list(column) for column in zip(*rows)] if rows else [[]] * 8
+        return [
+            np.asarray(columns[0], dtype=np.int64), np.asarray(columns[1], dtype=np.int64),
+            *(np.asarray(column, dtype=np.float64) for column in columns[2:7]),
+            np.asarray(columns[7], dtype=np.int64),
+        ]
+
+    @staticmethod
+    def _apply_retention(session: Session, now: int) -> int:
+        deleted = 0
+        for interval_seconds in (0,) + tuple(interval for interval, _ in ROLLUP_SOURCES):
+            days = retention_days(interval_seconds)
+            if not days:
+                continue
+            cutoff = now - days * 86400
+            if interval_seconds == 0:
+                stmt = delete(PricePoint).where(PricePoint.ts < cutoff)
+            else:
+                stmt = delete(PriceBar).where(PriceBar.interval_seconds == interval_seconds, PriceBar.bucket_start < cutoff)
+            deleted += session.execute(stmt).rowcount or 0
+            session.commit()
+        return deleted
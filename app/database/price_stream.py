@@ -0,0 +1,236 @@
+from dataclasses import dataclass, field
+from sqlalchemy.orm import Session
+from app.database.models import SupplyInfo
+from app.database.bulk import bulk_upsert
+from app.database.ticker_matcher import (
+    MARKET_EXCHANGE_MAPS, TickerColumns, TickerMatcher,
+    add_venue_row, aggregate_prices, ticker_values, upsert_venue_prices
+)
+from app.crawlers.clients import CrawlerClients
+from app.cache import invalidate_coin_prices
+from app.config import settings
+from typing import Any, AsyncContextManager, Callable, Dict, List, Optional, Set, Tuple
+from contextlib import nullcontext
+from datetime import datetime, timezone
+import numpy as np
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class PriceStreamMetrics:
+    """行情推送统计"""
+    updates: int = 0
+    flushes: int = 0
+    rows_written: int = 0
+    reconnects: int = 0
+    last_flush_seconds: float = 0.0
+    # (交易所, 市场类型) -> 订阅的交易对数，断线期间不在其中
+    subscriptions: Dict[str, int] = field(default_factory=dict)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "updates": self.updates,
+            "flushes": self.flushes,
+            "rows_written": self.rows_written,
+            "reconnects": self.reconnects,
+            "last_flush_seconds": round(self.last_flush_seconds, 3),
+            "subscriptions": dict(self.subscriptions),
+        }
+
+
+class PriceStreamer:
+    """
+    ccxt.pro 行情推送
+
+    - 每个 (交易所, 现货/合约) 一个 watch_tickers 循环，断线后指数退避重连
+    - 推送只覆盖内存中该交易对的最新价格（合并），不排队，写库慢时不会堆积
+    - 每 PRICE_STREAM_FLUSH_SECONDS 把有更新的币种按交易对聚合（中位数剔除偏离 + VWAP）写入 supply_info，
+      各交易所的最新行情写入 venue_prices，并失效价格缓存；超过 PRICE_STREAM_STALE_SECONDS 未更新的交易对不参与聚合
+    - 写库时持有 write_lock（任务编排器的写锁），与定时任务的写入阶段串行
+    - 交易对映射每 PRICE_STREAM_PAIR_RELOAD_MINUTES 重新加载
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        clients: CrawlerClients,
+        write_lock: Optional[Callable[[], AsyncContextManager]] = None
+    ):
+        self.session_factory = session_factory
+        self.clients = clients
+        self.write_lock = write_lock or nullcontext
+        self.metrics = PriceStreamMetrics()
+        self._matcher: Optional[TickerMatcher] = None
+        self._matcher_loaded_at = 0.0
+        # coin_id -> {(交易所, 交易对): (价格, 成交额, 买一, 卖一, 接收时间)}
+        self._venues: Dict[str, Dict[Tuple[str, str], Tuple[float, float, Optional[float], Optional[float], float]]] = {}
+        self._dirty: Set[str] = set()
+        self._tasks: List[asyncio.Task] = []
+        self._matcher_lock = asyncio.Lock()
+
+    def start(self):
+        """启动推送与定时写入任务"""
+        if self._tasks:
+            return
+        for exchange_id in self.clients.ccxt_clients:
+            for market_type, exchange_map in MARKET_EXCHANGE_MAPS.items():
+                if exchange_id in exchange_map:
+                    self._tasks.append(asyncio.create_task(self._watch(exchange_id, market_type)))
+        self._tasks.append(asyncio.create_task(self._flush_loop()))
+        logger.info(f"Price stream started with {len(self._tasks) - 1} subscriptions")
+
+    async def stop(self):
+        """停止全部任务，并写入最后一批价格"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error(f"Final price stream flush failed: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {"coins": len(self._venues), "pending": len(self._dirty), **self.metrics.as_dict()}
+
+    # ------------------------------------------
+    # 订阅
+    # ------------------------------------------
+    async def _matcher_for_stream(self) -> TickerMatcher:
+        """交易对映射，过期后在线程中重新加载（各订阅共用一份）"""
+        async with self._matcher_lock:
+            if self._matcher is None or time.monotonic() - self._matcher_loaded_at > settings.PRICE_STREAM_PAIR_RELOAD_MINUTES * 60:
+                self._matcher = await asyncio.to_thread(self._load_matcher)
+                self._matcher_loaded_at = time.monotonic()
+        return self._matcher
+
+    def _load_matcher(self) -> TickerMatcher:
+        session = self.session_factory()
+        try:
+            return TickerMatcher(session).load()
+        finally:
+            session.close()
+
+    async def _watch(self, exchange_id: str, market_type: str):
+        client = self.clients.ccxt_clients[exchange_id]
+        name = f"{exchange_id}:{market_type}"
+        backoff = settings.PRICE_STREAM_RECONNECT_BASE_SECONDS
+        matcher, symbols = None, []
+        while True:
+            try:
+                current = await self._matcher_for_stream()
+                if current is not matcher:
+                    matcher = current
+                    await client.load_markets()
+                    symbols = [
+                        symbol for symbol, market in client.markets.items()
+                        if market.get('type') == market_type and matcher.match(exchange_id, symbol) is not None
+                    ]
+                    logger.info(f"Price stream {name}: subscribing {len(symbols)} symbols")
+                if not symbols:
+                    await asyncio.sleep(settings.PRICE_STREAM_PAIR_RELOAD_MINUTES * 60)
+                    continue
+                tickers = await client.watch_tickers(symbols)
+                self.metrics.subscriptions[name] = len(symbols)
+                backoff = settings.PRICE_STREAM_RECONNECT_BASE_SECONDS
+                self._on_tickers(matcher, exchange_id, tickers)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.metrics.reconnects += 1
+                self.metrics.subscriptions.pop(name, None)
+                logger.warning(f"Price stream {name} disconnected, retrying in {backoff:.1f}s: {e}")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, settings.PRICE_STREAM_RECONNECT_MAX_SECONDS)
+
+    def _on_tickers(self, matcher: TickerMatcher, exchange_id: str, tickers: dict):
+        """合并推送：只保留每个交易对的最新价格"""
+        received_at = time.monotonic()
+        for symbol, ticker in tickers.items():
+            index = matcher.match(exchange_id, symbol)
+            if index is None:
+                continue
+            values = ticker_values(ticker, settings.PRICE_STREAM_USE_MID)
+            if values is None:
+                continue
+            coin_id = matcher.coin_ids[index]
+            self._venues.setdefault(coin_id, {})[(exchange_id, symbol)] = (
+                *values, ticker.get('bid'), ticker.get('ask'), received_at
+            )
+            self._dirty.add(coin_id)
+            self.metrics.updates += 1
+
+    # ------------------------------------------
+    # 写入
+    # ------------------------------------------
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(settings.PRICE_STREAM_FLUSH_SECONDS)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Price stream flush failed: {e}")
+
+    async def flush(self) -> int:
+        """聚合有更新的币种并写库，返回写入的行数"""
+        dirty, self._dirty = self._dirty, set()
+        if not dirty:
+            return 0
+        started = time.perf_counter()
+        cutoff = time.monotonic() - settings.PRICE_STREAM_STALE_SECONDS
+        coin_ids = list(dirty)
+        coin_index, prices, volumes = [], [], []
+        venue_rows: dict = {}
+        for index, coin_id in enumerate(coin_ids):
+            venues = self._venues.get(coin_id, {})
+            for (exchange_id, symbol), (price, volume, bid, ask, received_at) in list(venues.items()):
+                if received_at < cutoff:
+                    del venues[(exchange_id, symbol)]
+                    continue
+                coin_index.append(index)
+                prices.append(price)
+                volumes.append(volume)
+                add_venue_row(venue_rows, exchange_id, symbol, coin_id, price, volume, bid, ask)
+            if not venues:
+                self._venues.pop(coin_id, None)
+        columns = TickerColumns(
+            np.asarray(coin_index, dtype=np.int64),
+            np.asarray(prices, dtype=np.float64),
+            np.asarray(volumes, dtype=np.float64),
+        )
+        indexes, aggregated = aggregate_prices(columns, settings.CCXT_PRICE_MAX_DEVIATION)
+        price_map = {coin_ids[index]: price for index, price in zip(indexes.tolist(), aggregated.tolist())}
+        if not price_map:
+            return 0
+
+        try:
+            async with self.write_lock():
+                written = await asyncio.to_thread(self._write, price_map, list(venue_rows.values()))
+        except Exception:
+            # 写入失败的币种留到下一次写入
+            self._dirty |= price_map.keys()
+            raise
+        # 价格缓存只在事件循环线程中访问
+        invalidate_coin_prices(price_map.keys())
+        self.metrics.flushes += 1
+        self.metrics.rows_written += written
+        self.metrics.last_flush_seconds = time.perf_counter() - started
+        return written
+
+    def _write(self, price_map: Dict[str, float], venue_rows: List[dict]) -> int:
+        now = datetime.now(timezone.utc)
+        session = self.session_factory()
+        try:
+            written = bulk_upsert(
+                session, SupplyInfo,
+                [{"coin_id": coin_id, "cached_price": price, "updated_at": now} for coin_id, price in price_map.items()],
+                index_elements=["coin_id"],
+                update_fields=["cached_price", "updated_at"]
+            )
+            upsert_venue_prices(session, venue_rows, now)
+            return written
+        finally:
+            session.close()
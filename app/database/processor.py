@@ -1,32 +1,66 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
-from app.database.models import Coin, SupplyInfo, OnChainInfo, ExchangeSpot, ExchangeContract, Holder, CoinHolding, \
-    ARKMEntity, Label
-from app.crawlers.coingecko import CoingeckoCrawler
-from app.crawlers.coinmarketcap import CoinMarketCapCrawler
-from app.crawlers.arkm import ArkmCrawler
+from sqlmodel import Session as SQLModelSession
+from app.database.models import Coin, SupplyInfo, OnChainInfo, ExchangeSpot, ExchangeContract
+from app.database.bulk import bulk_upsert, chunked
+from app.database.resolver import CoinResolver
+from app.database.ticker_matcher import TickerColumns, TickerMatcher, aggregate_prices, upsert_venue_prices
+from app.database.price_history import PriceHistoryCompactor, record_price_points
+from app.database.metrics import PriceRefreshMetrics
+from app.database.holders import HolderIngestionWorker
+from app.cache import invalidate_coin_prices
+from app.search_index import search_index
+from app.database.fts import refresh_coin_search
+from app.crawlers.clients import CrawlerClients, get_crawler_clients
+from app.crawlers.coingecko import TickerPagesTruncated
 from app.const import TOP_SPOT_EXCHANGES, TOP_SWAP_EXCHANGES, UPDATE_HOLDERS_EXCHANGES, ORIGIN_TOKEN_WRAPPED_TOKEN_MAP, \
     CCXT_SPOT_EXCHANGE_TO_CMC_EXCHANGE, CCXT_SWAP_EXCHANGE_TO_CMC_EXCHANGE,CMC_SPOT_EXCHANGE_TO_CCXT_EXCHANGE,CMC_SWAP_EXCHANGE_TO_CCXT_EXCHANGE
-import ccxt.pro as ccxt
+from app.config import settings
 import asyncio
 import logging
+import time
 from datetime import datetime, timezone
+from contextlib import asynccontextmanager, nullcontext
+from functools import partial
+from typing import AsyncContextManager, Callable, Optional
 logger = logging.getLogger(__name__)
 
 class DataProcessor:
-    def __init__(self, db_session: Session):
+    def __init__(
+        self,
+        db_session: Session,
+        clients: Optional[CrawlerClients] = None,
+        write_lock: Optional[Callable[[], AsyncContextManager]] = None
+    ):
         self.db = db_session
-        self.cg_crawler = CoingeckoCrawler()
-        self.cmc_crawler = CoinMarketCapCrawler()
-        self.arkm_crawler = ArkmCrawler()
-        # 判断操作系统是否为Windows，Windows下需要设置代理，否则会报错
-        import os
-        ccxt_config = {}
-        if os.name == 'nt':
-            ccxt_config = {'https_proxy':'http://127.0.0.1:7890'}
-        self.ccxt_clients_map = {
-            exchange: getattr(ccxt, exchange)(ccxt_config) for exchange in ['okx', 'binance', 'coinbase', 'bybit', 'gateio', 'kucoin']
-        }
+        # 爬虫/ccxt 客户端为进程级共享，构造 DataProcessor 不再创建任何 SDK 客户端
+        self.clients = clients or get_crawler_clients()
+        # 写库阶段持有的锁（由任务编排器提供），抓取阶段不持有
+        self.write_lock = write_lock or nullcontext
+        self.cg_crawler = self.clients.cg_crawler
+        self.cmc_crawler = self.clients.cmc_crawler
+        self.arkm_crawler = self.clients.arkm_crawler
+        self.last_price_refresh_metrics: PriceRefreshMetrics = None
+        self.last_ccxt_refresh_metrics: PriceRefreshMetrics = None
+
+    def _release(self):
+        """结束当前事务，把连接还给连接池；之后的 await（网络抓取、等待写锁）期间不占用写连接"""
+        self.db.commit()
+
+    @asynccontextmanager
+    async def _write_phase(self):
+        """写库阶段：先归还读事务的连接再等待写锁，写完提交后释放写锁"""
+        self._release()
+        async with self.write_lock():
+            try:
+                yield
+                self._release()
+            except Exception:
+                self.db.rollback()
+                raise
+
+    @property
+    def ccxt_clients_map(self):
+        return self.clients.ccxt_clients
 
     async def initialize_ccxt_clients(self):
         """初始化CCXT客户端"""
@@ -42,177 +76,314 @@ class DataProcessor:
 
     async def initialize_coins_data(self):
         """初始化币种数据"""
-        # 获取币种列表并保存到数据库
+        # 获取币种列表
         coins_list = await self.cg_crawler.fetch_coins_list()
+        if not coins_list:
+            logger.warning("Empty coins list, skip initializing coins")
+            return 0
+
+        now = datetime.now(timezone.utc)
+        # 一次性加载已有币种ID，与抓取结果做差集
+        existing_ids = {row[0] for row in self.db.query(Coin.id).all()}
+        new_coins: dict[str, dict] = {}
+        fetched_ids = set()
+        # (chain_name, contract_address) -> coin_id
+        fetched_contracts: dict[tuple[str, str], str] = {}
         for item in coins_list:
-            # 检查币种是否已存在
-            existing_coin = self.db.query(Coin).filter(Coin.id == item.id).first()
-            if not existing_coin:
-                coin = Coin(
-                    id=item.id,
-                    symbol=item.symbol.upper(),
-                    name=item.name
-                )
-                self.db.add(coin)
-
-                # 保存链上信息
-                for chain_name, contract_address in item.platforms.items():
-                    if contract_address:
-                        on_chain_info = OnChainInfo(
-                            coin_id=item.id,
-                            chain_name=chain_name,
-                            contract_address=contract_address
-                        )
-                        self.db.add(on_chain_info)
-
-        self.db.commit()
-        logger.info(f"Initialized {len(coins_list)} coins")
+            fetched_ids.add(item.id)
+            if item.id not in existing_ids and item.id not in new_coins:
+                new_coins[item.id] = {
+                    "id": item.id,
+                    "symbol": item.symbol.upper(),
+                    "name": item.name,
+                    "created_at": now,
+                    "updated_at": now,
+                }
+            for chain_name, contract_address in (item.platforms or {}).items():
+                if contract_address:
+                    fetched_contracts[(chain_name, contract_address)] = item.id
+
+        # 已有链上信息：(chain_name, contract_address) -> (id, coin_id)
+        existing_contracts = {
+            (row.chain_name, row.contract_address): (row.id, row.coin_id)
+            for row in self.db.query(
+                OnChainInfo.id, OnChainInfo.chain_name, OnChainInfo.contract_address, OnChainInfo.coin_id
+            ).all()
+        }
+        # 新增或归属币种发生变化的合约
+        changed_contracts = [
+            {
+                "coin_id": coin_id,
+                "chain_name": chain_name,
+                "contract_address": contract_address,
+                "updated_at": now,
+            }
+            for (chain_name, contract_address), coin_id in fetched_contracts.items()
+            if existing_contracts.get((chain_name, contract_address), (None, None))[1] != coin_id
+        ]
+        # 仍在列表中的币种已下线的合约
+        stale_contracts = {
+            key: contract_id
+            for key, (contract_id, coin_id) in existing_contracts.items()
+            if coin_id in fetched_ids and key not in fetched_contracts
+        }
+        stale_contract_ids = list(stale_contracts.values())
+
+        async with self._write_phase():
+            inserted = bulk_upsert(self.db, Coin, list(new_coins.values()), index_elements=["id"])
+            upserted = bulk_upsert(
+                self.db, OnChainInfo, changed_contracts,
+                index_elements=["chain_name", "contract_address"],
+                update_fields=["coin_id", "updated_at"]
+            )
+            for chunk in chunked(stale_contract_ids):
+                self.db.query(OnChainInfo).filter(OnChainInfo.id.in_(chunk)).delete(synchronize_session=False)
+                self.db.commit()
+
+            # 增量更新搜索索引
+            refresh_coin_search(self.db, new_coins.keys())
+        search_index.upsert_coins((coin["id"], coin["symbol"], coin["name"]) for coin in new_coins.values())
+        search_index.add_sources(
+            (("contract", row["chain_name"], row["contract_address"]), row["coin_id"], row["contract_address"])
+            for row in changed_contracts
+        )
+        search_index.remove_sources(("contract",) + key for key in stale_contracts)
+
+        logger.info(
+            f"Initialized {len(coins_list)} coins: {inserted} new coins, "
+            f"{upserted} contracts upserted, {len(stale_contract_ids)} contracts removed"
+        )
+        return inserted + upserted + len(stale_contract_ids)
 
     async def update_market_data(self):
         """更新市场数据"""
         # 获取CMC数据
-        cmc_data = self.cmc_crawler.fetch_listings_latest()
+        cmc_data = await self.cmc_crawler.fetch_listings_latest()
+        if not cmc_data:
+            logger.warning("Empty CMC listings, skip updating market data")
+            return 0
+
+        # 一次性构建 (symbol, name) -> coin_id 与 coin_id -> SupplyInfo 映射
+        resolver = CoinResolver(self.db).load()
+        now = datetime.now(timezone.utc)
 
+        supply_rows: dict[str, dict] = {}
+        rows_by_slug: dict[str, dict] = {}
         for item in cmc_data:
-            coin_id = item.get('slug')
-            cmc_symbol = item.get('symbol')
-            cmc_name = item.get('name')
-            # 查找匹配的币种
-            coin = self.db.query(Coin).filter(
-                Coin.symbol == cmc_symbol.upper(),
-                Coin.name == cmc_name
-            ).first()
-            if coin:
-                # 更新供应信息
-                supply_info = self.db.query(SupplyInfo).filter(
-                    SupplyInfo.coin_id == coin.id
-                ).first()
-                if not supply_info:
-                    supply_info = SupplyInfo(coin_id=coin.id)
-                    self.db.add(supply_info)
-
-                supply_info.total_supply = item.get('total_supply')
-                supply_info.circulating_supply = item.get('circulating_supply')
-                supply_info.market_cap = item.get('quote', {}).get('USD', {}).get('market_cap')
-                supply_info.cached_price = item.get('quote', {}).get('USD', {}).get('price')
-
-                # 处理包装代币供应信息
-                if coin_id in ORIGIN_TOKEN_WRAPPED_TOKEN_MAP:
-                    for wrapped_token_id in ORIGIN_TOKEN_WRAPPED_TOKEN_MAP[coin_id]:
-                        wrapped_coin = self.db.query(Coin).filter(Coin.id == wrapped_token_id).first()
-                        if wrapped_coin:
-                            # 为包装代币单独创建 SupplyInfo 或复用已有 SupplyInfo 并复制数据
-                            wrapped_supply_info = self.db.query(SupplyInfo).filter(
-                                SupplyInfo.coin_id == wrapped_coin.id
-                            ).first()
-
-                            if not wrapped_supply_info:
-                                wrapped_supply_info = SupplyInfo(coin_id=wrapped_coin.id)
-                                self.db.add(wrapped_supply_info)
-
-                            # 将原始代币的数据拷贝到包装代币
-                            wrapped_supply_info.total_supply = supply_info.total_supply
-                            wrapped_supply_info.circulating_supply = supply_info.circulating_supply
-                            wrapped_supply_info.market_cap = supply_info.market_cap
-                            wrapped_supply_info.cached_price = supply_info.cached_price
-        self.db.commit()
-        logger.info("Market data updated")
+            coin_id = resolver.resolve(item.get('symbol'), item.get('name'))
+            if not coin_id:
+                continue
+            usd_quote = item.get('quote', {}).get('USD', {})
+            row = {
+                "coin_id": coin_id,
+                "total_supply": item.get('total_supply'),
+                "circulating_supply": item.get('circulating_supply'),
+                "market_cap": usd_quote.get('market_cap'),
+                "cached_price": usd_quote.get('price'),
+                "updated_at": now,
+            }
+            supply_rows[coin_id] = row
+            rows_by_slug[item.get('slug')] = row
+
+        # 包装代币：原始代币与已知币种集合求交集后直接拷贝供应信息
+        for origin_slug in ORIGIN_TOKEN_WRAPPED_TOKEN_MAP.keys() & rows_by_slug.keys():
+            for wrapped_token_id in resolver.coin_ids.intersection(ORIGIN_TOKEN_WRAPPED_TOKEN_MAP[origin_slug]):
+                supply_rows[wrapped_token_id] = {**rows_by_slug[origin_slug], "coin_id": wrapped_token_id}
+
+        async with self._write_phase():
+            written = bulk_upsert(
+                self.db, SupplyInfo, list(supply_rows.values()),
+                index_elements=["coin_id"],
+                update_fields=["total_supply", "circulating_supply", "market_cap", "cached_price", "updated_at"]
+            )
+            record_price_points(
+                self.db, {coin_id: (row["cached_price"], row["market_cap"]) for coin_id, row in supply_rows.items()}, now
+            )
+        invalidate_coin_prices(supply_rows.keys())
+        search_index.update_market_caps({coin_id: row["market_cap"] for coin_id, row in supply_rows.items()})
+        created = len(supply_rows.keys() - resolver.supply_by_coin.keys())
+        logger.info(f"Market data updated: {written - created} supply rows updated, {created} created")
+        return written
 
     async def update_exchange_data(self):
         """更新交易所数据"""
-        # 更新现货交易所
-        for exchange_id in TOP_SPOT_EXCHANGES:
-            tickers = await self.cg_crawler.fetch_exchange_tickers(exchange_id)
-            for ticker in tickers:
-                if hasattr(ticker, 'base') and hasattr(ticker, 'target'):
-                    base = ticker.base.upper()
-                    target = ticker.target.upper()
-                    coin_id = ticker.coin_id
-
-                    if target in ['USDT', 'USDC']:
-                        # 查找币种
-                        coin = self.db.query(Coin).filter(Coin.id == coin_id).first()
-                        if coin:
-                            # 检查是否已存在该交易对
-                            existing_spot = self.db.query(ExchangeSpot).filter(
-                                ExchangeSpot.coin_id == coin_id,
-                                ExchangeSpot.exchange_name == exchange_id,
-                                ExchangeSpot.spot_name == f"{base}/{target}"
-                            ).first()
-
-                            if not existing_spot:
-                                spot = ExchangeSpot(
-                                    coin_id=coin_id,
-                                    exchange_name=exchange_id,
-                                    spot_name=f"{base}/{target}"
-                                )
-                                self.db.add(spot)
-
-        # 更新合约交易所
-        for exchange_id in TOP_SWAP_EXCHANGES:
-            tickers = await self.cg_crawler.fetch_derivatives_tickers(exchange_id)
-            for ticker in tickers:
-                if hasattr(ticker, 'base') and hasattr(ticker, 'target'):
-                    base = ticker.base.upper()
-                    target = ticker.target.upper()
-                    coin_id = ticker.coin_id
-
-                    if target in ['USDT', 'USDC']:
-                        # 查找币种
-                        coin = self.db.query(Coin).filter(Coin.id == coin_id).first()
-                        if coin:
-                            # 检查是否已存在该交易对
-                            existing_contract = self.db.query(ExchangeContract).filter(
-                                ExchangeContract.coin_id == coin_id,
-                                ExchangeContract.exchange_name == exchange_id,
-                                ExchangeContract.contract_name == f"{base}/{target}"
-                            ).first()
-
-                            if not existing_contract:
-                                contract = ExchangeContract(
-                                    coin_id=coin_id,
-                                    exchange_name=exchange_id,
-                                    contract_name=f"{base}/{target}"
-                                )
-                                self.db.add(contract)
-
-        self.db.commit()
-        logger.info("Exchange data updated")
+        # 生产者：并发抓取全部交易所（受信号量限制），逐页写入队列
+        queue: asyncio.Queue = asyncio.Queue(
+            maxsize=settings.EXCHANGE_FETCH_CONCURRENCY * settings.CG_TICKER_PAGE_CONCURRENCY
+        )
+        semaphore = asyncio.Semaphore(settings.EXCHANGE_FETCH_CONCURRENCY)
+
+        async def produce(market_type: str, exchange_id: str, iter_pages):
+            complete = False
+            try:
+                async with semaphore:
+                    async for tickers in iter_pages(exchange_id):
+                        await queue.put((market_type, exchange_id, tickers, False))
+                complete = True
+            except TickerPagesTruncated as e:
+                # 已抓取的交易对照常写入，但该交易所不参与下架清理
+                logger.warning(f"{e}, skip delisting for this exchange")
+            except Exception as e:
+                logger.error(f"Error fetching {market_type} tickers for {exchange_id}: {e}")
+            finally:
+                # 结束标记：tickers 为 None，complete 表示该交易所是否完整抓取
+                await queue.put((market_type, exchange_id, None, complete))
+
+        producers = [
+            asyncio.create_task(produce('spot', exchange_id, self.cg_crawler.iter_exchange_tickers))
+            for exchange_id in TOP_SPOT_EXCHANGES
+        ] + [
+            asyncio.create_task(produce('swap', exchange_id, self.cg_crawler.iter_derivatives_tickers))
+            for exchange_id in TOP_SWAP_EXCHANGES
+        ]
+
+        # 消费者：逐页标准化交易对并按 (exchange, pair) 去重
+        known_coin_ids = {row[0] for row in self.db.query(Coin.id).all()}
+        self._release()
+        pairs: dict[str, dict[tuple[str, str], str]] = {'spot': {}, 'swap': {}}
+        seen_exchanges: dict[str, set[str]] = {'spot': set(), 'swap': set()}
+        fetched_exchanges: dict[str, set[str]] = {'spot': set(), 'swap': set()}
+        remaining = len(producers)
+        while remaining:
+            market_type, exchange_id, tickers, complete = await queue.get()
+            if tickers is None:
+                remaining -= 1
+                # 只有完整抓取且有数据的交易所才参与下架清理
+                if complete and exchange_id in seen_exchanges[market_type]:
+                    fetched_exchanges[market_type].add(exchange_id)
+                continue
+            seen_exchanges[market_type].add(exchange_id)
+            for coin_id, pair_name in self._normalize_tickers(tickers):
+                if coin_id in known_coin_ids:
+                    pairs[market_type][(exchange_id, pair_name)] = coin_id
+        await asyncio.gather(*producers)
+
+        now = datetime.now(timezone.utc)
+        async with self._write_phase():
+            spot_count = self._sync_exchange_pairs(
+                ExchangeSpot, ExchangeSpot.spot_name, pairs['spot'], fetched_exchanges['spot'], now
+            )
+            contract_count = self._sync_exchange_pairs(
+                ExchangeContract, ExchangeContract.contract_name, pairs['swap'], fetched_exchanges['swap'], now
+            )
+        logger.info(f"Exchange data updated: {spot_count} spot pairs, {contract_count} contract pairs")
+        return spot_count + contract_count
+
+    @staticmethod
+    def _normalize_tickers(tickers):
+        """标准化交易对，仅保留 USDT/USDC 计价，返回 (coin_id, 'BASE/TARGET')"""
+        for ticker in tickers:
+            if hasattr(ticker, 'base') and hasattr(ticker, 'target'):
+                target = ticker.target.upper()
+                if target in ['USDT', 'USDC'] and ticker.coin_id:
+                    yield ticker.coin_id, f"{ticker.base.upper()}/{target}"
+
+    def _sync_exchange_pairs(self, model, pair_column, pairs: dict, fetched_exchanges: set, now: datetime) -> int:
+        """批量写入交易对，并删除已抓取交易所中下架的交易对"""
+        pair_field = pair_column.key
+        rows = [
+            {
+                "coin_id": coin_id,
+                "exchange_name": exchange_id,
+                pair_field: pair_name,
+                "updated_at": now,
+            }
+            for (exchange_id, pair_name), coin_id in pairs.items()
+        ]
+        # 写入前的交易对 -> (id, coin_id)，用于找出交易对集合发生变化的币种
+        exchanges = fetched_exchanges | {exchange_id for exchange_id, _ in pairs}
+        existing = {
+            (row.exchange_name, row[2]): (row.id, row.coin_id)
+            for chunk in chunked(sorted(exchanges))
+            for row in self.db.query(model.id, model.coin_id, model.exchange_name, pair_column).filter(
+                model.exchange_name.in_(chunk)
+            ).all()
+        }
+        written = bulk_upsert(
+            self.db, model, rows,
+            index_elements=["exchange_name", pair_field],
+            update_fields=["coin_id", "updated_at"]
+        )
+        search_index.add_sources(
+            ((model.__tablename__, exchange_id, pair_name), coin_id, pair_name)
+            for (exchange_id, pair_name), coin_id in pairs.items()
+        )
+        changed_coin_ids = set()
+        for key, coin_id in pairs.items():
+            previous = existing.get(key)
+            if previous is None or previous[1] != coin_id:
+                changed_coin_ids.add(coin_id)
+                if previous is not None:
+                    changed_coin_ids.add(previous[1])
+
+        delisted = {
+            key: (pair_id, coin_id)
+            for key, (pair_id, coin_id) in existing.items()
+            if key[0] in fetched_exchanges and key not in pairs
+        }
+        delisted_ids = [pair_id for pair_id, _ in delisted.values()]
+        for chunk in chunked(delisted_ids):
+            self.db.query(model).filter(model.id.in_(chunk)).delete(synchronize_session=False)
+            self.db.commit()
+        changed_coin_ids.update(coin_id for _, coin_id in delisted.values())
+        search_index.remove_sources((model.__tablename__,) + key for key in delisted)
+        refresh_coin_search(self.db, changed_coin_ids)
+        if delisted_ids:
+            logger.info(f"Removed {len(delisted_ids)} delisted pairs from {model.__tablename__}")
+        return written
 
     async def update_exchange_prices_with_cg(self):
         """获取所有交易所合约交易对价格"""
         # 获取全部具有上线交易所现货及合约的coin_id，然后查询数据库，更新现货及合约价格信息
-        all_coin_ids = self.db.query(Coin.id).filter(
+        started = time.perf_counter()
+        metrics = PriceRefreshMetrics()
+        all_coin_ids = [row[0] for row in self.db.query(Coin.id).filter(
             Coin.id.in_(
                 self.db.query(ExchangeSpot.coin_id).union(
                     self.db.query(ExchangeContract.coin_id)
                 ).distinct()
             )
-        ).all()
-        print(f"Total coin ids to update by CoinGecko: {len(all_coin_ids)}")
-        # 分批次查询以避免超出http get请求uri长度限制
-        batch_size = 100
-        for i in range(0, len(all_coin_ids), batch_size):
-            batch_coin_ids = [coin_id[0] for coin_id in all_coin_ids[i:i + batch_size]]
-            response = await self.cg_crawler.fetch_simple_price(
-                ids=batch_coin_ids
-            )
+        ).all()]
+        self._release()
+        logger.info(f"Total coin ids to update by CoinGecko: {len(all_coin_ids)}")
+
+        # 分批次查询以避免超出http get请求uri长度限制，批次并发发出，请求速率由爬虫限流器控制
+        batch_size = settings.CG_SIMPLE_PRICE_BATCH_SIZE
+        batches = [all_coin_ids[i:i + batch_size] for i in range(0, len(all_coin_ids), batch_size)]
+        metrics.batches = len(batches)
+        semaphore = asyncio.Semaphore(settings.CG_SIMPLE_PRICE_CONCURRENCY)
+        price_map: dict[str, float] = {}
+
+        async def fetch_batch(batch_coin_ids: list[str]):
+            async with semaphore:
+                batch_started = time.perf_counter()
+                response = await self.cg_crawler.fetch_simple_price(ids=batch_coin_ids)
+                metrics.batch_latencies.append(time.perf_counter() - batch_started)
+            if not response:
+                metrics.failed_batches += 1
+                return
             for coin_id, price_info in response.items():
                 if hasattr(price_info, 'usd'):
-                    supply_info = self.db.query(SupplyInfo).filter(
-                        SupplyInfo.coin_id == coin_id
-                    ).first()
-
-                    if not supply_info:
-                        supply_info = SupplyInfo(coin_id=coin_id)
-                        self.db.add(supply_info)
+                    price_map[coin_id] = price_info.usd
 
-                    # 直接更新对象属性
-                    supply_info.cached_price = price_info.usd
-                    supply_info.updated_at = datetime.now(timezone.utc)
+        await asyncio.gather(*(fetch_batch(batch) for batch in batches))
 
-            self.db.commit()
-            self.db.flush()
+        now = datetime.now(timezone.utc)
+        async with self._write_phase():
+            metrics.rows_updated = bulk_upsert(
+                self.db, SupplyInfo,
+                [{"coin_id": coin_id, "cached_price": price, "updated_at": now} for coin_id, price in price_map.items()],
+                index_elements=["coin_id"],
+                update_fields=["cached_price", "updated_at"]
+            )
+            record_price_points(
+                self.db, {coin_id: (price, None) for coin_id, price in price_map.items()}, now, update_fields=["price"]
+            )
+        invalidate_coin_prices(price_map.keys())
+        metrics.elapsed_seconds = time.perf_counter() - started
+        self.last_price_refresh_metrics = metrics
+        logger.info(f"CoinGecko price refresh finished: {metrics.as_dict()}")
+        return metrics.rows_updated
 
     async def update_top_project_token_holders(self):
         """更新顶级项目代币持有者"""
@@ -234,179 +405,84 @@ class DataProcessor:
             coin_ids.add(coin.coin_id)
         for coin in contract_coins:
             coin_ids.add(coin.coin_id)
-
-        # 为每个符合条件的代币获取持有者数据
-        for coin_id in coin_ids:
-            try:
-                await self.fetch_token_holders(coin_id, use_sync=True)
-            except Exception as e:
-                logger.error(f"Failed to update holders for coin {coin_id}: {str(e)}")
-                continue
-
-        logger.info(f"Updated token holders for {len(coin_ids)} top project tokens")
+        self._release()
+
+        # 并发获取持有者数据，按批次写入
+        written = await self._holder_worker().run(coin_ids)
+        logger.info(f"Updated token holders for {len(coin_ids)} top project tokens, {written} holdings changed")
+        return written
+
+    def _holder_worker(self) -> HolderIngestionWorker:
+        # 每批次使用同一引擎上的独立 Session，不与调度任务共享 self.db
+        return HolderIngestionWorker(
+            session_factory=partial(SQLModelSession, self.db.get_bind()),
+            arkm_crawler=self.arkm_crawler,
+            write_lock=self.write_lock
+        )
+
+    async def compact_price_history(self):
+        """把原始价格点汇总为 1m/1h/1d K线并清理过期数据，在线程中使用独立 Session 运行"""
+        compactor = PriceHistoryCompactor(session_factory=partial(SQLModelSession, self.db.get_bind()))
+        async with self._write_phase():
+            result = await asyncio.to_thread(compactor.run)
+        return sum(result.values())
 
     async def update_most_popular_wrapped_token_holders(self):
         """更新热门包装代币持有者"""
         pass
 
     async def update_exchange_prices_with_ccxt(self):
-        """获取所有交易所合约交易对价格"""
-        # 并发获取全部交易所的现货及合约价格，然后查询数据库，更新现货及合约价格信息
-        tasks = []
-        exchange_names = []
-
-        # 收集所有交易所的查询任务
-        for exchange_id, ccxt_client in self.ccxt_clients_map.items():
-            if hasattr(ccxt_client, 'fetch_tickers'):
-                tasks.append(ccxt_client.fetch_tickers())
-                exchange_names.append(exchange_id)
-
-        # 并发执行所有查询
-        results = await asyncio.gather(*tasks, return_exceptions=True)
-
-        # 处理查询结果
-        price_map = {}  # 用于存储每个币种的最新价格
-
-        for exchange_name, result in zip(exchange_names, results):
-            if isinstance(result, Exception):
-                logger.error(f"Error fetching tickers from {exchange_name}: {result}")
-                continue
-
-            # 遍历交易对
-            for symbol, ticker in result.items():
-                try:
-                    # 解析交易对符号 (例如: BTC/USDT)
-                    if '/' in symbol:
-                        try:
-                            base_quote = symbol.split(':')
-                            if len(base_quote) == 2:
-                                base, quote = base_quote[0].split('/')
-                            else:
-                                base, quote = symbol.split('/')
-                        except:
-                            raise ValueError(f"Invalid symbol format: {symbol}")
-                        if base.upper() == "ALT" or base.upper() == 'ALTCOIN':
-                            pass
-                        if quote in ['USDT', 'USDC']:  # 只处理稳定币计价的交易对
-                            # 查找对应的币种
-                            coin = self.db.query(Coin).join(ExchangeSpot, Coin.id == ExchangeSpot.coin_id).filter(
-                                and_(
-                                    ExchangeSpot.exchange_name == CCXT_SPOT_EXCHANGE_TO_CMC_EXCHANGE.get(exchange_name),
-                                    ExchangeSpot.spot_name == (base + '/' + quote).upper()
-                                )
-                            ).union(
-                                self.db.query(Coin).join(ExchangeContract, Coin.id == ExchangeContract.coin_id).filter(
-                                    and_(
-                                        ExchangeContract.exchange_name == CCXT_SWAP_EXCHANGE_TO_CMC_EXCHANGE.get(
-                                            exchange_name),
-                                        ExchangeContract.contract_name == (base + '/' + quote).upper()
-                                    )
-                                )
-                            ).first()
-
-                            if coin and not coin.symbol.startswith('1'):
-                                # 检查该币种是否在现货或合约交易所中
-                                spot_exists = self.db.query(ExchangeSpot).filter(
-                                    ExchangeSpot.coin_id == coin.id
-                                ).first()
-
-                                contract_exists = self.db.query(ExchangeContract).filter(
-                                    ExchangeContract.coin_id == coin.id
-                                ).first()
-                                if spot_exists or contract_exists:
-                                    price = ticker.get('last') or ticker.get('close')
-                                    if price:
-                                        # 如果没有记录过该币种的价格或有更新的价格，则记录
-                                        if coin.id not in price_map or price > price_map[coin.id]:
-                                            price_map[coin.id] = price
-
-                except Exception as e:
-                    logger.error(f"Error processing ticker {symbol} from {exchange_name}: {e}")
-                    continue
-
-        # 更新数据库中的价格信息
-        updated_count = 0
-        for coin_id, price in price_map.items():
-            # 查找SupplyInfo记录
-            supply_info = self.db.query(SupplyInfo).filter(
-                SupplyInfo.coin_id == coin_id
-            ).first()
-
-            # 如果没有SupplyInfo记录但该币种在交易所中有交易，则创建新的SupplyInfo记录
-            if not supply_info:
-                # 检查该币种是否在现货或合约交易所中
-                spot_exists = self.db.query(ExchangeSpot).filter(
-                    ExchangeSpot.coin_id == coin_id
-                ).first()
-
-                contract_exists = self.db.query(ExchangeContract).filter(
-                    ExchangeContract.coin_id == coin_id
-                ).first()
-
-                if spot_exists or contract_exists:
-                    supply_info = SupplyInfo(coin_id=coin_id)
-                    self.db.add(supply_info)
-
-            # 更新价格信息
-            if supply_info:
-                supply_info.cached_price = price
-                updated_count += 1
-
-        self.db.commit()
-        self.db.flush()
-        logger.info(f"Updated prices for {updated_count} coins")
-
-
-    async def fetch_token_holders(self, token_id: str, use_sync: bool = False):
+        """获取所有交易所现货及合约交易对价格"""
+        # 并发获取各交易所全部行情，按预加载的交易对映射匹配币种，按币种聚合后批量写入
+        started = time.perf_counter()
+        metrics = PriceRefreshMetrics()
+        matcher = TickerMatcher(self.db).load()
+        self._release()
+        exchange_ids = [
+            exchange_id for exchange_id, ccxt_client in self.ccxt_clients_map.items()
+            if ccxt_client.has.get('fetchTickers')
+            and (exchange_id in CCXT_SPOT_EXCHANGE_TO_CMC_EXCHANGE or exchange_id in CCXT_SWAP_EXCHANGE_TO_CMC_EXCHANGE)
+        ]
+        metrics.batches = len(exchange_ids)
+        venue_rows: dict = {}
+
+        async def fetch_tickers(exchange_id: str) -> Optional[TickerColumns]:
+            fetch_started = time.perf_counter()
+            try:
+                tickers = await self.ccxt_clients_map[exchange_id].fetch_tickers()
+            except Exception as e:
+                metrics.failed_batches += 1
+                logger.error(f"Error fetching tickers from {exchange_id}: {e}")
+                return None
+            finally:
+                metrics.batch_latencies.append(time.perf_counter() - fetch_started)
+            return matcher.normalize(exchange_id, tickers, venue_rows=venue_rows)
+
+        results = await asyncio.gather(*(fetch_tickers(exchange_id) for exchange_id in exchange_ids))
+        columns = TickerColumns.concat([result for result in results if result is not None])
+        coin_indexes, prices = aggregate_prices(columns, settings.CCXT_PRICE_MAX_DEVIATION)
+
+        now = datetime.now(timezone.utc)
+        price_map = {matcher.coin_ids[index]: price for index, price in zip(coin_indexes.tolist(), prices.tolist())}
+        async with self._write_phase():
+            metrics.rows_updated = bulk_upsert(
+                self.db, SupplyInfo,
+                [{"coin_id": coin_id, "cached_price": price, "updated_at": now} for coin_id, price in price_map.items()],
+                index_elements=["coin_id"],
+                update_fields=["cached_price", "updated_at"]
+            )
+            venue_count = upsert_venue_prices(self.db, venue_rows.values(), now)
+        invalidate_coin_prices(price_map.keys())
+        metrics.elapsed_seconds = time.perf_counter() - started
+        self.last_ccxt_refresh_metrics = metrics
+        logger.info(
+            f"CCXT price refresh finished: {len(columns)} tickers matched, "
+            f"{len(price_map)} coins priced, {venue_count} venue prices, {metrics.as_dict()}"
+        )
+        return metrics.rows_updated
+
+    async def fetch_token_holders(self, token_id: str):
         """获取代币持有者数据"""
-        response = await self.arkm_crawler.fetch_token_holders(token_id, use_sync)
-        if not response:
-            return
-
-        address_top_holders = response.get('addressTopHolders', {})
-        for chain, holders in address_top_holders.items():
-            if not holders:
-                continue
-
-            for holder_data in holders:
-                address_info = holder_data.get('address', {})
-                if address_info:
-                    address = address_info.get('address', '')
-                    label_info = address_info.get('arkhamLabel', {})
-                    entity_info = address_info.get('arkhamEntity', {})
-
-                    # 查找或创建持有者
-                    holder = self.db.query(Holder).filter(Holder.address == address).first()
-                    if not holder:
-                        holder = Holder(
-                            address=address,
-                            entity=ARKMEntity(
-                                name=entity_info.get('name', ''),
-                                type=entity_info.get('type', '')
-                            ),
-                            label=Label(
-                                name=label_info.get('name', ''),
-                                chain_type=chain
-                            ),
-                            chain_type=chain
-                        )
-                        self.db.add(holder)
-                        self.db.flush()  # 获取holder.id
-
-                    # 更新持有信息
-                    holding = self.db.query(CoinHolding).filter(
-                        CoinHolding.coin_id == token_id,
-                        CoinHolding.holder_id == holder.id
-                    ).first()
-
-                    if not holding:
-                        holding = CoinHolding(
-                            coin_id=token_id,
-                            holder_id=holder.id,
-                            balance=holder_data.get('balance'),
-                            usd_value=holder_data.get('usd')
-                        )
-                        self.db.add(holding)
-
-        self.db.commit()
+        written = await self._holder_worker().run([token_id], resume=False)
         logger.info(f"Holders data updated for token {token_id}")
+        return written
@@ -1,21 +1,30 @@
 from app.database.models import (
     Coin, SupplyInfo, OnChainInfo,
     ExchangeSpot, ExchangeContract,
-    Holder, CoinHolding
+    Holder, CoinHolding, PriceBar
 )
-from typing import List, Optional
+from typing import List, Optional, Sequence, Tuple
+from sqlalchemy import literal_column, null, or_, String, tuple_, union_all
 from sqlmodel import select, Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 from sqlalchemy.orm import selectinload
+from app.database.fts import coin_search, coin_search_rank, to_match_query
 
 
-class CoinRepository:
-    def __init__(self, db_session: Session):
-        self.db = db_session
+class CoinQueries:
+    """
+    查询语句构建
+
+    只负责生成 select 语句，同步的 CoinRepository 与异步的 AsyncCoinRepository 共用
+    """
 
     # ------------------------------------------
     # 通用的完全优化查询基底（所有查询用它）
     # ------------------------------------------
-    def _base_query(self):
+    def _base_query(self, with_relations: bool = True):
+        # GraphQL 通过 DataLoader 按需加载关联，不需要预加载
+        if not with_relations:
+            return select(Coin)
         return (
             select(Coin)
             .options(
@@ -23,20 +32,22 @@ class CoinRepository:
                 selectinload(Coin.on_chain_infos),
                 selectinload(Coin.exchange_spots),
                 selectinload(Coin.exchange_contracts),
-                selectinload(Coin.holdings).selectinload(CoinHolding.holder).selectinload(Holder.label)
+                selectinload(Coin.holdings).selectinload(CoinHolding.holder).selectinload(Holder.label),
+                selectinload(Coin.holdings).selectinload(CoinHolding.holder).selectinload(Holder.entity)
             )
         )
 
     # ------------------------------------------
-    def get_coins_with_filters(
+    def _coins_query(
         self,
         coin_id: Optional[str] = None,
         symbol: Optional[str] = None,
         name: Optional[str] = None,
         contract_address: Optional[str] = None,
-        limit: int = 50, offset: int = 0
+        limit: Optional[int] = 50, offset: Optional[int] = 0,
+        with_relations: bool = True
     ):
-        query = self._base_query()
+        query = self._base_query(with_relations)
 
         if coin_id:
             query = query.where(Coin.id == coin_id)
@@ -53,22 +64,18 @@ class CoinRepository:
                 .where(OnChainInfo.contract_address == contract_address)
             )
 
-        query = query.offset(offset).limit(limit)
+        return query.offset(offset).limit(limit)
 
-        return self.db.exec(query).all()
-
-    def get_exchange_spots_with_filters(
+    def _exchange_spots_query(
         self,
         coin_id: Optional[str] = None,
         exchange_id: Optional[str] = None,
-        limit: int = 50, offset: int = 0
+        limit: Optional[int] = 50, offset: Optional[int] = 0,
+        with_relations: bool = True
     ):
-        query = (
-            select(ExchangeSpot)
-            .options(
-                selectinload(ExchangeSpot.coin)
-            )
-        )
+        query = select(ExchangeSpot)
+        if with_relations:
+            query = query.options(selectinload(ExchangeSpot.coin))
 
         if coin_id:
             query = query.where(ExchangeSpot.coin_id == coin_id)
@@ -76,22 +83,18 @@ class CoinRepository:
         if exchange_id:
             query = query.where(ExchangeSpot.exchange_name == exchange_id)
 
-        query = query.offset(offset).limit(limit)
+        return query.offset(offset).limit(limit)
 
-        return self.db.exec(query).all()
-
-    def get_exchange_contracts_with_filters(
+    def _exchange_contracts_query(
         self,
         coin_id: Optional[str] = None,
         exchange_id: Optional[str] = None,
-        limit: int = 50, offset: int = 0
+        limit: Optional[int] = 50, offset: Optional[int] = 0,
+        with_relations: bool = True
     ):
-        query = (
-            select(ExchangeContract)
-            .options(
-                selectinload(ExchangeContract.coin)
-            )
-        )
+        query = select(ExchangeContract)
+        if with_relations:
+            query = query.options(selectinload(ExchangeContract.coin))
 
         if coin_id:
             query = query.where(ExchangeContract.coin_id == coin_id)
@@ -99,25 +102,24 @@ class CoinRepository:
         if exchange_id:
             query = query.where(ExchangeContract.exchange_name == exchange_id)
 
-        query = query.offset(offset).limit(limit)
-
-        return self.db.exec(query).all()
+        return query.offset(offset).limit(limit)
 
-    def get_coin_holding_with_filters(
+    def _coin_holdings_query(
         self,
         chain_type: Optional[str] = None,
         coin_id: Optional[str] = None,
-        limit: int = 50, offset: int = 0
+        limit: Optional[int] = 50, offset: Optional[int] = 0,
+        with_relations: bool = True
     ):
-
         query = (
             select(CoinHolding)
             .join(CoinHolding.holder)  # join Holder 表
-            .options(
+        )
+        if with_relations:
+            query = query.options(
                 selectinload(CoinHolding.coin),  # 预加载 coin
                 selectinload(CoinHolding.holder)  # 预加载 holder
             )
-        )
 
         if chain_type:
             query = query.where(Holder.chain_type == chain_type)
@@ -125,31 +127,140 @@ class CoinRepository:
         if coin_id:
             query = query.where(CoinHolding.coin_id == coin_id)
 
-        query = query.offset(offset).limit(limit)
-
-        return self.db.exec(query).all()
+        return query.offset(offset).limit(limit)
 
-    def get_holder_with_filters(
+    def _holder_query(
         self,
         holder_address: str,
         chain_type: Optional[str] = None,
+        with_relations: bool = True
     ):
-        query = (
-            select(Holder)
-            .options(
+        query = select(Holder)
+        if with_relations:
+            query = query.options(
                 selectinload(Holder.coin_holdings).selectinload(CoinHolding.coin)
             )
-        )
 
         if chain_type:
             query = query.where(Holder.chain_type == chain_type)
 
-        query = query.where(Holder.address == holder_address)
+        return query.where(Holder.address == holder_address)
+
+    def _prices_query(
+        self,
+        coin_ids: Sequence[str] = (),
+        contracts: Sequence[Tuple[str, str]] = ()
+    ):
+        """
+        批量价格查询：按币种ID查 supply_info，按 (chain, address) 经 on_chain_info 查 supply_info，
+        两部分 UNION ALL 为一条语句，均走唯一索引，不加载其他关联
+        """
+        parts = []
+        if coin_ids:
+            parts.append(
+                select(
+                    SupplyInfo.coin_id, SupplyInfo.cached_price, SupplyInfo.updated_at,
+                    null().cast(String).label("chain_name"), null().cast(String).label("contract_address"),
+                ).where(SupplyInfo.coin_id.in_(list(coin_ids)))
+            )
+        if contracts:
+            parts.append(
+                select(
+                    SupplyInfo.coin_id, SupplyInfo.cached_price, SupplyInfo.updated_at,
+                    OnChainInfo.chain_name, OnChainInfo.contract_address,
+                )
+                .join(OnChainInfo, OnChainInfo.coin_id == SupplyInfo.coin_id)
+                .where(tuple_(OnChainInfo.chain_name, OnChainInfo.contract_address).in_(list(contracts)))
+            )
+        if not parts:
+            return None
+        return parts[0] if len(parts) == 1 else union_all(*parts)
+
+    def _search_coins_query(self, search_term: str, limit: int, dialect_name: str):
+        """
+        全文搜索币种：SQLite 下查 FTS5 表 coin_search，按 bm25 与市值排序；
+        其他数据库回退为 symbol/name 的前缀匹配，按市值排序
+        """
+        market_cap_order = (SupplyInfo.market_cap.is_(None), SupplyInfo.market_cap.desc())
+        query = select(Coin).outerjoin(SupplyInfo, SupplyInfo.coin_id == Coin.id)
+        if dialect_name == "sqlite":
+            match_query = to_match_query(search_term)
+            if match_query is None:
+                return None
+            return (
+                query.join(coin_search, coin_search.c.coin_id == Coin.id)
+                .where(literal_column("coin_search").match(match_query))
+                .order_by(coin_search_rank(), *market_cap_order)
+                .limit(limit)
+            )
 
-        return self.db.exec(query).first()
+        search_term = search_term.strip()
+        if not search_term:
+            return None
+        return (
+            query.where(or_(Coin.symbol.ilike(f"{search_term}%"), Coin.name.ilike(f"{search_term}%")))
+            .order_by(*market_cap_order)
+            .limit(limit)
+        )
 
-    def get_all_coins_by_exchange_spot_id(self, exchange_spot_id: str):
-        query = (
+    # ------------------------------------------
+    # 游标分页（keyset）：按排序键做范围条件，任意页的代价与第一页相同
+    # 返回按顺序执行的查询段，前一段不足一页时继续取下一段
+    # ------------------------------------------
+    def _coins_page_queries(self, after: Optional[Tuple] = None, **filters):
+        """币种按主键升序，游标为 (id,)"""
+        query = self._coins_query(limit=None, offset=None, with_relations=False, **filters)
+        if after is not None:
+            query = query.where(Coin.id > after[0])
+        return [query.order_by(Coin.id)]
+
+    def _exchange_pairs_page_queries(self, model, after: Optional[Tuple] = None, **filters):
+        """交易对按主键升序，游标为 (id,)"""
+        if model is ExchangeSpot:
+            query = self._exchange_spots_query(limit=None, offset=None, with_relations=False, **filters)
+        else:
+            query = self._exchange_contracts_query(limit=None, offset=None, with_relations=False, **filters)
+        if after is not None:
+            query = query.where(model.id > after[0])
+        return [query.order_by(model.id)]
+
+    def _coin_holdings_page_queries(self, after: Optional[Tuple] = None, **filters):
+        """
+        持仓按 (usd_value, id) 降序，游标为 (usd_value, id)
+
+        usd_value 为空的持仓排在最后；各数据库对 NULL 的排序不同，
+        因此拆成非空与为空两段，每段都能走 (coin_id, usd_value, id) / (usd_value, id) 索引
+        """
+        query = self._coin_holdings_query(limit=None, offset=None, with_relations=False, **filters)
+        valued = query.where(CoinHolding.usd_value.is_not(None))
+        unvalued = query.where(CoinHolding.usd_value.is_(None))
+        if after is not None:
+            usd_value, holding_id = after
+            if usd_value is None:
+                return [unvalued.where(CoinHolding.id < holding_id).order_by(CoinHolding.id.desc())]
+            valued = valued.where(tuple_(CoinHolding.usd_value, CoinHolding.id) < (usd_value, holding_id))
+        return [
+            valued.order_by(CoinHolding.usd_value.desc(), CoinHolding.id.desc()),
+            unvalued.order_by(CoinHolding.id.desc()),
+        ]
+
+    def _price_history_query(self, coin_id: str, interval_seconds: int, start: int, end: int, limit: int):
+        """K线查询：按 coin_id 取 supply_info.id，在 price_bars 主键上做范围扫描"""
+        return (
+            select(PriceBar)
+            .join(SupplyInfo, SupplyInfo.id == PriceBar.coin_key)
+            .where(
+                SupplyInfo.coin_id == coin_id,
+                PriceBar.interval_seconds == interval_seconds,
+                PriceBar.bucket_start >= start,
+                PriceBar.bucket_start <= end,
+            )
+            .order_by(PriceBar.bucket_start)
+            .limit(limit)
+        )
+
+    def _exchange_spot_by_id_query(self, exchange_spot_id: str):
+        return (
             select(ExchangeSpot)
             .options(
                 selectinload(ExchangeSpot.coin)
@@ -157,4 +268,179 @@ class CoinRepository:
             .where(ExchangeSpot.id == exchange_spot_id)
         )
 
-        return self.db.exec(query).all()
\ No newline at end of file
+
+class CoinRepository(CoinQueries):
+    def __init__(self, db_session: Session):
+        self.db = db_session
+
+    def get_coins_with_filters(
+        self,
+        coin_id: Optional[str] = None,
+        symbol: Optional[str] = None,
+        name: Optional[str] = None,
+        contract_address: Optional[str] = None,
+        limit: int = 50, offset: int = 0,
+        with_relations: bool = True
+    ) -> List[Coin]:
+        return self.db.exec(self._coins_query(coin_id, symbol, name, contract_address, limit, offset, with_relations)).all()
+
+    def get_exchange_spots_with_filters(
+        self,
+        coin_id: Optional[str] = None,
+        exchange_id: Optional[str] = None,
+        limit: int = 50, offset: int = 0,
+        with_relations: bool = True
+    ) -> List[ExchangeSpot]:
+        return self.db.exec(self._exchange_spots_query(coin_id, exchange_id, limit, offset, with_relations)).all()
+
+    def get_exchange_contracts_with_filters(
+        self,
+        coin_id: Optional[str] = None,
+        exchange_id: Optional[str] = None,
+        limit: int = 50, offset: int = 0,
+        with_relations: bool = True
+    ) -> List[ExchangeContract]:
+        return self.db.exec(self._exchange_contracts_query(coin_id, exchange_id, limit, offset, with_relations)).all()
+
+    def get_coin_holding_with_filters(
+        self,
+        chain_type: Optional[str] = None,
+        coin_id: Optional[str] = None,
+        limit: int = 50, offset: int = 0,
+        with_relations: bool = True
+    ) -> List[CoinHolding]:
+        return self.db.exec(self._coin_holdings_query(chain_type, coin_id, limit, offset, with_relations)).all()
+
+    def get_holder_with_filters(
+        self,
+        holder_address: str,
+        chain_type: Optional[str] = None,
+        with_relations: bool = True
+    ) -> Optional[Holder]:
+        return self.db.exec(self._holder_query(holder_address, chain_type, with_relations)).first()
+
+    def get_all_coins_by_exchange_spot_id(self, exchange_spot_id: str) -> List[ExchangeSpot]:
+        return self.db.exec(self._exchange_spot_by_id_query(exchange_spot_id)).all()
+
+    def get_prices(self, coin_ids: Sequence[str] = (), contracts: Sequence[Tuple[str, str]] = ()):
+        query = self._prices_query(coin_ids, contracts)
+        return self.db.execute(query).all() if query is not None else []
+
+    def search_coins(self, search_term: str, limit: int = 20) -> List[Coin]:
+        query = self._search_coins_query(search_term, limit, self.db.get_bind().dialect.name)
+        return self.db.exec(query).all() if query is not None else []
+
+    def get_price_history(self, coin_id: str, interval_seconds: int, start: int, end: int, limit: int) -> List[PriceBar]:
+        return self.db.exec(self._price_history_query(coin_id, interval_seconds, start, end, limit)).all()
+
+    def _fetch_page(self, queries, first: int) -> list:
+        """依次执行查询段，最多返回 first + 1 行（多出的一行用于判断是否还有下一页）"""
+        rows = []
+        for query in queries:
+            rows.extend(self.db.exec(query.limit(first + 1 - len(rows))).all())
+            if len(rows) > first:
+                break
+        return rows
+
+    def get_coins_page(self, first: int, after: Optional[Tuple] = None, **filters) -> List[Coin]:
+        return self._fetch_page(self._coins_page_queries(after, **filters), first)
+
+    def get_exchange_spots_page(self, first: int, after: Optional[Tuple] = None, **filters) -> List[ExchangeSpot]:
+        return self._fetch_page(self._exchange_pairs_page_queries(ExchangeSpot, after, **filters), first)
+
+    def get_exchange_contracts_page(self, first: int, after: Optional[Tuple] = None, **filters) -> List[ExchangeContract]:
+        return self._fetch_page(self._exchange_pairs_page_queries(ExchangeContract, after, **filters), first)
+
+    def get_coin_holdings_page(self, first: int, after: Optional[Tuple] = None, **filters) -> List[CoinHolding]:
+        return self._fetch_page(self._coin_holdings_page_queries(after, **filters), first)
+
+
+class AsyncCoinRepository(CoinQueries):
+    """
+    CoinRepository 的异步版本，供 GraphQL 解析器使用
+
+    AsyncSession 不能被多个协程同时使用，调用方需保证一个会话同一时间只执行一个查询
+    """
+
+    def __init__(self, db_session: AsyncSession):
+        self.db = db_session
+
+    async def get_coins_with_filters(
+        self,
+        coin_id: Optional[str] = None,
+        symbol: Optional[str] = None,
+        name: Optional[str] = None,
+        contract_address: Optional[str] = None,
+        limit: int = 50, offset: int = 0,
+        with_relations: bool = True
+    ) -> List[Coin]:
+        return (await self.db.exec(self._coins_query(coin_id, symbol, name, contract_address, limit, offset, with_relations))).all()
+
+    async def get_exchange_spots_with_filters(
+        self,
+        coin_id: Optional[str] = None,
+        exchange_id: Optional[str] = None,
+        limit: int = 50, offset: int = 0,
+        with_relations: bool = True
+    ) -> List[ExchangeSpot]:
+        return (await self.db.exec(self._exchange_spots_query(coin_id, exchange_id, limit, offset, with_relations))).all()
+
+    async def get_exchange_contracts_with_filters(
+        self,
+        coin_id: Optional[str] = None,
+        exchange_id: Optional[str] = None,
+        limit: int = 50, offset: int = 0,
+        with_relations: bool = True
+    ) -> List[ExchangeContract]:
+        return (await self.db.exec(self._exchange_contracts_query(coin_id, exchange_id, limit, offset, with_relations))).all()
+
+    async def get_coin_holding_with_filters(
+        self,
+        chain_type: Optional[str] = None,
+        coin_id: Optional[str] = None,
+        limit: int = 50, offset: int = 0,
+        with_relations: bool = True
+    ) -> List[CoinHolding]:
+        return (await self.db.exec(self._coin_holdings_query(chain_type, coin_id, limit, offset, with_relations))).all()
+
+    async def get_holder_with_filters(
+        self,
+        holder_address: str,
+        chain_type: Optional[str] = None,
+        with_relations: bool = True
+    ) -> Optional[Holder]:
+        return (await self.db.exec(self._holder_query(holder_address, chain_type, with_relations))).first()
+
+    async def get_all_coins_by_exchange_spot_id(self, exchange_spot_id: str) -> List[ExchangeSpot]:
+        return (await self.db.exec(self._exchange_spot_by_id_query(exchange_spot_id))).all()
+
+    async def get_prices(self, coin_ids: Sequence[str] = (), contracts: Sequence[Tuple[str, str]] = ()):
+        query = self._prices_query(coin_ids, contracts)
+        return (await self.db.execute(query)).all() if query is not None else []
+
+    async def search_coins(self, search_term: str, limit: int = 20) -> List[Coin]:
+        query = self._search_coins_query(search_term, limit, self.db.bind.dialect.name)
+        return (await self.db.exec(query)).all() if query is not None else []
+
+    async def get_price_history(self, coin_id: str, interval_seconds: int, start: int, end: int, limit: int) -> List[PriceBar]:
+        return (await self.db.exec(self._price_history_query(coin_id, interval_seconds, start, end, limit))).all()
+
+    async def _fetch_page(self, queries, first: int) -> list:
+        rows = []
+        for query in queries:
+            rows.extend((await self.db.exec(query.limit(first + 1 - len(rows)))).all())
+            if len(rows) > first:
+                break
+        return rows
+
+    async def get_coins_page(self, first: int, after: Optional[Tuple] = None, **filters) -> List[Coin]:
+        return await self._fetch_page(self._coins_page_queries(after, **filters), first)
+
+    async def get_exchange_spots_page(self, first: int, after: Optional[Tuple] = None, **filters) -> List[ExchangeSpot]:
+        return await self._fetch_page(self._exchange_pairs_page_queries(ExchangeSpot, after, **filters), first)
+
+    async def get_exchange_contracts_page(self, first: int, after: Optional[Tuple] = None, **filters) -> List[ExchangeContract]:
+        return await self._fetch_page(self._exchange_pairs_page_queries(ExchangeContract, after, **filters), first)
+
+    async def get_coin_holdings_page(self, first: int, after: Optional[Tuple] = None, **filters) -> List[CoinHolding]:
+        return await self._fetch_page(self._coin_holdings_page_queries(after, **filters), first)
@@ -0,0 +1,36 @@
+from sqlalchemy.orm import Session
+from app.database.models import Coin, SupplyInfo
+from typing import Dict, Optional, Set, Tuple
+
+
+class CoinResolver:
+    """
+    币种解析器
+
+    一次查询构建 (symbol, name) -> coin_id 和 coin_id -> SupplyInfo 映射，
+    替代逐条 symbol/name 查询
+    """
+
+    def __init__(self, db_session: Session):
+        self.db = db_session
+        self.coin_ids: Set[str] = set()
+        self.coin_by_symbol_name: Dict[Tuple[str, str], str] = {}
+        self.supply_by_coin: Dict[str, SupplyInfo] = {}
+
+    def load(self) -> "CoinResolver":
+        """加载映射"""
+        for coin_id, symbol, name in self.db.query(Coin.id, Coin.symbol, Coin.name).all():
+            self.coin_ids.add(coin_id)
+            # 同名同符号的币种保留第一个，与原先 .first() 的行为一致
+            self.coin_by_symbol_name.setdefault((symbol, name), coin_id)
+
+        self.supply_by_coin = {
+            supply_info.coin_id: supply_info for supply_info in self.db.query(SupplyInfo).all()
+        }
+        return self
+
+    def resolve(self, symbol: Optional[str], name: Optional[str]) -> Optional[str]:
+        """根据 symbol/name 解析币种ID"""
+        if not symbol:
+            return None
+        return self.coin_by_symbol_name.get((symbol.upper(), name))
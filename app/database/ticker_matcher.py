@@ -0,0 +1,209 @@
+from dataclasses import dataclass
+from sqlalchemy import not_
+from sqlalchemy.orm import Session
+from app.database.models import Coin, ExchangeSpot, ExchangeContract, VenuePrice
+from app.database.bulk import bulk_upsert
+from app.const import CCXT_SPOT_EXCHANGE_TO_CMC_EXCHANGE, CCXT_SWAP_EXCHANGE_TO_CMC_EXCHANGE
+from typing import Dict, Iterable, List, Optional, Tuple
+from datetime import datetime
+import numpy as np
+
+# 只处理稳定币计价的交易对
+QUOTE_CURRENCIES = ('USDT', 'USDC')
+
+# 市场类型 -> (ccxt 交易所 -> CMC 交易所) 映射
+MARKET_EXCHANGE_MAPS = {
+    'spot': CCXT_SPOT_EXCHANGE_TO_CMC_EXCHANGE,
+    'swap': CCXT_SWAP_EXCHANGE_TO_CMC_EXCHANGE,
+}
+
+
+def parse_symbol(exchange_id: str, symbol: str) -> Optional[Tuple[str, str, str]]:
+    """
+    ccxt 交易对符号 -> (CMC 交易所, 市场类型, 'BASE/QUOTE')
+    现货为 BASE/QUOTE，合约为 BASE/QUOTE:SETTLE；非稳定币计价或交易所无映射时返回 None
+    """
+    market, _, settle = symbol.partition(':')
+    base, _, quote = market.upper().partition('/')
+    if quote not in QUOTE_CURRENCIES:
+        return None
+    market_type = 'swap' if settle else 'spot'
+    exchange_name = MARKET_EXCHANGE_MAPS[market_type].get(exchange_id)
+    if exchange_name is None:
+        return None
+    return exchange_name, market_type, f"{base}/{quote}"
+
+
+@dataclass
+class TickerColumns:
+    """标准化后的行情，按列存放：币种下标、价格、计价币成交额"""
+    coin_index: np.ndarray
+    price: np.ndarray
+    volume: np.ndarray
+
+    @classmethod
+    def concat(cls, columns: List["TickerColumns"]) -> "TickerColumns":
+        if not columns:
+            return cls(np.empty(0, dtype=np.int64), np.empty(0), np.empty(0))
+        return cls(
+            np.concatenate([c.coin_index for c in columns]),
+            np.concatenate([c.price for c in columns]),
+            np.concatenate([c.volume for c in columns]),
+        )
+
+    def __len__(self):
+        return len(self.coin_index)
+
+
+class TickerMatcher:
+    """
+    ccxt 行情与币种的匹配器
+
+    一次查询构建 (cmc_exchange, 'BASE/QUOTE') -> 币种下标映射（现货与合约交易对共用），
+    替代逐个行情的交易对联表查询
+    """
+
+    def __init__(self, db_session: Session):
+        self.db = db_session
+        self.coin_ids: List[str] = []
+        self.pair_to_index: Dict[Tuple[str, str], int] = {}
+
+    def load(self) -> "TickerMatcher":
+        """加载映射"""
+        coin_index: Dict[str, int] = {}
+        exchanges = {
+            ExchangeSpot: set(CCXT_SPOT_EXCHANGE_TO_CMC_EXCHANGE.values()),
+            ExchangeContract: set(CCXT_SWAP_EXCHANGE_TO_CMC_EXCHANGE.values()),
+        }
+        for model, pair_column in ((ExchangeSpot, ExchangeSpot.spot_name), (ExchangeContract, ExchangeContract.contract_name)):
+            rows = self.db.query(model.exchange_name, pair_column, model.coin_id).join(
+                Coin, Coin.id == model.coin_id
+            ).filter(
+                model.exchange_name.in_(exchanges[model]),
+                # 1000PEPE 等按倍数计价的币种价格不可直接使用
+                not_(Coin.symbol.startswith('1'))
+            ).all()
+            for exchange_name, pair_name, coin_id in rows:
+                index = coin_index.setdefault(coin_id, len(coin_index))
+                self.pair_to_index.setdefault((exchange_name, pair_name), index)
+        self.coin_ids = list(coin_index)
+        return self
+
+    def match(self, exchange_id: str, symbol: str) -> Optional[int]:
+        """ccxt 交易对符号 -> 币种下标"""
+        parsed = parse_symbol(exchange_id, symbol)
+        if parsed is None:
+            return None
+        exchange_name, _, pair_name = parsed
+        return self.pair_to_index.get((exchange_name, pair_name))
+
+    def normalize(
+        self, exchange_id: str, tickers: dict, use_mid: bool = False, venue_rows: Optional[dict] = None
+    ) -> TickerColumns:
+        """
+        把一个交易所的 fetch_tickers 结果转换为列数据，未匹配到币种的行情直接丢弃
+
+        传入 venue_rows 时同时收集 venue_prices 的行（见 add_venue_row）
+        """
+        coin_index, prices, volumes = [], [], []
+        for symbol, ticker in tickers.items():
+            index = self.match(exchange_id, symbol)
+            if index is None:
+                continue
+            values = ticker_values(ticker, use_mid)
+            if values is None:
+                continue
+            coin_index.append(index)
+            prices.append(values[0])
+            volumes.append(values[1])
+            if venue_rows is not None:
+                add_venue_row(
+                    venue_rows, exchange_id, symbol, self.coin_ids[index],
+                    values[0], values[1], ticker.get('bid'), ticker.get('ask')
+                )
+        return TickerColumns(
+            np.asarray(coin_index, dtype=np.int64),
+            np.asarray(prices, dtype=np.float64),
+            np.asarray(volumes, dtype=np.float64),
+        )
+
+
+def ticker_values(ticker: dict, use_mid: bool = False) -> Optional[Tuple[float, float]]:
+    """行情的 (价格, 计价币成交额)；use_mid 时优先使用买一卖一中间价"""
+    price = None
+    if use_mid:
+        bid, ask = ticker.get('bid'), ticker.get('ask')
+        if bid and ask:
+            price = (bid + ask) / 2
+    price = price or ticker.get('last') or ticker.get('close')
+    if not price:
+        return None
+    volume = ticker.get('quoteVolume')
+    if volume is None:
+        volume = (ticker.get('baseVolume') or 0.0) * price
+    return price, volume
+
+
+def add_venue_row(
+    venue_rows: dict, exchange_id: str, symbol: str, coin_id: str,
+    price: float, volume: float, bid: Optional[float], ask: Optional[float]
+):
+    """
+    按 (CMC 交易所, 市场类型, 币种) 收集 venue_prices 行，
+    同一币种在同一市场有多个交易对（USDT/USDC）时保留成交额最大的
+    """
+    exchange_name, market_type, pair_name = parse_symbol(exchange_id, symbol)
+    key = (exchange_name, market_type, coin_id)
+    current = venue_rows.get(key)
+    if current is not None and (current["volume"] or 0.0) >= (volume or 0.0):
+        return
+    venue_rows[key] = {
+        "coin_id": coin_id,
+        "exchange_name": exchange_name,
+        "market_type": market_type,
+        "pair_name": pair_name,
+        "price": price,
+        "bid": bid,
+        "ask": ask,
+        "volume": volume,
+    }
+
+
+def upsert_venue_prices(session: Session, venue_rows: Iterable[dict], now: datetime) -> int:
+    """批量写入 venue_prices"""
+    return bulk_upsert(
+        session, VenuePrice, [{**row, "updated_at": now} for row in venue_rows],
+        index_elements=["exchange_name", "market_type", "coin_id"],
+        update_fields=["pair_name", "price", "bid", "ask", "volume", "updated_at"]
+    )
+
+
+def aggregate_prices(columns: TickerColumns, max_deviation: float) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    按币种聚合价格，返回 (币种下标, 价格)
+
+    先求每个币种的中位数，剔除偏离中位数超过 max_deviation 的行情，
+    再按成交额加权平均（VWAP）；剩余行情都没有成交额时使用中位数
+    """
+    valid = np.isfinite(columns.price) & (columns.price > 0)
+    coin_index = columns.coin_index[valid]
+    price = columns.price[valid]
+    volume = np.nan_to_num(columns.volume[valid], nan=0.0, posinf=0.0, neginf=0.0).clip(min=0.0)
+    if not len(coin_index):
+        return np.empty(0, dtype=np.int64), np.empty(0)
+
+    # 按 (币种, 价格) 排序后，每组中间位置即为中位数
+    order = np.lexsort((price, coin_index))
+    coins, starts, counts = np.unique(coin_index[order], return_index=True, return_counts=True)
+    sorted_price = price[order]
+    median = (sorted_price[starts + (counts - 1) // 2] + sorted_price[starts + counts // 2]) / 2
+
+    size = int(coins[-1]) + 1
+    median_by_coin = np.zeros(size)
+    median_by_coin[coins] = median
+    inlier = np.abs(price / median_by_coin[coin_index] - 1.0) <= max_deviation
+    weight = np.where(inlier, volume, 0.0)
+    volume_sum = np.bincount(coin_index, weights=weight, minlength=size)[coins]
+    value_sum = np.bincount(coin_index, weights=weight * price, minlength=size)[coins]
+    vwap = np.divide(value_sum, volume_sum, out=median.copy(), where=volume_sum > 0)
+    return coins, vwap
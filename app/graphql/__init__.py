@@ -7,7 +7,11 @@ from .models import (
     CoinHoldingGraphQL,
     HolderGraphQL,
     LabelGraphQL,
-    ARKMEntityGraphQL
+    ARKMEntityGraphQL,
+    VenuePriceGraphQL,
+    PriceBarGraphQL,
+    PriceInterval
 )
 
 from .schema import Query
+from .context import get_graphql_context
@@ -0,0 +1,14 @@
+from app.database.manager import db_manager
+from app.graphql.loaders import GraphQLLoaders
+
+
+async def get_graphql_context():
+    """
+    GraphQL请求上下文：异步会话工厂 + 本请求的 DataLoader
+
+    同一请求的根字段会并发解析，因此不共享会话，每个解析器/批量加载各自打开一个
+    """
+    return {
+        "session_factory": db_manager.get_async_session,
+        "loaders": GraphQLLoaders(db_manager.get_async_session),
+    }
@@ -0,0 +1,110 @@
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from strawberry.dataloader import DataLoader
+from app.database.models import (
+    Coin, SupplyInfo, OnChainInfo,
+    ExchangeSpot, ExchangeContract,
+    Holder, CoinHolding, ARKMEntity, Label, VenuePrice
+)
+from app.database.bulk import chunked
+
+# 同一交易所市场请求的币种数达到该值时，直接范围扫描整个市场，不再用 IN 逐个定位
+VENUE_SNAPSHOT_MIN_KEYS = 100
+
+
+class GraphQLLoaders:
+    """
+    每个请求一组的批量加载器
+
+    同一请求中对同一关联的多次 load 会合并为一次 IN 查询，并在请求内缓存结果；
+    不同加载器会被并发派发，因此每次批量查询使用独立的 AsyncSession
+    """
+
+    def __init__(self, session_factory: Callable[[], AsyncSession]):
+        self.session_factory = session_factory
+
+        self.coin = DataLoader(self._load_coins)
+        self.supply_info = DataLoader(self._load_supply_infos)
+        self.on_chain_infos = DataLoader(self._load_on_chain_infos)
+        self.exchange_spots = DataLoader(self._load_exchange_spots)
+        self.exchange_contracts = DataLoader(self._load_exchange_contracts)
+        self.holdings = DataLoader(self._load_coin_holdings)
+        self.holder = DataLoader(self._load_holders)
+        self.holder_holdings = DataLoader(self._load_holder_holdings)
+        self.entity = DataLoader(self._load_entities)
+        self.label = DataLoader(self._load_labels)
+        self.venue_price = DataLoader(self._load_venue_prices)
+
+    # ------------------------------------------
+    # 通用批量查询
+    # ------------------------------------------
+    async def _fetch(self, model, key_column, keys: List[Any]) -> List[Any]:
+        async with self.session_factory() as session:
+            return (await session.exec(select(model).where(key_column.in_(keys)))).all()
+
+    async def _fetch_one(self, model, key_column, keys: List[Any]) -> List[Optional[Any]]:
+        rows = await self._fetch(model, key_column, keys)
+        by_key: Dict[Any, Any] = {getattr(row, key_column.key): row for row in rows}
+        return [by_key.get(key) for key in keys]
+
+    async def _fetch_many(self, model, key_column, keys: List[Any]) -> List[List[Any]]:
+        grouped: Dict[Any, List[Any]] = defaultdict(list)
+        for row in await self._fetch(model, key_column, keys):
+            grouped[getattr(row, key_column.key)].append(row)
+        return [grouped.get(key, []) for key in keys]
+
+    # ------------------------------------------
+    # 加载函数
+    # ------------------------------------------
+    async def _load_coins(self, coin_ids: List[str]):
+        return await self._fetch_one(Coin, Coin.id, coin_ids)
+
+    async def _load_supply_infos(self, coin_ids: List[str]):
+        return await self._fetch_one(SupplyInfo, SupplyInfo.coin_id, coin_ids)
+
+    async def _load_on_chain_infos(self, coin_ids: List[str]):
+        return await self._fetch_many(OnChainInfo, OnChainInfo.coin_id, coin_ids)
+
+    async def _load_exchange_spots(self, coin_ids: List[str]):
+        return await self._fetch_many(ExchangeSpot, ExchangeSpot.coin_id, coin_ids)
+
+    async def _load_exchange_contracts(self, coin_ids: List[str]):
+        return await self._fetch_many(ExchangeContract, ExchangeContract.coin_id, coin_ids)
+
+    async def _load_coin_holdings(self, coin_ids: List[str]):
+        return await self._fetch_many(CoinHolding, CoinHolding.coin_id, coin_ids)
+
+    async def _load_holders(self, holder_ids: List[int]):
+        return await self._fetch_one(Holder, Holder.id, holder_ids)
+
+    async def _load_holder_holdings(self, holder_ids: List[int]):
+        return await self._fetch_many(CoinHolding, CoinHolding.holder_id, holder_ids)
+
+    async def _load_entities(self, entity_ids: List[int]):
+        return await self._fetch_one(ARKMEntity, ARKMEntity.id, entity_ids)
+
+    async def _load_labels(self, label_ids: List[int]):
+        return await self._fetch_one(Label, Label.id, label_ids)
+
+    async def _load_venue_prices(self, keys: List[Tuple[str, str, str]]):
+        """按 (exchange_name, market_type, coin_id) 加载交易所价格，同一市场的键合并为一次唯一索引范围扫描"""
+        coin_ids_by_market: Dict[Tuple[str, str], set] = defaultdict(set)
+        for exchange_name, market_type, coin_id in keys:
+            coin_ids_by_market[(exchange_name, market_type)].add(coin_id)
+
+        by_key: Dict[Tuple[str, str, str], VenuePrice] = {}
+        async with self.session_factory() as session:
+            for (exchange_name, market_type), coin_ids in coin_ids_by_market.items():
+                query = select(VenuePrice).where(
+                    VenuePrice.exchange_name == exchange_name, VenuePrice.market_type == market_type
+                )
+                if len(coin_ids) >= VENUE_SNAPSHOT_MIN_KEYS:
+                    queries = [query]
+                else:
+                    queries = [query.where(VenuePrice.coin_id.in_(chunk)) for chunk in chunked(sorted(coin_ids))]
+                for venue_query in queries:
+                    for row in (await session.exec(venue_query)).all():
+                        by_key[(row.exchange_name, row.market_type, row.coin_id)] = row
+        return [by_key.get(key) for key in keys]
@@ -1,7 +1,12 @@
 import strawberry
+from strawberry.types import Info
 from typing import Optional, List
+from enum import Enum
 import datetime
 
+# 关联字段均通过 info.context["loaders"] 中的 DataLoader 按需批量加载，
+# 只有查询中选择了该字段才会产生对应的数据库查询
+
 # ---------------------------
 # SupplyInfo
 # ---------------------------
@@ -26,6 +31,28 @@ class OnChainInfoGraphQL:
     contract_address: str
     updated_at: datetime.datetime
 
+# ---------------------------
+# VenuePrice
+# ---------------------------
+@strawberry.type
+class VenuePriceGraphQL:
+    coin_id: str
+    exchange_name: str
+    market_type: str
+    pair_name: str
+    price: float
+    bid: Optional[float]
+    ask: Optional[float]
+    volume: Optional[float]
+    updated_at: datetime.datetime
+
+    @strawberry.field
+    def spread(self) -> Optional[float]:
+        """买卖价差，相对中间价的比例"""
+        if not self.bid or not self.ask:
+            return None
+        return (self.ask - self.bid) / ((self.ask + self.bid) / 2)
+
 # ---------------------------
 # ExchangeSpot
 # ---------------------------
@@ -36,8 +63,18 @@ class ExchangeSpotGraphQL:
     exchange_name: str
     spot_name: str
     updated_at: datetime.datetime
+
     # 关联数据
-    coin: Optional['CoinGraphQL'] = None
+    @strawberry.field
+    async def coin(self, info: Info) -> Optional['CoinGraphQL']:
+        coin = await info.context["loaders"].coin.load(self.coin_id)
+        return convert_coin_to_graphql(coin) if coin else None
+
+    @strawberry.field
+    async def venue_price(self, info: Info) -> Optional[VenuePriceGraphQL]:
+        """该币种在本交易所现货市场的最新行情"""
+        venue_price = await info.context["loaders"].venue_price.load((self.exchange_name, "spot", self.coin_id))
+        return convert_venue_price_to_graphql(venue_price) if venue_price else None
 
 # ---------------------------
 # ExchangeContract
@@ -49,8 +86,18 @@ class ExchangeContractGraphQL:
     exchange_name: str
     contract_name: str
     updated_at: datetime.datetime
+
     # 关联数据
-    coin: Optional['CoinGraphQL'] = None
+    @strawberry.field
+    async def coin(self, info: Info) -> Optional['CoinGraphQL']:
+        coin = await info.context["loaders"].coin.load(self.coin_id)
+        return convert_coin_to_graphql(coin) if coin else None
+
+    @strawberry.field
+    async def venue_price(self, info: Info) -> Optional[VenuePriceGraphQL]:
+        """该币种在本交易所合约市场的最新行情"""
+        venue_price = await info.context["loaders"].venue_price.load((self.exchange_name, "swap", self.coin_id))
+        return convert_venue_price_to_graphql(venue_price) if venue_price else None
 
 # ---------------------------
 # Label
@@ -79,11 +126,28 @@ class HolderGraphQL:
     address: str
     chain_type: Optional[str]
     updated_at: datetime.datetime
+    entity_id: strawberry.Private[Optional[int]] = None
+    label_id: strawberry.Private[Optional[int]] = None
 
     # 关联数据
-    entity: Optional[ARKMEntityGraphQL] = None
-    label: Optional[LabelGraphQL] = None
-    coins: List['CoinHoldingGraphQL'] = strawberry.field(default_factory=list)
+    @strawberry.field
+    async def entity(self, info: Info) -> Optional[ARKMEntityGraphQL]:
+        if self.entity_id is None:
+            return None
+        entity = await info.context["loaders"].entity.load(self.entity_id)
+        return convert_arkm_entity_to_graphql(entity) if entity else None
+
+    @strawberry.field
+    async def label(self, info: Info) -> Optional[LabelGraphQL]:
+        if self.label_id is None:
+            return None
+        label = await info.context["loaders"].label.load(self.label_id)
+        return convert_label_to_graphql(label) if label else None
+
+    @strawberry.field
+    async def coins(self, info: Info) -> List['CoinHoldingGraphQL']:
+        holdings = await info.context["loaders"].holder_holdings.load(self.id)
+        return [convert_coin_holding_to_graphql(holding) for holding in holdings]
 
 # ---------------------------
 # CoinHolding
@@ -98,7 +162,10 @@ class CoinHoldingGraphQL:
     updated_at: datetime.datetime
 
     # 关联数据
-    holder: Optional[HolderGraphQL] = None
+    @strawberry.field
+    async def holder(self, info: Info) -> Optional[HolderGraphQL]:
+        holder = await info.context["loaders"].holder.load(self.holder_id)
+        return convert_holder_to_graphql(holder) if holder else None
 
 # ---------------------------
 # Coin
@@ -108,22 +175,213 @@ class CoinGraphQL:
     id: str
     symbol: str
     name: str
-    current_price: Optional[float] = None
-    market_cap: Optional[float] = None
-    circulating_supply: Optional[float] = None
-    total_supply: Optional[float] = None
-    created_at: datetime.datetime = datetime.datetime.now()
-    updated_at: datetime.datetime = datetime.datetime.now()
+    created_at: Optional[datetime.datetime] = None
+    updated_at: Optional[datetime.datetime] = None
+
+    # 价格/供应信息来自 SupplyInfo
+    @strawberry.field
+    async def current_price(self, info: Info) -> Optional[float]:
+        supply_info = await info.context["loaders"].supply_info.load(self.id)
+        return supply_info.cached_price if supply_info else None
+
+    @strawberry.field
+    async def market_cap(self, info: Info) -> Optional[float]:
+        supply_info = await info.context["loaders"].supply_info.load(self.id)
+        return supply_info.market_cap if supply_info else None
+
+    @strawberry.field
+    async def circulating_supply(self, info: Info) -> Optional[float]:
+        supply_info = await info.context["loaders"].supply_info.load(self.id)
+        return supply_info.circulating_supply if supply_info else None
+
+    @strawberry.field
+    async def total_supply(self, info: Info) -> Optional[float]:
+        supply_info = await info.context["loaders"].supply_info.load(self.id)
+        return supply_info.total_supply if supply_info else None
 
     # 关联数据
-    supply_info: Optional[SupplyInfoGraphQL] = None
-    on_chain_infos: List[OnChainInfoGraphQL] = strawberry.field(default_factory=list)
-    exchange_spots: List[ExchangeSpotGraphQL] = strawberry.field(default_factory=list)
-    exchange_contracts: List[ExchangeContractGraphQL] = strawberry.field(default_factory=list)
-    holdings: List[CoinHoldingGraphQL] = strawberry.field(default_factory=list)
+    @strawberry.field
+    async def supply_info(self, info: Info) -> Optional[SupplyInfoGraphQL]:
+        supply_info = await info.context["loaders"].supply_info.load(self.id)
+        return convert_supply_info_to_graphql(supply_info) if supply_info else None
+
+    @strawberry.field
+    async def on_chain_infos(self, info: Info) -> List[OnChainInfoGraphQL]:
+        on_chain_infos = await info.context["loaders"].on_chain_infos.load(self.id)
+        return [convert_on_chain_info_to_graphql(oci) for oci in on_chain_infos]
+
+    @strawberry.field
+    async def exchange_spots(self, info: Info) -> List[ExchangeSpotGraphQL]:
+        exchange_spots = await info.context["loaders"].exchange_spots.load(self.id)
+        return [convert_exchange_spot_to_graphql(es) for es in exchange_spots]
+
+    @strawberry.field
+    async def exchange_contracts(self, info: Info) -> List[ExchangeContractGraphQL]:
+        exchange_contracts = await info.context["loaders"].exchange_contracts.load(self.id)
+        return [convert_exchange_contract_to_graphql(ec) for ec in exchange_contracts]
+
+    @strawberry.field
+    async def holdings(self, info: Info) -> List[CoinHoldingGraphQL]:
+        holdings = await info.context["loaders"].holdings.load(self.id)
+        return [convert_coin_holding_to_graphql(holding) for holding in holdings]
 
 @strawberry.type
 class CoinPriceGraphQL:
     coin_id: str
     price: Optional[float]
     updated_at: datetime.datetime
+    # 按合约批量查询时回填，便于调用方对应请求
+    chain_name: Optional[str] = None
+    contract_address: Optional[str] = None
+
+
+@strawberry.enum
+class PriceInterval(Enum):
+    ONE_MINUTE = "1m"
+    ONE_HOUR = "1h"
+    ONE_DAY = "1d"
+
+
+@strawberry.type
+class PriceBarGraphQL:
+    time: datetime.datetime
+    open: float
+    high: float
+    low: float
+    close: float
+    market_cap: Optional[float]
+    points: int
+
+
+@strawberry.input
+class ContractInput:
+    chain: str
+    address: str
+
+
+# 数据库模型 -> GraphQL 类型（只转换标量字段，关联字段由上面的解析器按需加载）
+def convert_coin_to_graphql(coin_db) -> CoinGraphQL:
+    """将数据库Coin模型转换为GraphQL模型"""
+    return CoinGraphQL(
+        id=coin_db.id,
+        symbol=coin_db.symbol,
+        name=coin_db.name,
+        created_at=coin_db.created_at,
+        updated_at=coin_db.updated_at,
+    )
+
+
+def convert_supply_info_to_graphql(supply_info) -> SupplyInfoGraphQL:
+    """将数据库模型转换为GraphQL类型"""
+    return SupplyInfoGraphQL(
+        id=supply_info.id,
+        coin_id=supply_info.coin_id,
+        total_supply=supply_info.total_supply,
+        circulating_supply=supply_info.circulating_supply,
+        cached_price=supply_info.cached_price,
+        market_cap=supply_info.market_cap,
+        updated_at=supply_info.updated_at,
+    )
+
+
+def convert_on_chain_info_to_graphql(oci) -> OnChainInfoGraphQL:
+    """将数据库模型转换为GraphQL类型"""
+    return OnChainInfoGraphQL(
+        id=oci.id,
+        coin_id=oci.coin_id,
+        chain_name=oci.chain_name,
+        contract_address=oci.contract_address,
+        updated_at=oci.updated_at,
+    )
+
+
+def convert_venue_price_to_graphql(venue_price) -> VenuePriceGraphQL:
+    """将数据库模型转换为GraphQL类型"""
+    return VenuePriceGraphQL(
+        coin_id=venue_price.coin_id,
+        exchange_name=venue_price.exchange_name,
+        market_type=venue_price.market_type,
+        pair_name=venue_price.pair_name,
+        price=venue_price.price,
+        bid=venue_price.bid,
+        ask=venue_price.ask,
+        volume=venue_price.volume,
+        updated_at=venue_price.updated_at,
+    )
+
+
+def convert_price_bar_to_graphql(price_bar) -> PriceBarGraphQL:
+    """将数据库模型转换为GraphQL类型"""
+    return PriceBarGraphQL(
+        time=datetime.datetime.fromtimestamp(price_bar.bucket_start, tz=datetime.timezone.utc),
+        open=price_bar.open,
+        high=price_bar.high,
+        low=price_bar.low,
+        close=price_bar.close,
+        market_cap=price_bar.market_cap,
+        points=price_bar.points,
+    )
+
+
+def convert_exchange_spot_to_graphql(es) -> ExchangeSpotGraphQL:
+    """将数据库模型转换为GraphQL类型"""
+    return ExchangeSpotGraphQL(
+        id=es.id,
+        coin_id=es.coin_id,
+        exchange_name=es.exchange_name,
+        spot_name=es.spot_name,
+        updated_at=es.updated_at,
+    )
+
+
+def convert_exchange_contract_to_graphql(ec) -> ExchangeContractGraphQL:
+    """将数据库模型转换为GraphQL类型"""
+    return ExchangeContractGraphQL(
+        id=ec.id,
+        coin_id=ec.coin_id,
+        exchange_name=ec.exchange_name,
+        contract_name=ec.contract_name,
+        updated_at=ec.updated_at,
+    )
+
+
+def convert_coin_holding_to_graphql(holding) -> CoinHoldingGraphQL:
+    """将数据库模型转换为GraphQL类型"""
+    return CoinHoldingGraphQL(
+        id=holding.id,
+        coin_id=holding.coin_id,
+        holder_id=holding.holder_id,
+        balance=holding.balance,
+        usd_value=holding.usd_value,
+        updated_at=holding.updated_at,
+    )
+
+
+def convert_holder_to_graphql(holder) -> HolderGraphQL:
+    """将数据库模型转换为GraphQL类型"""
+    return HolderGraphQL(
+        id=holder.id,
+        address=holder.address,
+        chain_type=holder.chain_type,
+        updated_at=holder.updated_at,
+        entity_id=holder.entity_id,
+        label_id=holder.label_id,
+    )
+
+
+def convert_arkm_entity_to_graphql(entity) -> ARKMEntityGraphQL:
+    """将数据库模型转换为GraphQL类型"""
+    return ARKMEntityGraphQL(
+        id=entity.id,
+        name=entity.name,
+        type=entity.type,
+    )
+
+
+def convert_label_to_graphql(label) -> LabelGraphQL:
+    """将数据库模型转换为GraphQL类型"""
+    return LabelGraphQL(
+        id=label.id,
+        name=label.name,
+        chain_type=label.chain_type,
+    )
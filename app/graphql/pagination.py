@@ -0,0 +1,75 @@
+import base64
+import json
+import strawberry
+from typing import Any, Callable, Generic, List, Optional, Sequence, Tuple, TypeVar
+from app.config import settings
+
+T = TypeVar("T")
+
+# Relay 风格的游标分页类型
+# 游标是排序键（如 (id,) 或 (usd_value, id)）的 base64 编码，对客户端不透明
+
+
+@strawberry.type
+class PageInfo:
+    has_next_page: bool
+    has_previous_page: bool
+    start_cursor: Optional[str]
+    end_cursor: Optional[str]
+
+
+@strawberry.type
+class Edge(Generic[T]):
+    cursor: str
+    node: T
+
+
+@strawberry.type
+class Connection(Generic[T]):
+    edges: List[Edge[T]]
+    page_info: PageInfo
+
+
+def encode_cursor(key: Sequence[Any]) -> str:
+    return base64.urlsafe_b64encode(json.dumps(list(key), separators=(",", ":")).encode()).decode()
+
+
+def decode_cursor(cursor: Optional[str], size: int) -> Optional[Tuple]:
+    """解码游标，size 为排序键的列数"""
+    if cursor is None:
+        return None
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except ValueError:
+        raise ValueError("Invalid cursor")
+    if not isinstance(key, list) or len(key) != size:
+        raise ValueError("Invalid cursor")
+    return tuple(key)
+
+
+def page_size(first: Optional[int]) -> int:
+    if first is None:
+        return settings.CONNECTION_DEFAULT_PAGE_SIZE
+    if first < 1 or first > settings.CONNECTION_MAX_PAGE_SIZE:
+        raise ValueError(f"first must be between 1 and {settings.CONNECTION_MAX_PAGE_SIZE}")
+    return first
+
+
+def build_connection(
+        rows: list,
+        first: int,
+        after: Optional[Tuple],
+        key: Callable[[Any], Sequence[Any]],
+        convert: Callable[[Any], T]
+) -> Connection[T]:
+    """rows 为仓储返回的最多 first + 1 行，多出的一行只用于判断是否还有下一页"""
+    edges = [Edge(cursor=encode_cursor(key(row)), node=convert(row)) for row in rows[:first]]
+    return Connection(
+        edges=edges,
+        page_info=PageInfo(
+            has_next_page=len(rows) > first,
+            has_previous_page=after is not None,
+            start_cursor=edges[0].cursor if edges else None,
+            end_cursor=edges[-1].cursor if edges else None,
+        )
+    )
@@ -1,215 +1,33 @@
 import strawberry
-from typing import List, Optional
-from app.database.manager import DatabaseManager
-from app.database.query import CoinRepository
-from app.database.processor import DataProcessor
-from app.sevice import CoinService
+from strawberry.types import Info
+from typing import Annotated, List, Optional
+import datetime
+from app.database.query import AsyncCoinRepository
+from app.cache import CachedPrice, price_cache, price_cache_key, contract_price_cache_key, coin_price_tag
+from app.config import settings
+from app.database.price_history import INTERVAL_SECONDS
+from app.graphql.pagination import Connection, build_connection, decode_cursor, page_size
 from app.graphql.models import (
-    CoinGraphQL, SupplyInfoGraphQL, OnChainInfoGraphQL,
-    ExchangeSpotGraphQL, ExchangeContractGraphQL, CoinHoldingGraphQL, HolderGraphQL, ARKMEntityGraphQL, LabelGraphQL,
-    CoinPriceGraphQL,
+    CoinGraphQL, ExchangeSpotGraphQL, ExchangeContractGraphQL, CoinHoldingGraphQL, HolderGraphQL, CoinPriceGraphQL, ContractInput,
+    PriceBarGraphQL, PriceInterval,
+    convert_coin_to_graphql, convert_exchange_spot_to_graphql, convert_exchange_contract_to_graphql,
+    convert_coin_holding_to_graphql, convert_holder_to_graphql, convert_price_bar_to_graphql,
 )
 
-db_manager = DatabaseManager()
 
-
-# 创建GraphQL模型的辅助函数
-def convert_coin_to_graphql(coin_db):
-    """将数据库Coin模型转换为GraphQL模型"""
-    # 基本信息转换
-    coin_dict = {
-        "id": coin_db.id,
-        "symbol": coin_db.symbol,
-        "name": coin_db.name,
-        # 这些字段应该来自SupplyInfo或其他相关表
-        "current_price": None,
-        "market_cap": None,
-        "circulating_supply": None,
-        "total_supply": None,
-        "created_at": coin_db.created_at.isoformat() if coin_db.created_at else None,
-        "updated_at": coin_db.updated_at.isoformat() if coin_db.updated_at else None,
-    }
-
-    # 添加关联数据
-    if coin_db.supply_info:
-        supply_info = coin_db.supply_info
-        coin_dict["supply_info"] = SupplyInfoGraphQL(
-            id=supply_info.id,
-            coin_id=supply_info.coin_id,
-            total_supply=supply_info.total_supply,
-            circulating_supply=supply_info.circulating_supply,
-            cached_price=supply_info.cached_price,
-            market_cap=supply_info.market_cap,
-            updated_at=supply_info.updated_at.isoformat() if supply_info.updated_at else ""
-        )
-        # 将supply_info中的价格信息同步到coin顶层
-        coin_dict["current_price"] = supply_info.cached_price
-        coin_dict["market_cap"] = supply_info.market_cap
-        coin_dict["circulating_supply"] = supply_info.circulating_supply
-        coin_dict["total_supply"] = supply_info.total_supply
-
-    # 处理OnChainInfo列表
-    coin_dict["on_chain_infos"] = []
-    if coin_db.on_chain_infos:
-        for oci in coin_db.on_chain_infos:
-            coin_dict["on_chain_infos"].append(OnChainInfoGraphQL(
-                id=oci.id,
-                coin_id=oci.coin_id,
-                chain_name=oci.chain_name,
-                contract_address=oci.contract_address,
-                updated_at=oci.updated_at.isoformat() if oci.updated_at else ""
-            ))
-
-    # 处理ExchangeSpot列表
-    coin_dict["exchange_spots"] = []
-    if coin_db.exchange_spots:
-        for es in coin_db.exchange_spots:
-            coin_dict["exchange_spots"].append(ExchangeSpotGraphQL(
-                id=es.id,
-                coin_id=es.coin_id,
-                exchange_name=es.exchange_name,
-                spot_name=es.spot_name,
-                updated_at=es.updated_at.isoformat() if es.updated_at else ""
-            ))
-
-    # 处理ExchangeContract列表
-    coin_dict["exchange_contracts"] = []
-    if coin_db.exchange_contracts:
-        for ec in coin_db.exchange_contracts:
-            coin_dict["exchange_contracts"].append(ExchangeContractGraphQL(
-                id=ec.id,
-                coin_id=ec.coin_id,
-                exchange_name=ec.exchange_name,
-                contract_name=ec.contract_name,
-                updated_at=ec.updated_at.isoformat() if ec.updated_at else ""
-            ))
-
-    # 处理Holdings列表
-    coin_dict["holdings"] = []
-    if coin_db.holdings:
-        for holding in coin_db.holdings:
-            holder_graphql = None
-            if holding.holder:
-                holder = holding.holder
-                holder_entity_graphql = ARKMEntityGraphQL(
-                    id=holder.entity.id,
-                    name=holder.entity.name,
-                    type=holder.entity.type,
-                ) if holder.entity else None
-                holder_label_graphql = ARKMEntityGraphQL(
-                    id=holder.label.id,
-                    name=holder.label.name,
-                    type=holder.label.chain_type,
-                ) if holder.label else None
-
-                holder_graphql = HolderGraphQL(
-                    id=holder.id,
-                    address=holder.address,
-                    chain_type=holder.chain_type,
-                    entity=holder_entity_graphql,
-                    label=holder_label_graphql,
-                    updated_at=holder.updated_at.isoformat() if holder.updated_at else ""
-                )
-
-            coin_dict["holdings"].append(CoinHoldingGraphQL(
-                id=holding.id,
-                coin_id=holding.coin_id,
-                holder_id=holding.holder_id,
-                balance=holding.balance,
-                usd_value=holding.usd_value,
-                updated_at=holding.updated_at.isoformat() if holding.updated_at else "",
-                holder=holder_graphql
-            ))
-
-    return CoinGraphQL(**coin_dict)
-
-
-def convert_exchange_spot_to_graphql(es) -> ExchangeSpotGraphQL:
-    """将数据库模型转换为GraphQL类型"""
-    return ExchangeSpotGraphQL(
-        id=es.id,
-        coin_id=es.coin_id,
-        exchange_name=es.exchange_name,
-        spot_name=es.spot_name,
-        updated_at=es.updated_at.isoformat() if es.updated_at else "",
-        coin=convert_coin_to_graphql(es.coin) if es.coin else None
-    )
-
-
-def convert_exchange_contract_to_graphql(ec) -> ExchangeContractGraphQL:
-    """将数据库模型转换为GraphQL类型"""
-    return ExchangeContractGraphQL(
-        id=ec.id,
-        coin_id=ec.coin_id,
-        exchange_name=ec.exchange_name,
-        contract_name=ec.contract_name,
-        updated_at=ec.updated_at.isoformat() if ec.updated_at else "",
-        coin=convert_coin_to_graphql(ec.coin) if ec.coin else None
-    )
-
-
-def convert_coin_holding_to_graphql(holding) -> CoinHoldingGraphQL:
-    """将数据库模型转换为GraphQL类型"""
-    return CoinHoldingGraphQL(
-        id=holding.id,
-        coin_id=holding.coin_id,
-        holder_id=holding.holder_id,
-        balance=holding.balance,
-        usd_value=holding.usd_value,
-        updated_at=holding.updated_at.isoformat() if holding.updated_at else "",
-        holder=convert_holder_to_graphql(holding.holder) if holding.holder else None
-    )
-
-
-def convert_coin_holding_to_graphql_without_holders(holding) -> CoinHoldingGraphQL:
-    """将数据库模型转换为GraphQL类型"""
-    return CoinHoldingGraphQL(
-        id=holding.id,
-        coin_id=holding.coin_id,
-        holder_id=holding.holder_id,
-        balance=holding.balance,
-        usd_value=holding.usd_value,
-        updated_at=holding.updated_at.isoformat() if holding.updated_at else "",
-        holder=None
-    )
-
-
-def convert_holder_to_graphql(holder) -> HolderGraphQL:
-    """将数据库模型转换为GraphQL类型"""
-    return HolderGraphQL(
-        id=holder.id,
-        address=holder.address,
-        chain_type=holder.chain_type,
-        updated_at=holder.updated_at.isoformat() if holder.updated_at else "",
-        entity=convert_arkm_entity_to_graphql(holder.entity) if holder.entity else None,
-        label=convert_label_to_graphql(holder.label) if holder.label else None,
-        coins=[convert_coin_holding_to_graphql_without_holders(holding) for holding in holder.coin_holdings]
-    )
-
-
-def convert_arkm_entity_to_graphql(entity) -> ARKMEntityGraphQL:
-    """将数据库模型转换为GraphQL类型"""
-    return ARKMEntityGraphQL(
-        id=entity.id,
-        name=entity.name,
-        type=entity.type,
-    )
-
-
-def convert_label_to_graphql(label) -> LabelGraphQL:
-    """将数据库模型转换为GraphQL类型"""
-    return LabelGraphQL(
-        id=label.id,
-        name=label.name,
-        chain_type=label.chain_type,
-    )
+def _epoch_seconds(value: datetime.datetime) -> int:
+    # 未带时区的时间按 UTC 处理
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=datetime.timezone.utc)
+    return int(value.timestamp())
 
 
 @strawberry.type
 class Query:
     @strawberry.field
-    def coins(
+    async def coins(
             self,
+            info: Info,
             coin_id: Optional[str] = None,
             symbol: Optional[str] = None,
             name: Optional[str] = None,
@@ -218,164 +36,310 @@ class Query:
             offset: Optional[int] = 0
     ) -> List[CoinGraphQL]:
         """根据多种条件获取币种信息列表"""
-        db = db_manager.get_session()
-        try:
-            repository = CoinRepository(db)
-            processor = DataProcessor(db)
-            service = CoinService(repository, processor)
-
-            # 使用repository进行复杂查询
-            coins = repository.get_coins_with_filters(
+        async with info.context["session_factory"]() as db:
+            repository = AsyncCoinRepository(db)
+            # 使用repository进行复杂查询，关联数据由字段解析器按需加载
+            coins = await repository.get_coins_with_filters(
                 coin_id=coin_id,
                 symbol=symbol,
                 name=name,
                 contract_address=contract_address,
                 limit=limit,
-                offset=offset
+                offset=offset,
+                with_relations=False
             )
 
-            return [convert_coin_to_graphql(coin) for coin in coins]
-        finally:
-            db_manager.close_session(db)
+        return [convert_coin_to_graphql(coin) for coin in coins]
+
+    @strawberry.field
+    async def search_coins(self, info: Info, term: str, limit: Optional[int] = None) -> List[CoinGraphQL]:
+        """全文搜索币种，按相关度与市值排序"""
+        if limit is None:
+            limit = settings.COIN_SEARCH_DEFAULT_LIMIT
+        elif limit < 1 or limit > settings.COIN_SEARCH_MAX_LIMIT:
+            raise ValueError(f"limit must be between 1 and {settings.COIN_SEARCH_MAX_LIMIT}")
+        async with info.context["session_factory"]() as db:
+            coins = await AsyncCoinRepository(db).search_coins(term, limit)
+        return [convert_coin_to_graphql(coin) for coin in coins]
 
     @strawberry.field
-    def spot_exchanges(
+    async def spot_exchanges(
             self,
+            info: Info,
             exchange_id: str,
             coin_id: Optional[str] = None,
             limit: Optional[int] = 50,
             offset: Optional[int] = 0
     ) -> List[ExchangeSpotGraphQL]:
         """根据币种ID获取现货交易所信息列表"""
-        db = db_manager.get_session()
-        try:
-            repository = CoinRepository(db)
-            processor = DataProcessor(db)
-            service = CoinService(repository, processor)
-
+        async with info.context["session_factory"]() as db:
+            repository = AsyncCoinRepository(db)
             # 使用repository进行复杂查询
-            exchange_spots = repository.get_exchange_spots_with_filters(
+            exchange_spots = await repository.get_exchange_spots_with_filters(
                 coin_id=coin_id,
                 exchange_id=exchange_id,
                 limit=limit,
                 offset=offset,
+                with_relations=False
             )
 
-            return [convert_exchange_spot_to_graphql(es) for es in exchange_spots]
-        finally:
-            db_manager.close_session(db)
+        return [convert_exchange_spot_to_graphql(es) for es in exchange_spots]
+
+    @strawberry.field
+    async def exchange_spot(self, info: Info, id: int) -> Optional[ExchangeSpotGraphQL]:
+        """根据ID获取现货交易对"""
+        async with info.context["session_factory"]() as db:
+            exchange_spots = await AsyncCoinRepository(db).get_all_coins_by_exchange_spot_id(id)
+        return convert_exchange_spot_to_graphql(exchange_spots[0]) if exchange_spots else None
 
     @strawberry.field
-    def contract_exchanges(
+    async def contract_exchanges(
             self,
+            info: Info,
             exchange_id: str,
             coin_id: Optional[str] = None,
             limit: Optional[int] = 50,
             offset: Optional[int] = 0
     ) -> List[ExchangeContractGraphQL]:
         """根据币种ID获取合约交易所信息列表"""
-        db = db_manager.get_session()
-        try:
-            repository = CoinRepository(db)
-            processor = DataProcessor(db)
-            service = CoinService(repository, processor)
-
+        async with info.context["session_factory"]() as db:
+            repository = AsyncCoinRepository(db)
             # 使用repository进行复杂查询
-            exchange_contracts = repository.get_exchange_contracts_with_filters(
+            exchange_contracts = await repository.get_exchange_contracts_with_filters(
                 coin_id=coin_id,
                 exchange_id=exchange_id,
                 limit=limit,
-                offset=offset
+                offset=offset,
+                with_relations=False
             )
 
-            return [convert_exchange_contract_to_graphql(ec) for ec in exchange_contracts]
-        finally:
-            db_manager.close_session(db)
+        return [convert_exchange_contract_to_graphql(ec) for ec in exchange_contracts]
 
     @strawberry.field
-    def holders(
+    async def holders(
             self,
+            info: Info,
             chain_type: Optional[str] = None,
             coin_id: Optional[str] = None,
             limit: Optional[int] = 50,
             offset: Optional[int] = 0
     ) -> List[CoinHoldingGraphQL]:
         """根据币种ID获取持仓信息列表"""
-        db = db_manager.get_session()
-        try:
-            repository = CoinRepository(db)
-            processor = DataProcessor(db)
-            service = CoinService(repository, processor)
-
+        async with info.context["session_factory"]() as db:
+            repository = AsyncCoinRepository(db)
             # 使用repository进行复杂查询
-            holdings = repository.get_coin_holding_with_filters(
+            holdings = await repository.get_coin_holding_with_filters(
                 chain_type=chain_type,
                 coin_id=coin_id,
                 limit=limit,
-                offset=offset
+                offset=offset,
+                with_relations=False
             )
 
-            return [convert_coin_holding_to_graphql(holding) for holding in holdings]
-        finally:
-            db_manager.close_session(db)
+        return [convert_coin_holding_to_graphql(holding) for holding in holdings]
 
+    # ------------------------------------------
+    # 游标分页（Relay Connection），深分页不随页码变慢
+    # ------------------------------------------
     @strawberry.field
-    def holder_detail(self,
-                      holder_address: str,
-                      chain_type: Optional[str] = None,
-                      ) -> Optional[HolderGraphQL]:
-        """根据地址获取持仓信息"""
-        db = db_manager.get_session()
-        try:
-            repository = CoinRepository(db)
-            processor = DataProcessor(db)
-            service = CoinService(repository, processor)
+    async def coins_connection(
+            self,
+            info: Info,
+            coin_id: Optional[str] = None,
+            symbol: Optional[str] = None,
+            name: Optional[str] = None,
+            contract_address: Optional[str] = None,
+            first: Optional[int] = None,
+            after: Optional[str] = None
+    ) -> Connection[CoinGraphQL]:
+        """币种列表，按币种ID排序"""
+        first = page_size(first)
+        after_key = decode_cursor(after, 1)
+        async with info.context["session_factory"]() as db:
+            coins = await AsyncCoinRepository(db).get_coins_page(
+                first, after_key,
+                coin_id=coin_id,
+                symbol=symbol,
+                name=name,
+                contract_address=contract_address
+            )
+        return build_connection(coins, first, after_key, lambda coin: (coin.id,), convert_coin_to_graphql)
+
+    @strawberry.field
+    async def spot_exchanges_connection(
+            self,
+            info: Info,
+            exchange_id: str,
+            coin_id: Optional[str] = None,
+            first: Optional[int] = None,
+            after: Optional[str] = None
+    ) -> Connection[ExchangeSpotGraphQL]:
+        """现货交易对列表，按ID排序"""
+        first = page_size(first)
+        after_key = decode_cursor(after, 1)
+        async with info.context["session_factory"]() as db:
+            exchange_spots = await AsyncCoinRepository(db).get_exchange_spots_page(
+                first, after_key, coin_id=coin_id, exchange_id=exchange_id
+            )
+        return build_connection(exchange_spots, first, after_key, lambda es: (es.id,), convert_exchange_spot_to_graphql)
+
+    @strawberry.field
+    async def contract_exchanges_connection(
+            self,
+            info: Info,
+            exchange_id: str,
+            coin_id: Optional[str] = None,
+            first: Optional[int] = None,
+            after: Optional[str] = None
+    ) -> Connection[ExchangeContractGraphQL]:
+        """合约交易对列表，按ID排序"""
+        first = page_size(first)
+        after_key = decode_cursor(after, 1)
+        async with info.context["session_factory"]() as db:
+            exchange_contracts = await AsyncCoinRepository(db).get_exchange_contracts_page(
+                first, after_key, coin_id=coin_id, exchange_id=exchange_id
+            )
+        return build_connection(
+            exchange_contracts, first, after_key, lambda ec: (ec.id,), convert_exchange_contract_to_graphql
+        )
 
+    @strawberry.field
+    async def holders_connection(
+            self,
+            info: Info,
+            chain_type: Optional[str] = None,
+            coin_id: Optional[str] = None,
+            first: Optional[int] = None,
+            after: Optional[str] = None
+    ) -> Connection[CoinHoldingGraphQL]:
+        """持仓列表，按持仓价值降序，无价值的排在最后"""
+        first = page_size(first)
+        after_key = decode_cursor(after, 2)
+        async with info.context["session_factory"]() as db:
+            holdings = await AsyncCoinRepository(db).get_coin_holdings_page(
+                first, after_key, chain_type=chain_type, coin_id=coin_id
+            )
+        return build_connection(
+            holdings, first, after_key, lambda holding: (holding.usd_value, holding.id), convert_coin_holding_to_graphql
+        )
+
+    @strawberry.field
+    async def holder_detail(self,
+                            info: Info,
+                            holder_address: str,
+                            chain_type: Optional[str] = None,
+                            ) -> Optional[HolderGraphQL]:
+        """根据地址获取持仓信息"""
+        async with info.context["session_factory"]() as db:
+            repository = AsyncCoinRepository(db)
             # 使用repository进行复杂查询
-            holder = repository.get_holder_with_filters(
+            holder = await repository.get_holder_with_filters(
                 holder_address=holder_address,
                 chain_type=chain_type,
+                with_relations=False
             )
-            return convert_holder_to_graphql(holder) if holder else None
-        finally:
-            db_manager.close_session(db)
+        return convert_holder_to_graphql(holder) if holder else None
 
     @strawberry.field
-    def price(self,
-              coin_id:Optional[str] = None,
-              contract_address: Optional[str] = None,
-              ) -> Optional[CoinPriceGraphQL]:
+    async def price(self,
+                    info: Info,
+                    coin_id:Optional[str] = None,
+                    contract_address: Optional[str] = None,
+                    ) -> Optional[CoinPriceGraphQL]:
         """根据币种ID获取价格信息"""
-        pricecache = db_manager.get_cache(f"price:{coin_id}:{contract_address}")
+        cache_key = price_cache_key(coin_id, contract_address)
+        pricecache = price_cache.get(cache_key)
         if pricecache:
             return CoinPriceGraphQL(
                 coin_id=pricecache.coin_id,
-                price=pricecache.cached_price,
+                price=pricecache.price,
                 updated_at=pricecache.updated_at
             )
         else:
-            db = db_manager.get_session()
-            try:
-                repository = CoinRepository(db)
-                processor = DataProcessor(db)
-                service = CoinService(repository, processor)
-
+            async with info.context["session_factory"]() as db:
+                repository = AsyncCoinRepository(db)
                 # 使用repository进行复杂查询
-                coins = repository.get_coins_with_filters(
+                coins = await repository.get_coins_with_filters(
                     coin_id=coin_id,
                     contract_address=contract_address,
                     limit=1,
-                    offset=0
+                    offset=0,
+                    with_relations=False
                 )
-                if coins:
-                    pricecache = coins[0].supply_info
-                    db_manager.set_cache(f"price:{coin_id}:{contract_address}", pricecache)
-                    return CoinPriceGraphQL(
-                        coin_id=pricecache.coin_id,
-                        price=pricecache.cached_price,
-                        updated_at=pricecache.updated_at
-                    )
+            # 异步会话不支持关联字段的惰性加载，供应信息通过 DataLoader 获取
+            supply_info = await info.context["loaders"].supply_info.load(coins[0].id) if coins else None
+            if supply_info:
+                pricecache = CachedPrice(supply_info.coin_id, supply_info.cached_price, supply_info.updated_at)
+                # 按币种打标签，价格任务写入后失效
+                price_cache.set(cache_key, pricecache, tags=[coin_price_tag(supply_info.coin_id)])
+                return CoinPriceGraphQL(
+                    coin_id=pricecache.coin_id,
+                    price=pricecache.price,
+                    updated_at=pricecache.updated_at
+                )
+            else:
+                return None
+
+    @strawberry.field
+    async def prices(self,
+                     info: Info,
+                     coin_ids: Optional[List[str]] = None,
+                     contracts: Optional[List[ContractInput]] = None,
+                     ) -> List[CoinPriceGraphQL]:
+        """批量获取币种/合约价格，未命中缓存的部分用一条查询获取"""
+        coin_ids = list(dict.fromkeys(coin_ids or []))
+        contract_keys = list(dict.fromkeys((contract.chain, contract.address) for contract in contracts or []))
+        if len(coin_ids) > settings.PRICE_BATCH_MAX_ITEMS or len(contract_keys) > settings.PRICE_BATCH_MAX_ITEMS:
+            raise ValueError(f"At most {settings.PRICE_BATCH_MAX_ITEMS} coinIds and contracts per request")
+
+        coin_prices = {coin_id: price_cache.get(price_cache_key(coin_id, None)) for coin_id in coin_ids}
+        contract_prices = {key: price_cache.get(contract_price_cache_key(*key)) for key in contract_keys}
+        missing_coin_ids = [coin_id for coin_id, cached in coin_prices.items() if cached is None]
+        missing_contracts = [key for key, cached in contract_prices.items() if cached is None]
+
+        if missing_coin_ids or missing_contracts:
+            async with info.context["session_factory"]() as db:
+                rows = await AsyncCoinRepository(db).get_prices(missing_coin_ids, missing_contracts)
+            for row in rows:
+                cached = CachedPrice(row.coin_id, row.cached_price, row.updated_at)
+                if row.chain_name is None:
+                    coin_prices[row.coin_id] = cached
+                    cache_key = price_cache_key(row.coin_id, None)
                 else:
-                    return None
-            finally:
-                db_manager.close_session(db)
+                    contract_prices[(row.chain_name, row.contract_address)] = cached
+                    cache_key = contract_price_cache_key(row.chain_name, row.contract_address)
+                price_cache.set(cache_key, cached, tags=[coin_price_tag(row.coin_id)])
+
+        result = [
+            CoinPriceGraphQL(coin_id=cached.coin_id, price=cached.price, updated_at=cached.updated_at)
+            for cached in coin_prices.values() if cached is not None
+        ]
+        result.extend(
+            CoinPriceGraphQL(
+                coin_id=cached.coin_id,
+                price=cached.price,
+                updated_at=cached.updated_at,
+                chain_name=chain_name,
+                contract_address=contract_address
+            )
+            for (chain_name, contract_address), cached in contract_prices.items() if cached is not None
+        )
+        return result
+
+    @strawberry.field
+    async def price_history(
+            self,
+            info: Info,
+            coin_id: str,
+            from_: Annotated[datetime.datetime, strawberry.argument(name="from")],
+            to: Optional[datetime.datetime] = None,
+            interval: PriceInterval = PriceInterval.ONE_HOUR
+    ) -> List[PriceBarGraphQL]:
+        """币种价格K线（1m/1h/1d），时间为桶的起始时间（UTC）"""
+        start = _epoch_seconds(from_)
+        end = _epoch_seconds(to) if to is not None else int(datetime.datetime.now(datetime.timezone.utc).timestamp())
+        async with info.context["session_factory"]() as db:
+            price_bars = await AsyncCoinRepository(db).get_price_history(
+                coin_id, INTERVAL_SECONDS[interval.value], start, end, settings.PRICE_HISTORY_MAX_POINTS
+            )
+        return [convert_price_bar_to_graphql(price_bar) for price_bar in price_bars]
@@ -0,0 +1,295 @@
+from bisect import bisect_left, insort
+from dataclasses import dataclass, field
+from sqlalchemy.orm import Session
+from app.database.models import Coin, SupplyInfo, OnChainInfo, ExchangeSpot, ExchangeContract
+from app.config import settings
+from typing import Dict, Hashable, Iterable, List, NamedTuple, Optional, Set, Tuple
+from itertools import islice
+import heapq
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# 前缀区间的上界哨兵
+_PREFIX_END = chr(0x10FFFF)
+
+
+class SearchEntry(NamedTuple):
+    coin_id: str
+    symbol: str
+    name: str
+    market_cap: Optional[float]
+
+
+def normalize_term(term: Optional[str]) -> str:
+    return (term or "").strip().lower()
+
+
+def coin_sources(coin_id: str, symbol: str, name: str) -> List[Tuple[Hashable, str, str]]:
+    """币种自身的检索词：symbol、完整名称及名称中的每个单词"""
+    sources = [(("symbol", coin_id), coin_id, symbol), (("name", coin_id), coin_id, name)]
+    words = normalize_term(name).split()
+    if len(words) > 1:
+        sources.extend((("name", coin_id, word), coin_id, word) for word in words)
+    return sources
+
+
+@dataclass
+class _IndexState:
+    # 有序检索词数组，前缀查询用二分定位区间
+    terms: List[str] = field(default_factory=list)
+    # 检索词 -> {coin_id: 引用计数}
+    postings: Dict[str, Dict[str, int]] = field(default_factory=dict)
+    # 来源（如 ("spot", 交易所, 交易对)）-> (coin_id, 检索词)
+    sources: Dict[Hashable, Tuple[str, str]] = field(default_factory=dict)
+    coins: Dict[str, SearchEntry] = field(default_factory=dict)
+    by_symbol: Dict[str, Set[str]] = field(default_factory=dict)
+    # 短前缀 -> 排名前 N 的 coin_id
+    prefix_cache: Dict[str, List[str]] = field(default_factory=dict)
+
+
+class QuickSearchIndex:
+    """
+    内存前缀索引
+
+    检索词包括 symbol、名称、合约地址与现货/合约交易对名称，
+    前缀匹配通过有序数组二分得到区间，结果按市值排序，symbol 完全匹配的排在最前。
+    短前缀（<= QUICK_SEARCH_CACHED_PREFIX_LENGTH）的结果预先缓存。
+
+    检索词按来源登记，采集任务写库后按来源增量增删；
+    所有结构放在一个 _IndexState 中，全量重建时整体替换
+    """
+
+    def __init__(self):
+        self._state = _IndexState()
+
+    # ------------------------------------------
+    # 查询
+    # ------------------------------------------
+    def search(self, query: str, limit: int = 10) -> List[SearchEntry]:
+        state = self._state
+        prefix = normalize_term(query)
+        if not prefix:
+            return []
+
+        cache_size = settings.QUICK_SEARCH_MAX_LIMIT
+        if len(prefix) <= settings.QUICK_SEARCH_CACHED_PREFIX_LENGTH and limit <= cache_size:
+            ranked = state.prefix_cache.get(prefix)
+            if ranked is None:
+                ranked = state.prefix_cache[prefix] = self._top(state, prefix, cache_size)
+        else:
+            ranked = self._top(state, prefix, limit)
+
+        exact = sorted(state.by_symbol.get(prefix, ()), key=lambda coin_id: self._rank_key(state, coin_id))
+        if exact:
+            ranked = exact + [coin_id for coin_id in ranked if coin_id not in state.by_symbol[prefix]]
+        return [state.coins[coin_id] for coin_id in ranked[:limit]]
+
+    @staticmethod
+    def _rank_key(state: _IndexState, coin_id: str):
+        # 市值降序，无市值的排在最后
+        market_cap = state.coins[coin_id].market_cap
+        return (market_cap is None, -(market_cap or 0.0), coin_id)
+
+    def _top(self, state: _IndexState, prefix: str, limit: int) -> List[str]:
+        lo = bisect_left(state.terms, prefix)
+        hi = bisect_left(state.terms, prefix + _PREFIX_END, lo)
+        candidates: Set[str] = set()
+        for term in state.terms[lo:hi]:
+            candidates.update(state.postings[term])
+        candidates = [coin_id for coin_id in candidates if coin_id in state.coins]
+        return heapq.nsmallest(limit, candidates, key=lambda coin_id: self._rank_key(state, coin_id))
+
+    def stats(self) -> dict:
+        state = self._state
+        return {
+            "coins": len(state.coins),
+            "terms": len(state.terms),
+            "sources": len(state.sources),
+            "cached_prefixes": len(state.prefix_cache),
+        }
+
+    # ------------------------------------------
+    # 增量更新（采集任务写库后调用）
+    # ------------------------------------------
+    def upsert_coins(self, coins: Iterable[Tuple[str, str, str]]):
+        """新增或更新币种 (coin_id, symbol, name)"""
+        state = self._state
+        sources = []
+        changed: Set[str] = set()
+        for coin_id, symbol, name in coins:
+            previous = state.coins.get(coin_id)
+            if previous is not None:
+                self._discard_symbol(state, previous)
+                changed |= self._remove_sources(
+                    state, [key for key, _, _ in coin_sources(coin_id, previous.symbol, previous.name)], warm=False
+                )
+            entry = SearchEntry(coin_id, symbol, name, previous.market_cap if previous else None)
+            state.coins[coin_id] = entry
+            state.by_symbol.setdefault(normalize_term(symbol), set()).add(coin_id)
+            sources.extend(coin_sources(coin_id, symbol, name))
+        self.add_sources(sources)
+        self._invalidate_prefixes(state, changed)
+
+    def update_market_caps(self, market_caps: Dict[str, Optional[float]]):
+        """
+        市值变化会影响全部排序，清空前缀缓存
+
+        在事件循环中调用，只预热最慢的单字符前缀，其余短前缀在首次查询时计算
+        """
+        state = self._state
+        for coin_id, market_cap in market_caps.items():
+            entry = state.coins.get(coin_id)
+            if entry is not None:
+                state.coins[coin_id] = entry._replace(market_cap=market_cap)
+        state.prefix_cache.clear()
+        self._warm_first_chars(state)
+
+    def add_sources(self, sources: Iterable[Tuple[Hashable, str, str]]):
+        """登记检索词来源 (source_key, coin_id, term)，同一来源重复登记只保留最新的"""
+        state = self._state
+        changed: Set[str] = set()
+        new_terms: List[str] = []
+        stale_keys = []
+        additions = []
+        for source_key, coin_id, term in sources:
+            term = normalize_term(term)
+            if not term:
+                continue
+            current = state.sources.get(source_key)
+            if current == (coin_id, term):
+                continue
+            if current is not None:
+                stale_keys.append(source_key)
+            additions.append((source_key, coin_id, term))
+        if stale_keys:
+            changed |= self._remove_sources(state, stale_keys, warm=False)
+
+        for source_key, coin_id, term in additions:
+            state.sources[source_key] = (coin_id, term)
+            refs = state.postings.get(term)
+            if refs is None:
+                refs = state.postings[term] = {}
+                new_terms.append(term)
+            refs[coin_id] = refs.get(coin_id, 0) + 1
+            changed.add(term)
+
+        if new_terms:
+            # 少量新词逐个插入，大批量时合并后整体排序
+            if len(new_terms) > settings.QUICK_SEARCH_RESORT_THRESHOLD:
+                state.terms.extend(new_terms)
+                state.terms.sort()
+            else:
+                for term in new_terms:
+                    insort(state.terms, term)
+        self._invalidate_prefixes(state, changed)
+
+    def remove_sources(self, source_keys: Iterable[Hashable]):
+        self._remove_sources(self._state, source_keys)
+
+    def _remove_sources(self, state: _IndexState, source_keys: Iterable[Hashable], warm: bool = True) -> Set[str]:
+        changed: Set[str] = set()
+        for source_key in source_keys:
+            current = state.sources.pop(source_key, None)
+            if current is None:
+                continue
+            coin_id, term = current
+            refs = state.postings[term]
+            refs[coin_id] -= 1
+            if refs[coin_id] <= 0:
+                del refs[coin_id]
+            if not refs:
+                del state.postings[term]
+                index = bisect_left(state.terms, term)
+                if index < len(state.terms) and state.terms[index] == term:
+                    del state.terms[index]
+            changed.add(term)
+        if warm:
+            self._invalidate_prefixes(state, changed)
+        return changed
+
+    @staticmethod
+    def _discard_symbol(state: _IndexState, entry: SearchEntry):
+        coin_ids = state.by_symbol.get(normalize_term(entry.symbol))
+        if coin_ids is not None:
+            coin_ids.discard(entry.coin_id)
+            if not coin_ids:
+                del state.by_symbol[normalize_term(entry.symbol)]
+
+    @staticmethod
+    def _short_prefixes(terms: Iterable[str]) -> Set[str]:
+        max_length = settings.QUICK_SEARCH_CACHED_PREFIX_LENGTH
+        return {term[:length] for term in terms for length in range(1, min(len(term), max_length) + 1)}
+
+    def _invalidate_prefixes(self, state: _IndexState, terms: Set[str]):
+        if not terms:
+            return
+        prefixes = self._short_prefixes(terms)
+        for prefix in prefixes:
+            state.prefix_cache.pop(prefix, None)
+        self._warm(state, prefixes)
+
+    def _warm_first_chars(self, state: _IndexState):
+        """单字符前缀一次性计算：全部币种排序一次，再按首字符依次取前 N 个"""
+        coins_by_char: Dict[str, Set[str]] = {}
+        for term, refs in state.postings.items():
+            coins_by_char.setdefault(term[0], set()).update(refs)
+        ranked_all = sorted(state.coins, key=lambda coin_id: self._rank_key(state, coin_id))
+        cache_size = settings.QUICK_SEARCH_MAX_LIMIT
+        for first_char, coin_ids in coins_by_char.items():
+            state.prefix_cache[first_char] = list(islice(
+                (coin_id for coin_id in ranked_all if coin_id in coin_ids), cache_size
+            ))
+
+    def _warm(self, state: _IndexState, prefixes: Set[str]):
+        """预先计算短前缀的排名（区间大、最慢的查询），查询时直接命中缓存"""
+        cache_size = settings.QUICK_SEARCH_MAX_LIMIT
+        for prefix in prefixes - state.prefix_cache.keys():
+            ranked = self._top(state, prefix, cache_size)
+            if ranked:
+                state.prefix_cache[prefix] = ranked
+
+    # ------------------------------------------
+    # 全量构建
+    # ------------------------------------------
+    def rebuild(self, session: Session):
+        """从数据库全量构建索引，构建完成后整体替换"""
+        started = time.perf_counter()
+        index = QuickSearchIndex()
+        state = index._state
+        for coin_id, symbol, name, market_cap in session.query(
+            Coin.id, Coin.symbol, Coin.name, SupplyInfo.market_cap
+        ).outerjoin(SupplyInfo, SupplyInfo.coin_id == Coin.id).all():
+            state.coins[coin_id] = SearchEntry(coin_id, symbol, name, market_cap)
+            state.by_symbol.setdefault(normalize_term(symbol), set()).add(coin_id)
+
+        sources = [source for entry in state.coins.values() for source in coin_sources(entry.coin_id, entry.symbol, entry.name)]
+        sources.extend(
+            (("contract", row.chain_name, row.contract_address), row.coin_id, row.contract_address)
+            for row in session.query(OnChainInfo.coin_id, OnChainInfo.chain_name, OnChainInfo.contract_address).all()
+        )
+        for model, pair_column in ((ExchangeSpot, ExchangeSpot.spot_name), (ExchangeContract, ExchangeContract.contract_name)):
+            sources.extend(
+                ((model.__tablename__, row.exchange_name, row[2]), row.coin_id, row[2])
+                for row in session.query(model.coin_id, model.exchange_name, pair_column).all()
+            )
+        # 全量构建时不逐个排序和预热，最后统一处理
+        state.terms = []
+        for source_key, coin_id, term in sources:
+            term = normalize_term(term)
+            if not term:
+                continue
+            state.sources[source_key] = (coin_id, term)
+            state.postings.setdefault(term, {})
+            state.postings[term][coin_id] = state.postings[term].get(coin_id, 0) + 1
+        state.terms = sorted(state.postings)
+        index._warm_first_chars(state)
+        index._warm(state, self._short_prefixes(state.terms))
+
+        self._state = state
+        logger.info(f"Quick search index rebuilt in {time.perf_counter() - started:.2f}s: {self.stats()}")
+
+
+# 进程内共享的搜索索引
+search_index = QuickSearchIndex()
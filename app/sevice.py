@@ -1,48 +1,62 @@
 import asyncio
 
-from app.database.processor import DataProcessor
-from app.database.models import Coin
-from typing import List, Optional
-
+from app.database.jobs import JobOrchestrator
+from app.database.price_stream import PriceStreamer
+from app.database.models import Coin, ExchangeSpot
 from app.database.query import CoinRepository
+from typing import List, Optional
 
 
 class CoinService:
-    def __init__(self, coin_repository: CoinRepository, data_processor: DataProcessor):
+    """只读查询服务，每个请求一个，只持有 repository（只读会话）"""
+
+    def __init__(self, coin_repository: CoinRepository):
         self.repository = coin_repository
-        self.processor = data_processor
 
     def get_coin_by_id(self, coin_id: str) -> Optional[Coin]:
         """根据ID获取币种"""
-        return self.repository.get_coin_by_id(coin_id)
+        coins = self.repository.get_coins_with_filters(coin_id=coin_id, limit=1, with_relations=False)
+        return coins[0] if coins else None
 
-    def get_coins_by_contract_address(self, contract_address: str) -> List[Coin]:
-        """根据合约地址获取币种"""
-        return self.repository.get_coins_by_contract_address(contract_address)
+    def search_coins(self, search_term: str, limit: int = 20) -> List[Coin]:
+        """全文搜索币种，按相关度与市值排序"""
+        return self.repository.search_coins(search_term, limit)
 
-    def get_coins_by_exchange(self, exchange_id: str) -> List[Coin]:
-        """根据交易所获取币种"""
-        return self.repository.get_coins_by_exchange(exchange_id)
+    def get_exchange_spot(self, exchange_spot_id: int) -> Optional[ExchangeSpot]:
+        """根据ID获取现货交易对（含所属币种）"""
+        exchange_spots = self.repository.get_all_coins_by_exchange_spot_id(exchange_spot_id)
+        return exchange_spots[0] if exchange_spots else None
 
-    def search_coins(self, search_term: str) -> List[Coin]:
-        """搜索币种"""
-        return self.repository.search_coins(search_term)
 
-    def get_all_coins(self, limit: int = 100) -> List[Coin]:
-        """获取所有币种"""
-        return self.repository.get_all_coins(limit)
+class IngestionService:
+    """数据采集服务，进程内只创建一个，持有任务编排器与共享的爬虫客户端"""
 
-    def get_tokens_by_holder(self, holder_address: str) -> List[Coin]:
-        """根据持有者地址获取代币"""
-        return self.repository.get_tokens_by_holder(holder_address)
+    def __init__(self, orchestrator: JobOrchestrator):
+        self.orchestrator = orchestrator
+        self._holders_task: Optional[asyncio.Task] = None
+        self.price_streamer: Optional[PriceStreamer] = None
 
     async def refresh_data(self):
-        """刷新数据"""
-        # await self.processor.initialize_ccxt_clients()
-        await self.processor.update_exchange_prices_with_cg()
-        # await self.processor.update_exchange_prices_with_ccxt()
-        await self.processor.initialize_coins_data()
-        await self.processor.update_market_data()
-        await self.processor.update_exchange_data()
-        import threading
-        threading.Thread(target=lambda: asyncio.run(self.processor.update_top_project_token_holders())).start()
+        """按依赖顺序刷新数据"""
+        await self.orchestrator.run_all(skip=("holders",))
+        # 持有者同步耗时较长，在当前事件循环中后台运行
+        self._holders_task = asyncio.create_task(self.orchestrator.run("holders"))
+
+    def start_price_stream(self):
+        """启动 ccxt.pro 行情推送"""
+        if self.price_streamer is None:
+            # 写库在线程中进行，每次写入使用独立的 Session
+            self.price_streamer = PriceStreamer(
+                session_factory=self.orchestrator.session_factory,
+                clients=self.orchestrator.clients,
+                write_lock=self.orchestrator.write_lock("price_stream")
+            )
+        self.price_streamer.start()
+
+    async def close(self):
+        """停止后台任务并关闭客户端连接"""
+        if self._holders_task and not self._holders_task.done():
+            self._holders_task.cancel()
+        if self.price_streamer is not None:
+            await self.price_streamer.stop()
+        await self.orchestrator.clients.close()
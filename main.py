@@ -1,75 +1,73 @@
 from fastapi import FastAPI, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
-from sqlalchemy.orm import Session
-from app.database.processor import DataProcessor
+from sqlmodel import select, func
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.database.jobs import JobOrchestrator
 from app.database.models import Coin
-from app.database.manager import DatabaseManager
+from app.database.manager import db_manager
 from app.config import settings
+from app.cache import price_cache
+from app.search_index import search_index
+from app.crawlers.clients import get_crawler_clients
+import asyncio
 import logging
 import uvicorn
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from apscheduler.triggers.interval import IntervalTrigger
-from app.database.query import CoinRepository
-from app.sevice import CoinService
+from app.sevice import IngestionService
 # 添加GraphQL相关导入
 import strawberry
 from strawberry.fastapi import GraphQLRouter
-from app.graphql import Query as GraphQLQuery
+from app.graphql import Query as GraphQLQuery, get_graphql_context
 
 # 初始化组件
-db_manager = DatabaseManager()
-app_service: CoinService = None
+ingestion_service: IngestionService = None
 
 # 配置日志
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def get_db_session():
-    """依赖注入：获取数据库会话"""
-    db = db_manager.get_session()
-    try:
+async def get_async_db_session():
+    """依赖注入：获取异步数据库会话"""
+    async with db_manager.get_async_session() as db:
         yield db
-    finally:
-        db_manager.close_session(db)
-
-def get_coin_service(db: Session = Depends(get_db_session)):
-    """依赖注入：获取币种服务"""
-    repository = CoinRepository(db)
-    processor = DataProcessor(db)
-    return CoinService(repository, processor)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    global app_service
+    global ingestion_service
 
     # 初始化数据库
     db_manager.init_db()
 
-    # 获取数据库会话和服务
-    db = db_manager.get_session()
-    repository = CoinRepository(db)
-    processor = DataProcessor(db)
-    app_service = CoinService(repository, processor)
+    # 构建快速搜索索引（同步查询放到线程中执行）
+    def build_search_index():
+        session = db_manager.get_read_session()
+        try:
+            search_index.rebuild(session)
+        finally:
+            db_manager.close_session(session)
+    await asyncio.to_thread(build_search_index)
+
+    # 采集服务进程内只创建一次，爬虫/ccxt 客户端随之复用；每次任务运行使用独立的 Session
+    ingestion_service = IngestionService(JobOrchestrator(db_manager.get_session, get_crawler_clients()))
 
     # 初始化数据
     force_refresh = settings.FORCE_REFRESH_DATA
     if force_refresh:
-        await app_service.refresh_data()
-    db_manager.close_session(db)
+        await ingestion_service.refresh_data()
 
-    # schedule 定时任务
+    # schedule 定时任务（每个任务单实例运行，共用一把写锁并按依赖顺序执行）
     scheduler = AsyncIOScheduler()
-    scheduler.add_job(app_service.processor.initialize_coins_data, IntervalTrigger(minutes=settings.COIN_LIST_REFRESH_INTERVAL_MINUTES))
-    scheduler.add_job(app_service.processor.update_exchange_data, IntervalTrigger(minutes=settings.EXCHANGE_DATA_REFRESH_INTERVAL_MINUTES))
-    scheduler.add_job(app_service.processor.update_market_data, IntervalTrigger(minutes=settings.MARKET_DATA_REFRESH_INTERVAL_MINUTES))
-    scheduler.add_job(app_service.processor.update_top_project_token_holders, IntervalTrigger(minutes=settings.TOKEN_HOLDERS_REFRESH_INTERVAL_MINUTES))
-    # scheduler.add_job(app_service.processor.update_exchange_prices_with_ccxt, IntervalTrigger(minutes=settings.EXCHANGE_DATA_REFRESH_INTERVAL_MINUTES))
-    scheduler.add_job(app_service.processor.update_exchange_prices_with_cg, IntervalTrigger(minutes=settings.EXCHANGE_DATA_REFRESH_INTERVAL_MINUTES))
+    ingestion_service.orchestrator.schedule(scheduler)
     scheduler.start()
+    if settings.PRICE_STREAM_ENABLED:
+        ingestion_service.start_price_stream()
 
     logger.info("Application started")
     yield
+    scheduler.shutdown(wait=False)
+    await ingestion_service.close()
+    await db_manager.dispose()
     logger.info("Application stopped")
 
 # 创建GraphQL schema
@@ -82,9 +80,12 @@ app = FastAPI(
     lifespan=lifespan
 )
 from app.blueprints.quick_search import router as quick_search_router
+from app.blueprints.coins import router as coins_router
 app.include_router(quick_search_router)
+# 只读查询路由（CoinService，只读会话）
+app.include_router(coins_router)
 # 添加GraphQL路由
-graphql_app = GraphQLRouter(schema)
+graphql_app = GraphQLRouter(schema, context_getter=get_graphql_context)
 app.include_router(graphql_app, prefix="/graphql")
 
 # CORS中间件
@@ -98,7 +99,6 @@ app.add_middleware(
 
 # ... existing code ...
 
-# 删除原有的HTTP查询端点，只保留根路径和健康检查端点
 @app.get("/")
 async def root():
     return {
@@ -109,13 +109,16 @@ async def root():
     }
 
 @app.get("/health")
-async def health_check(service: CoinService = Depends(get_coin_service)):
+async def health_check(db: AsyncSession = Depends(get_async_db_session)):
     """健康检查"""
-    db = next(get_db_session())
-    coin_count = db.query(Coin).count()
+    coin_count = (await db.exec(select(func.count()).select_from(Coin))).one()
     return {
         "status": "healthy",
-        "coin_count": coin_count
+        "coin_count": coin_count,
+        "price_cache": price_cache.stats(),
+        "price_stream": ingestion_service.price_streamer.stats()
+        if ingestion_service and ingestion_service.price_streamer else None,
+        "jobs": ingestion_service.orchestrator.stats() if ingestion_service else None
     }
 
 
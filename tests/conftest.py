@@ -0,0 +1,37 @@
+import asyncio
+import datetime
+from types import SimpleNamespace
+
+import pytest
+
+from app.database.interning import entity_interner, label_interner
+from app.database.manager import DatabaseManager
+
+
+@pytest.fixture
+def db(tmp_path):
+    """文件型 SQLite 数据库（写引擎 + 只读连接池），测试结束后释放"""
+    manager = DatabaseManager(f"sqlite:///{tmp_path / 'test.db'}")
+    manager.init_db()
+    yield manager
+    asyncio.run(manager.dispose())
+
+
+@pytest.fixture(autouse=True)
+def clear_interners():
+    # 驻留缓存为进程级，id 只对单个测试库有效
+    entity_interner.cache.clear()
+    label_interner.cache.clear()
+
+
+@pytest.fixture
+def now():
+    return datetime.datetime.now(datetime.timezone.utc)
+
+
+def fake_clients(**crawlers):
+    """只带指定爬虫的 CrawlerClients 替身"""
+    clients = SimpleNamespace(cg_crawler=None, cmc_crawler=None, arkm_crawler=None, ccxt_clients={})
+    for name, crawler in crawlers.items():
+        setattr(clients, name, crawler)
+    return clients
@@ -0,0 +1,148 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from app.config import settings
+from app.crawlers.coingecko import CoingeckoCrawler
+from app.crawlers.core import BaseCrawler, CircuitBreaker, CircuitOpenError, TokenBucket
+from app.database.models import Coin, ExchangeSpot
+from app.database.processor import DataProcessor
+from tests.conftest import fake_clients
+
+
+class ServiceUnavailable(Exception):
+    status_code = 503
+
+
+class FakeCrawler(BaseCrawler):
+    provider = "arkm"
+
+    def __init__(self, breaker: CircuitBreaker):
+        self.rate_limiter = TokenBucket(rate_per_minute=60000, burst=1000)
+        self.circuit_breaker = breaker
+
+
+@pytest.fixture(autouse=True)
+def fast_retries(monkeypatch):
+    monkeypatch.setattr(settings, "CRAWLER_MAX_RETRIES", 2)
+    monkeypatch.setattr(settings, "CRAWLER_BACKOFF_BASE_SECONDS", 0.0)
+    monkeypatch.setattr(settings, "CRAWLER_BACKOFF_MAX_SECONDS", 0.0)
+
+
+def failing():
+    raise ServiceUnavailable("503")
+
+
+def test_half_open_trial_failure_reopens_then_recovers():
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=0.05)
+    crawler = FakeCrawler(breaker)
+
+    async def scenario():
+        # 打开
+        with pytest.raises(ServiceUnavailable):
+            await crawler._request(failing)
+        assert breaker.is_open
+        with pytest.raises(CircuitOpenError):
+            await crawler._request(lambda: "ok")
+
+        # 半开：试探请求重试耗尽后重新打开，而不是卡在试探中
+        await asyncio.sleep(0.06)
+        with pytest.raises(ServiceUnavailable):
+            await crawler._request(failing)
+        assert breaker.is_open
+        assert not breaker._trial_in_flight
+
+        # 再次半开：试探成功后关闭
+        await asyncio.sleep(0.06)
+        assert await crawler._request(lambda: "ok") == "ok"
+        assert not breaker.is_open
+        assert await crawler._request(lambda: "again") == "again"
+
+    asyncio.run(scenario())
+
+
+def test_half_open_trial_retry_succeeds():
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=0.01)
+    crawler = FakeCrawler(breaker)
+    calls = []
+
+    def flaky():
+        calls.append(1)
+        if len(calls) == 1:
+            raise ServiceUnavailable("503")
+        return "ok"
+
+    async def scenario():
+        with pytest.raises(ServiceUnavailable):
+            await crawler._request(failing)
+        await asyncio.sleep(0.02)
+        assert await crawler._request(flaky) == "ok"
+        assert not breaker.is_open
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_trial_releases_half_open_slot():
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=0.01)
+    crawler = FakeCrawler(breaker)
+
+    async def scenario():
+        with pytest.raises(ServiceUnavailable):
+            await crawler._request(failing)
+        await asyncio.sleep(0.02)
+        task = asyncio.create_task(crawler._request(asyncio.sleep, 10))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert not breaker._trial_in_flight
+        assert await crawler._request(lambda: "ok") == "ok"
+
+    asyncio.run(scenario())
+
+
+def test_non_retryable_error_closes_circuit():
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=0.01)
+    crawler = FakeCrawler(breaker)
+
+    async def scenario():
+        with pytest.raises(ServiceUnavailable):
+            await crawler._request(failing)
+        time.sleep(0.02)
+        with pytest.raises(KeyError):
+            await crawler._request(lambda: {}["missing"])
+        assert not breaker.is_open
+
+    asyncio.run(scenario())
+
+
+def test_simple_price_batches_are_paced_by_rate_limiter(db, now, monkeypatch):
+    monkeypatch.setattr(settings, "CG_SIMPLE_PRICE_BATCH_SIZE", 1)
+    with db.get_session() as session:
+        for coin_id in ("a", "b", "c", "d"):
+            session.add(Coin(id=coin_id, symbol=coin_id.upper(), name=coin_id, created_at=now, updated_at=now))
+            session.add(ExchangeSpot(coin_id=coin_id, exchange_name="binance", spot_name=f"{coin_id.upper()}/USDT", updated_at=now))
+        session.commit()
+
+    sent = []
+
+    async def simple_price(ids, vs_currencies):
+        sent.append(time.monotonic())
+        return {coin_id: SimpleNamespace(usd=1.0) for coin_id in ids.split(",")}
+
+    crawler = CoingeckoCrawler.__new__(CoingeckoCrawler)
+    # 每秒 20 个请求、无突发：4 个批次均匀间隔 50ms 发出，而不是同一分钟开头一次发完
+    crawler.rate_limiter = TokenBucket(rate_per_minute=1200, burst=1)
+    crawler.circuit_breaker = CircuitBreaker(failure_threshold=5, reset_seconds=60)
+    crawler.cg = SimpleNamespace(simple=SimpleNamespace(price=SimpleNamespace(get=simple_price)))
+
+    with db.get_session() as session:
+        processor = DataProcessor(session, fake_clients(cg_crawler=crawler))
+        assert asyncio.run(processor.update_exchange_prices_with_cg()) == 4
+
+    assert processor.last_price_refresh_metrics.batches == 4
+    gaps = [later - earlier for earlier, later in zip(sent, sent[1:])]
+    assert len(gaps) == 3
+    assert all(0.04 <= gap < 1.0 for gap in gaps)
@@ -0,0 +1,64 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.crawlers.coingecko import TICKERS_PAGE_SIZE, CoingeckoCrawler, TickerPagesTruncated
+from app.database.models import Coin, ExchangeSpot
+from app.database.processor import DataProcessor
+from tests.conftest import fake_clients
+
+
+def ticker(base, coin_id="bitcoin", target="USDT"):
+    return SimpleNamespace(base=base, target=target, coin_id=coin_id)
+
+
+class FullPagesCrawler(CoingeckoCrawler):
+    def __init__(self):
+        pass
+
+    async def _fetch_exchange_tickers_page(self, exchange_id, page):
+        return [ticker(f"T{page}_{i}") for i in range(TICKERS_PAGE_SIZE)]
+
+
+def test_iter_exchange_tickers_raises_when_max_pages_reached():
+    async def collect():
+        pages = []
+        with pytest.raises(TickerPagesTruncated):
+            async for tickers in FullPagesCrawler().iter_exchange_tickers("binance", page_concurrency=2, max_pages=3):
+                pages.append(tickers)
+        return pages
+
+    assert len(asyncio.run(collect())) == 3
+
+
+class TruncatedCrawler:
+    async def iter_exchange_tickers(self, exchange_id):
+        if exchange_id == "binance":
+            yield [ticker("BTC")]
+            raise TickerPagesTruncated("truncated")
+        if exchange_id == "okex":
+            yield [ticker("BTC")]
+
+    async def iter_derivatives_tickers(self, exchange_id):
+        return
+        yield
+
+
+def test_truncated_exchange_keeps_pairs_beyond_last_page(db, now):
+    with db.get_session() as session:
+        session.add(Coin(id="bitcoin", symbol="BTC", name="Bitcoin", created_at=now, updated_at=now))
+        session.add_all([
+            ExchangeSpot(coin_id="bitcoin", exchange_name=exchange, spot_name="OLD/USDT", updated_at=now)
+            for exchange in ("binance", "okex")
+        ])
+        session.commit()
+
+        processor = DataProcessor(session, fake_clients(cg_crawler=TruncatedCrawler()))
+        asyncio.run(processor.update_exchange_data())
+
+        pairs = {(row.exchange_name, row.spot_name) for row in session.query(ExchangeSpot).all()}
+    # 截断的交易所不做下架清理，完整抓取的交易所照常删除下架交易对
+    assert ("binance", "OLD/USDT") in pairs
+    assert ("okex", "OLD/USDT") not in pairs
+    assert {("binance", "BTC/USDT"), ("okex", "BTC/USDT")} <= pairs
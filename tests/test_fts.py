@@ -0,0 +1,73 @@
+import asyncio
+
+from sqlalchemy import text
+
+from app.database.fts import ensure_coin_search, refresh_coin_search
+from app.database.models import Coin, ExchangeSpot, SupplyInfo
+from app.database.query import AsyncCoinRepository, CoinRepository
+
+
+def add_coins(db, now, *coins):
+    with db.get_session() as session:
+        session.add_all(
+            Coin(id=coin_id, symbol=symbol, name=name, created_at=now, updated_at=now)
+            for coin_id, symbol, name in coins
+        )
+        session.commit()
+        refresh_coin_search(session, [coin_id for coin_id, _, _ in coins])
+
+
+def search(db, term, limit=20):
+    with db.get_read_session() as session:
+        return [coin.id for coin in CoinRepository(session).search_coins(term, limit)]
+
+
+def test_search_ranks_symbol_over_name_and_pairs(db, now):
+    add_coins(db, now, ("bitcoin", "BTC", "Bitcoin"), ("wrapped-bitcoin", "WBTC", "Wrapped Bitcoin"), ("sol", "SOL", "Solana"))
+    with db.get_session() as session:
+        session.add(ExchangeSpot(coin_id="sol", exchange_name="binance", spot_name="SOL/BTC", updated_at=now))
+        session.add(SupplyInfo(coin_id="wrapped-bitcoin", market_cap=1e9, updated_at=now))
+        session.commit()
+        refresh_coin_search(session, ["sol"])
+
+    assert search(db, "btc") == ["bitcoin", "sol"]
+    assert search(db, "bitc") == ["bitcoin", "wrapped-bitcoin"]
+    assert search(db, "wrapped bit") == ["wrapped-bitcoin"]
+    assert search(db, "  ") == []
+
+
+def test_search_survives_vacuum_and_coin_deletion(db, now):
+    add_coins(db, now, ("aave", "AAVE", "Aave"), ("bitcoin", "BTC", "Bitcoin"), ("cardano", "ADA", "Cardano"))
+    with db.get_session() as session:
+        session.query(Coin).filter(Coin.id == "aave").delete()
+        session.commit()
+        # 已删除的币种也要移除索引行
+        refresh_coin_search(session, ["aave"])
+    # VACUUM 会重新编号 coins 的隐式 rowid
+    with db.engine.connect() as conn:
+        conn.execution_options(isolation_level="AUTOCOMMIT").execute(text("VACUUM"))
+
+    assert search(db, "aave") == []
+    assert search(db, "cardano") == ["cardano"]
+    assert search(db, "bitcoin") == ["bitcoin"]
+    with db.get_read_session() as session:
+        assert session.execute(text("SELECT count(*) FROM coin_search")).scalar() == 2
+
+
+def test_legacy_rowid_index_is_rebuilt(db, now):
+    add_coins(db, now, ("bitcoin", "BTC", "Bitcoin"))
+    with db.engine.begin() as conn:
+        conn.execute(text("DROP TABLE coin_search"))
+        conn.execute(text("CREATE VIRTUAL TABLE coin_search USING fts5(symbol, name, pairs)"))
+    ensure_coin_search(db.engine)
+    assert search(db, "bitcoin") == ["bitcoin"]
+
+
+def test_async_search(db, now):
+    add_coins(db, now, ("ethereum", "ETH", "Ethereum"))
+
+    async def query():
+        async with db.get_async_session() as session:
+            return [coin.id for coin in await AsyncCoinRepository(session).search_coins("eth")]
+
+    assert asyncio.run(query()) == ["ethereum"]
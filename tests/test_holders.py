@@ -0,0 +1,53 @@
+from functools import partial
+
+from sqlmodel import Session
+
+from app.database.holders import HolderIngestionWorker
+from app.database.models import Coin, CoinHolding, HolderSyncCheckpoint
+
+
+def holders_response(*addresses):
+    return {"addressTopHolders": {"ethereum": [
+        {"address": {"address": address, "arkhamEntity": {"name": "Binance", "type": "cex"}}, "balance": 1.0, "usd": 2.0}
+        for address in addresses
+    ]}}
+
+
+def holdings(db):
+    with db.get_session() as session:
+        return {(row.coin_id, row.holder_id) for row in session.query(CoinHolding).all()}
+
+
+def checkpoint_count(db, coin_id):
+    with db.get_session() as session:
+        return session.get(HolderSyncCheckpoint, coin_id).holders_count
+
+
+def test_empty_holder_list_deletes_only_after_confirmation(db, now):
+    with db.get_session() as session:
+        session.add(Coin(id="token", symbol="TKN", name="Token", created_at=now, updated_at=now))
+        session.commit()
+    worker = HolderIngestionWorker(session_factory=partial(Session, db.engine), arkm_crawler=None)
+
+    assert worker._write_batch([("token", holders_response("0x1", "0x2"))]) == 2
+    assert len(holdings(db)) == 2
+
+    # 第一次返回空列表：可疑，保留持仓
+    assert worker._write_batch([("token", {"addressTopHolders": {}})]) == 0
+    assert len(holdings(db)) == 2
+    assert checkpoint_count(db, "token") == 0
+
+    # 连续第二次为空：确认清空
+    assert worker._write_batch([("token", {"addressTopHolders": {"ethereum": []}})]) == 2
+    assert holdings(db) == set()
+
+
+def test_non_empty_snapshot_still_removes_exited_holders(db, now):
+    with db.get_session() as session:
+        session.add(Coin(id="token", symbol="TKN", name="Token", created_at=now, updated_at=now))
+        session.commit()
+    worker = HolderIngestionWorker(session_factory=partial(Session, db.engine), arkm_crawler=None)
+
+    worker._write_batch([("token", holders_response("0x1", "0x2"))])
+    assert worker._write_batch([("token", holders_response("0x2"))]) == 1
+    assert len(holdings(db)) == 1
@@ -0,0 +1,100 @@
+import asyncio
+
+from sqlalchemy import func, text
+
+from app.database.compact import compact_entities_and_labels
+from app.database.interning import KeyInterner, entity_interner, label_interner
+from app.database.manager import DatabaseManager
+from app.database.models import ARKMEntity, Holder, Label
+
+
+def test_resolve_tolerates_key_inserted_by_concurrent_writer(db):
+    interner = KeyInterner(ARKMEntity, ("name", "type"))
+    lookup = interner._lookup
+    with db.get_session() as writer, db.get_session() as session:
+        calls = []
+
+        def racing_lookup(sess, keys):
+            # 第一次查询之后、插入之前，另一个写入者插入了同一个键
+            if not calls:
+                calls.append(1)
+                writer.add(ARKMEntity(name="Binance", type="cex"))
+                writer.commit()
+                return {}
+            return lookup(sess, keys)
+
+        interner._lookup = racing_lookup
+        resolved = interner.resolve(session, [("Binance", "cex"), ("OKX", None)])
+        session.commit()
+
+        existing_id = writer.query(ARKMEntity.id).filter(ARKMEntity.name == "Binance").scalar()
+        assert resolved[("Binance", "cex")] == existing_id
+        assert session.query(func.count()).select_from(ARKMEntity).scalar() == 2
+
+
+def test_compact_merges_duplicates_and_restores_unique_index(db, now):
+    with db.engine.begin() as conn:
+        conn.execute(text("DROP INDEX uq_entity_name_type"))
+        conn.execute(text("DROP INDEX uq_label_name_chain"))
+    with db.get_session() as session:
+        entities = [ARKMEntity(name="Binance", type="cex"), ARKMEntity(name="Binance", type="cex"), ARKMEntity(name="OKX")]
+        labels = [Label(name="hot", chain_type="tron"), Label(name="hot", chain_type="tron")]
+        session.add_all(entities + labels)
+        session.commit()
+        session.add_all([
+            Holder(address="0x1", entity_id=entities[1].id, label_id=labels[1].id, updated_at=now),
+            Holder(address="0x2", entity_id=entities[0].id, label_id=labels[0].id, updated_at=now),
+        ])
+        session.commit()
+        keep_entity, keep_label = entities[0].id, labels[0].id
+
+    assert compact_entities_and_labels(db.engine) == {"arkm_entities": 1, "labels": 1}
+
+    with db.get_session() as session:
+        assert {row.entity_id for row in session.query(Holder).all()} == {keep_entity}
+        assert {row.label_id for row in session.query(Holder).all()} == {keep_label}
+        assert session.query(ARKMEntity).filter(ARKMEntity.name == "OKX").one().type == ""
+    with db.engine.connect() as conn:
+        indexes = {row[1] for row in conn.execute(text("PRAGMA index_list(arkm_entities)"))}
+        assert "uq_entity_name_type" in indexes
+        assert conn.execute(text("SELECT name FROM sqlite_master WHERE name LIKE '%compact_map%'")).all() == []
+    # 再次运行不重复建索引
+    assert compact_entities_and_labels(db.engine) == {"arkm_entities": 0, "labels": 0}
+
+
+def test_init_db_adds_unique_indexes_to_an_existing_database(tmp_path, now):
+    url = f"sqlite:///{tmp_path / 'legacy.db'}"
+    legacy = DatabaseManager(url)
+    legacy.init_db()
+    # 旧版本的表结构：没有唯一索引，且已有重复行
+    with legacy.engine.begin() as conn:
+        conn.execute(text("DROP INDEX uq_entity_name_type"))
+        conn.execute(text("DROP INDEX uq_label_name_chain"))
+    with legacy.get_session() as session:
+        entities = [ARKMEntity(name="Binance", type="cex"), ARKMEntity(name="Binance", type="cex")]
+        labels = [Label(name="hot", chain_type=None), Label(name="hot", chain_type=None)]
+        session.add_all(entities + labels)
+        session.commit()
+        session.add(Holder(address="0x1", entity_id=entities[1].id, label_id=labels[1].id, updated_at=now))
+        session.commit()
+        keep_entity, keep_label = entities[0].id, labels[0].id
+    asyncio.run(legacy.dispose())
+
+    upgraded = DatabaseManager(url)
+    upgraded.init_db()
+    try:
+        with upgraded.get_session() as session:
+            entity_ids = entity_interner.resolve(session, [("Binance", "cex"), ("OKX", "cex")])
+            label_ids = label_interner.resolve(session, [("hot", None), ("cold", "tron")])
+            session.commit()
+
+            assert entity_ids[("Binance", "cex")] == keep_entity
+            assert label_ids[("hot", "")] == keep_label
+            assert session.query(func.count()).select_from(ARKMEntity).scalar() == 2
+            assert session.query(func.count()).select_from(Label).scalar() == 2
+            holder = session.query(Holder).one()
+            assert (holder.entity_id, holder.label_id) == (keep_entity, keep_label)
+        # 索引已存在时重复初始化不再压缩
+        upgraded.init_db()
+    finally:
+        asyncio.run(upgraded.dispose())
@@ -0,0 +1,190 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.database.jobs import JobOrchestrator, PriorityLock
+from app.database.models import Coin, ExchangeSpot, JobRun, SupplyInfo
+from app.database.processor import DataProcessor
+from tests.conftest import fake_clients
+
+
+@pytest.fixture
+def events():
+    return []
+
+
+@pytest.fixture
+def fake_jobs(monkeypatch, events):
+    """把各任务替换为：抓取 fetch 秒（不持锁）后在写锁内写入 write 秒"""
+    behaviour = {}
+
+    def install(method, fetch=0.0, write=0.0, fail=False, rows=1):
+        behaviour[method] = (fetch, write, fail, rows)
+
+        async def job(self):
+            fetch_seconds, write_seconds, should_fail, result = behaviour[method]
+            events.append(("fetch", method))
+            await asyncio.sleep(fetch_seconds)
+            async with self.write_lock():
+                events.append(("write", method))
+                await asyncio.sleep(write_seconds)
+            events.append(("done", method))
+            if should_fail:
+                raise RuntimeError("boom")
+            return result
+
+        monkeypatch.setattr(DataProcessor, method, job)
+
+    return install
+
+
+def orchestrator(db):
+    return JobOrchestrator(db.get_session, fake_clients())
+
+
+def job_runs(db):
+    with db.get_session() as session:
+        return [(row.job_name, row.status, row.rows) for row in session.query(JobRun).order_by(JobRun.id).all()]
+
+
+def test_write_lock_is_not_held_while_fetching(db, fake_jobs, events):
+    fake_jobs("update_top_project_token_holders", fetch=0.3)
+    fake_jobs("compact_price_history", write=0.01)
+    jobs = orchestrator(db)
+
+    async def scenario():
+        holders = asyncio.create_task(jobs.run("holders"))
+        await asyncio.sleep(0.05)
+        assert await jobs.run("price_history") == 1
+        # 持有者任务仍在抓取，压缩任务已完成写入
+        assert ("done", "update_top_project_token_holders") not in events
+        await holders
+
+    asyncio.run(scenario())
+
+
+def test_downstream_waits_for_running_upstream(db, fake_jobs, events):
+    fake_jobs("initialize_coins_data", fetch=0.1)
+    fake_jobs("update_exchange_data")
+    jobs = orchestrator(db)
+
+    async def scenario():
+        coins = asyncio.create_task(jobs.run("coins"))
+        await asyncio.sleep(0.01)
+        await jobs.run("exchange_pairs")
+        await coins
+
+    asyncio.run(scenario())
+    assert events.index(("done", "initialize_coins_data")) < events.index(("fetch", "update_exchange_data"))
+
+
+def test_downstream_skipped_after_failed_upstream(db, fake_jobs, events):
+    fake_jobs("initialize_coins_data", fail=True)
+    fake_jobs("update_exchange_data", rows=5)
+    jobs = orchestrator(db)
+
+    async def scenario():
+        assert await jobs.run("coins") is None
+        assert await jobs.run("exchange_pairs") is None
+        # 上游重试成功后下游恢复
+        fake_jobs("initialize_coins_data")
+        assert await jobs.run("coins") == 1
+        assert await jobs.run("exchange_pairs") == 5
+
+    asyncio.run(scenario())
+    assert job_runs(db) == [
+        ("coins", "failed", None),
+        ("exchange_pairs", "skipped", None),
+        ("coins", "success", 1),
+        ("exchange_pairs", "success", 5),
+    ]
+    assert [name for kind, name in events if kind == "fetch"].count("update_exchange_data") == 1
+
+
+def test_price_history_does_not_depend_on_price_jobs(db, fake_jobs):
+    fake_jobs("update_market_data", fail=True)
+    fake_jobs("compact_price_history", rows=3)
+    jobs = orchestrator(db)
+
+    async def scenario():
+        assert await jobs.run("market_data") is None
+        assert await jobs.run("price_history") == 3
+
+    asyncio.run(scenario())
+
+
+def test_job_session_releases_connection_while_fetching(db, now):
+    with db.get_session() as session:
+        session.add(Coin(id="bitcoin", symbol="BTC", name="Bitcoin", created_at=now, updated_at=now))
+        session.add(ExchangeSpot(coin_id="bitcoin", exchange_name="binance", spot_name="BTC/USDT", updated_at=now))
+        session.commit()
+    checked_out = []
+
+    class FakeCoinGecko:
+        async def fetch_simple_price(self, ids):
+            # 抓取期间任务的 Session 不应占用写连接
+            checked_out.append(db.engine.pool.checkedout())
+            await asyncio.sleep(0.01)
+            return {coin_id: SimpleNamespace(usd=100.0) for coin_id in ids}
+
+    jobs = JobOrchestrator(db.get_session, fake_clients(cg_crawler=FakeCoinGecko()))
+    assert asyncio.run(jobs.run("cg_prices")) == 1
+    assert checked_out == [0]
+    with db.get_session() as session:
+        assert session.query(SupplyInfo).filter(SupplyInfo.coin_id == "bitcoin").one().cached_price == 100.0
+
+
+def test_duplicate_run_is_skipped(db, fake_jobs):
+    fake_jobs("update_market_data", fetch=0.05)
+    jobs = orchestrator(db)
+
+    async def scenario():
+        return await asyncio.gather(jobs.run("market_data"), jobs.run("market_data"))
+
+    assert asyncio.run(scenario()) == [1, None]
+    assert job_runs(db) == [("market_data", "success", 1)]
+
+
+def test_waiting_writers_acquire_in_dependency_order(db, fake_jobs, events):
+    for method in ("initialize_coins_data", "update_exchange_data", "update_top_project_token_holders"):
+        fake_jobs(method)
+    jobs = orchestrator(db)
+    stream_lock = jobs.write_lock("price_stream")
+
+    async def scenario():
+        async with stream_lock():
+            # 写锁被占用时依次排队：持有者、币种列表、行情推送
+            tasks = [asyncio.create_task(jobs.run("holders"))]
+            await asyncio.sleep(0.01)
+            tasks.append(asyncio.create_task(jobs.run("coins")))
+            await asyncio.sleep(0.01)
+
+            async def stream_write():
+                async with stream_lock():
+                    events.append(("write", "price_stream"))
+
+            tasks.append(asyncio.create_task(stream_write()))
+            await asyncio.sleep(0.01)
+        await asyncio.gather(*tasks)
+
+    asyncio.run(scenario())
+    assert [name for kind, name in events if kind == "write"] == [
+        "price_stream", "initialize_coins_data", "update_top_project_token_holders"
+    ]
+
+
+def test_priority_lock_hands_over_after_cancelled_waiter():
+    async def scenario():
+        lock = PriorityLock()
+        await lock.acquire(0)
+        waiter = asyncio.create_task(lock.acquire(1))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.sleep(0)
+        lock.release()
+        assert not lock.locked()
+        await asyncio.wait_for(lock.acquire(2), timeout=1)
+        lock.release()
+
+    asyncio.run(scenario())
@@ -0,0 +1,27 @@
+from concurrent.futures import ThreadPoolExecutor
+import threading
+
+from sqlalchemy import text
+
+from app.database.models import Coin
+
+
+def test_writer_pool_serves_concurrent_writer_connections(db):
+    # 写锁持有者（线程中写入）、事件循环上的读查询、线程中重新加载交易对映射同时占用写连接
+    barrier = threading.Barrier(3, timeout=5)
+
+    def hold_connection():
+        with db.get_session() as session:
+            session.query(Coin.id).all()
+            barrier.wait()
+            return session.execute(text("SELECT 1")).scalar()
+
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        results = list(executor.map(lambda _: hold_connection(), range(3)))
+    assert results == [1, 1, 1]
+    assert db.engine.pool.checkedout() == 0
+
+
+def test_read_engine_is_query_only(db):
+    with db.get_read_session() as session:
+        assert session.execute(text("PRAGMA query_only")).scalar() == 1
@@ -0,0 +1,123 @@
+import asyncio
+
+import pytest
+
+from app.database.models import Coin, CoinHolding, Holder
+from app.database.query import AsyncCoinRepository, CoinRepository
+from app.graphql.loaders import GraphQLLoaders
+from app.graphql.pagination import decode_cursor, encode_cursor, page_size
+from main import schema
+
+# (id, usd_value)：30 的三条并列，两条为空
+HOLDINGS = [(1, 30.0), (2, 50.0), (3, None), (4, 30.0), (5, 10.0), (6, None), (7, 30.0)]
+EXPECTED = [2, 7, 4, 1, 5, 6, 3]
+
+
+@pytest.fixture
+def holdings(db, now):
+    with db.get_session() as session:
+        session.add_all([
+            Coin(id="bitcoin", symbol="BTC", name="Bitcoin", created_at=now, updated_at=now),
+            Coin(id="ethereum", symbol="ETH", name="Ethereum", created_at=now, updated_at=now),
+        ])
+        session.add_all(Holder(id=holding_id, address=f"0x{holding_id}", updated_at=now) for holding_id, _ in HOLDINGS)
+        session.commit()
+        session.add_all(
+            CoinHolding(id=holding_id, coin_id="bitcoin", holder_id=holding_id, usd_value=usd_value, updated_at=now)
+            for holding_id, usd_value in HOLDINGS
+        )
+        # 其他币种的持仓不应出现在按 coin_id 过滤的结果中
+        session.add(CoinHolding(id=8, coin_id="ethereum", holder_id=1, usd_value=40.0, updated_at=now))
+        session.commit()
+
+
+def walk(repository, first, **filters):
+    """逐页读取，返回每页的 id 列表"""
+    pages, after = [], None
+    while True:
+        rows = repository.get_coin_holdings_page(first, after, **filters)
+        page = rows[:first]
+        pages.append([row.id for row in page])
+        if len(rows) <= first:
+            return pages
+        after = decode_cursor(encode_cursor((page[-1].usd_value, page[-1].id)), 2)
+
+
+@pytest.mark.parametrize("first", [1, 2, 3, 4, 5, 7, 10])
+def test_holdings_pages_cover_every_row_once(db, holdings, first):
+    with db.get_read_session() as session:
+        pages = walk(CoinRepository(session), first, coin_id="bitcoin")
+    assert [holding_id for page in pages for holding_id in page] == EXPECTED
+    assert all(len(page) == first for page in pages[:-1])
+
+
+def test_page_boundary_between_valued_and_null_segments(db, holdings):
+    with db.get_read_session() as session:
+        repository = CoinRepository(session)
+        # 最后一个有价值的持仓之后，下一页只剩为空的段
+        assert [row.id for row in repository.get_coin_holdings_page(2, (10.0, 5), coin_id="bitcoin")] == [6, 3]
+        # 游标落在为空的段内
+        assert [row.id for row in repository.get_coin_holdings_page(2, (None, 6), coin_id="bitcoin")] == [3]
+        # 并列的 usd_value 按 id 降序继续
+        assert [row.id for row in repository.get_coin_holdings_page(2, (30.0, 7), coin_id="bitcoin")] == [4, 1, 5]
+        # 一页跨越两段：多取的一行来自为空的段
+        assert [row.id for row in repository.get_coin_holdings_page(2, (30.0, 1), coin_id="bitcoin")] == [5, 6, 3]
+
+
+def test_async_repository_pages_match(db, holdings):
+    async def walk_async():
+        async with db.get_async_session() as session:
+            repository = AsyncCoinRepository(session)
+            ids, after = [], None
+            while True:
+                rows = await repository.get_coin_holdings_page(3, after, coin_id="bitcoin")
+                ids.extend(row.id for row in rows[:3])
+                if len(rows) <= 3:
+                    return ids
+                after = (rows[2].usd_value, rows[2].id)
+
+    assert asyncio.run(walk_async()) == EXPECTED
+
+
+def test_holders_connection_walks_all_pages(db, holdings):
+    query = """
+        query($after: String) {
+            holdersConnection(coinId: "bitcoin", first: 3, after: $after) {
+                edges { cursor node { id } }
+                pageInfo { hasNextPage hasPreviousPage endCursor }
+            }
+        }
+    """
+
+    async def execute(after):
+        context = {"session_factory": db.get_async_session, "loaders": GraphQLLoaders(db.get_async_session)}
+        result = await schema.execute(query, variable_values={"after": after}, context_value=context)
+        assert result.errors is None
+        return result.data["holdersConnection"]
+
+    ids, after, pages = [], None, []
+    while True:
+        connection = asyncio.run(execute(after))
+        pages.append(connection["pageInfo"])
+        ids.extend(edge["node"]["id"] for edge in connection["edges"])
+        if not connection["pageInfo"]["hasNextPage"]:
+            break
+        after = connection["pageInfo"]["endCursor"]
+        assert after == connection["edges"][-1]["cursor"]
+
+    assert ids == EXPECTED
+    assert [page["hasPreviousPage"] for page in pages] == [False, True, True]
+    assert decode_cursor(pages[-1]["endCursor"], 2) == (None, 3)
+
+
+def test_cursor_round_trip_and_validation():
+    assert decode_cursor(encode_cursor((30.5, 7)), 2) == (30.5, 7)
+    assert decode_cursor(encode_cursor((None, 3)), 2) == (None, 3)
+    assert decode_cursor(encode_cursor(("bitcoin",)), 1) == ("bitcoin",)
+    assert decode_cursor(None, 2) is None
+    with pytest.raises(ValueError):
+        decode_cursor(encode_cursor((1,)), 2)
+    with pytest.raises(ValueError):
+        decode_cursor("not-a-cursor!", 1)
+    with pytest.raises(ValueError):
+        page_size(0)
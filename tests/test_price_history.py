@@ -0,0 +1,141 @@
+import numpy as np
+import pytest
+
+from app.config import settings
+from app.database.models import PriceBar, PriceHistoryWatermark, PricePoint, SupplyInfo
+from app.database.price_history import PriceHistoryCompactor, rollup
+
+# 某天 00:00 UTC
+DAY = 1_699_920_000
+
+
+def raw_columns(*points):
+    """points: (coin_key, ts, price, market_cap)，组装为 rollup 的原始点输入"""
+    coin_key, ts, price, market_cap = (np.asarray(column) for column in zip(*points))
+    price = price.astype(np.float64)
+    return (
+        coin_key.astype(np.int64), ts.astype(np.int64), price, price, price, price,
+        market_cap.astype(np.float64), np.ones(len(points), dtype=np.int64),
+    )
+
+
+def test_rollup_buckets_and_ohlc_ordering():
+    bars = rollup(*raw_columns(
+        # 乱序输入：开盘/收盘按时间而不是输入顺序
+        (1, DAY + 50, 12.0, np.nan),
+        (1, DAY + 0, 10.0, 100.0),
+        (1, DAY + 59, 11.0, np.nan),
+        (1, DAY + 20, 15.0, 101.0),
+        # 60 秒整属于下一个桶
+        (1, DAY + 60, 9.0, np.nan),
+        (2, DAY + 30, 1.0, np.nan),
+    ), 60)
+
+    assert bars["coin_key"].tolist() == [1, 1, 2]
+    assert bars["bucket_start"].tolist() == [DAY, DAY + 60, DAY]
+    assert bars["open"].tolist() == [10.0, 9.0, 1.0]
+    assert bars["close"].tolist() == [11.0, 9.0, 1.0]
+    assert bars["high"].tolist() == [15.0, 9.0, 1.0]
+    assert bars["low"].tolist() == [10.0, 9.0, 1.0]
+    assert bars["points"].tolist() == [4, 1, 1]
+    # 市值取桶内最晚的非空值，桶内全部为空时为 NaN
+    assert bars["market_cap"][0] == 101.0
+    assert np.isnan(bars["market_cap"][1:]).all()
+
+
+def test_rollup_of_bars_keeps_extremes_and_point_counts():
+    coin_key = np.array([1, 1, 1])
+    bucket_start = np.array([DAY + 3600, DAY, DAY + 60])
+    bars = rollup(
+        coin_key, bucket_start,
+        np.array([7.0, 5.0, 6.0]), np.array([9.0, 8.0, 20.0]), np.array([7.0, 1.0, 4.0]), np.array([8.0, 6.0, 7.0]),
+        np.array([3.0, 1.0, 2.0]), np.array([10, 4, 6]), 3600,
+    )
+    assert bars["bucket_start"].tolist() == [DAY, DAY + 3600]
+    assert bars["open"].tolist() == [5.0, 7.0]
+    assert bars["close"].tolist() == [7.0, 8.0]
+    assert bars["high"].tolist() == [20.0, 9.0]
+    assert bars["low"].tolist() == [1.0, 7.0]
+    assert bars["market_cap"].tolist() == [2.0, 3.0]
+    assert bars["points"].tolist() == [10, 10]
+
+
+@pytest.fixture
+def coin_key(db, now):
+    with db.get_session() as session:
+        supply_info = SupplyInfo(coin_id="bitcoin", updated_at=now)
+        session.add(supply_info)
+        session.commit()
+        return supply_info.id
+
+
+def add_points(db, coin_key, *points):
+    with db.get_session() as session:
+        session.add_all(PricePoint(coin_key=coin_key, ts=ts, price=price) for ts, price in points)
+        session.commit()
+
+
+def bars(db, interval_seconds):
+    with db.get_session() as session:
+        return [
+            (bar.bucket_start - DAY, bar.open, bar.high, bar.low, bar.close, bar.points)
+            for bar in session.query(PriceBar).filter(PriceBar.interval_seconds == interval_seconds).order_by(PriceBar.bucket_start)
+        ]
+
+
+def test_compactor_builds_each_interval_and_watermarks(db, coin_key):
+    add_points(db, coin_key, (DAY + 10, 1.0), (DAY + 70, 3.0), (DAY + 3700, 2.0))
+    compactor = PriceHistoryCompactor(db.get_session)
+    result = compactor.run(now=DAY + 3720)
+
+    assert result["bars_60"] == 3
+    assert bars(db, 60) == [(0, 1.0, 1.0, 1.0, 1.0, 1), (60, 3.0, 3.0, 3.0, 3.0, 1), (3660, 2.0, 2.0, 2.0, 2.0, 1)]
+    assert bars(db, 3600) == [(0, 1.0, 3.0, 1.0, 3.0, 2), (3600, 2.0, 2.0, 2.0, 2.0, 1)]
+    assert bars(db, 86400) == [(0, 1.0, 3.0, 1.0, 2.0, 3)]
+    with db.get_session() as session:
+        watermarks = {row.interval_seconds: row.compacted_until - DAY for row in session.query(PriceHistoryWatermark)}
+    assert watermarks == {60: 3720, 3600: 3600, 86400: 0}
+
+
+def test_rerun_recomputes_open_buckets_from_watermark(db, coin_key):
+    compactor = PriceHistoryCompactor(db.get_session)
+    add_points(db, coin_key, (DAY + 10, 1.0), (DAY + 3610, 5.0))
+    compactor.run(now=DAY + 3620)
+
+    # 上次运行时尚未结束的桶收到新的价格点，之前的桶不受影响
+    add_points(db, coin_key, (DAY + 3650, 7.0), (DAY + 3700, 4.0))
+    compactor.run(now=DAY + 3720)
+    assert bars(db, 60) == [(0, 1.0, 1.0, 1.0, 1.0, 1), (3600, 5.0, 7.0, 5.0, 7.0, 2), (3660, 4.0, 4.0, 4.0, 4.0, 1)]
+    assert bars(db, 3600) == [(0, 1.0, 1.0, 1.0, 1.0, 1), (3600, 5.0, 7.0, 4.0, 4.0, 3)]
+    assert bars(db, 86400) == [(0, 1.0, 7.0, 1.0, 4.0, 4)]
+
+    # 没有新数据时重复运行结果不变
+    compactor.run(now=DAY + 3720)
+    assert bars(db, 86400) == [(0, 1.0, 7.0, 1.0, 4.0, 4)]
+
+
+def test_rerun_does_not_reread_buckets_before_watermark(db, coin_key):
+    compactor = PriceHistoryCompactor(db.get_session)
+    add_points(db, coin_key, (DAY + 10, 1.0))
+    compactor.run(now=DAY + 600)
+    # 水位之前的迟到数据不会被重算
+    add_points(db, coin_key, (DAY + 20, 100.0))
+    compactor.run(now=DAY + 660)
+    assert bars(db, 60)[0] == (0, 1.0, 1.0, 1.0, 1.0, 1)
+
+
+def test_retention_deletes_expired_points_and_bars(db, coin_key, monkeypatch):
+    monkeypatch.setattr(settings, "PRICE_HISTORY_RAW_RETENTION_DAYS", 1)
+    monkeypatch.setattr(settings, "PRICE_HISTORY_1M_RETENTION_DAYS", 2)
+    monkeypatch.setattr(settings, "PRICE_HISTORY_1H_RETENTION_DAYS", 3)
+    monkeypatch.setattr(settings, "PRICE_HISTORY_1D_RETENTION_DAYS", 0)
+    add_points(db, coin_key, (DAY, 1.0), (DAY + 86400 * 2, 2.0), (DAY + 86400 * 3, 3.0))
+    compactor = PriceHistoryCompactor(db.get_session)
+    compactor.run(now=DAY + 86400 * 3 + 60)
+
+    with db.get_session() as session:
+        assert [point.ts - DAY for point in session.query(PricePoint).order_by(PricePoint.ts)] == [86400 * 3]
+    assert [bar[0] for bar in bars(db, 60)] == [86400 * 2, 86400 * 3]
+    assert [bar[0] for bar in bars(db, 3600)] == [86400 * 2, 86400 * 3]
+    # 0 表示永久保留
+    assert [bar[0] for bar in bars(db, 86400)] == [0, 86400 * 2, 86400 * 3]
@@ -0,0 +1,120 @@
+import asyncio
+import time
+
+import pytest
+
+from app.config import settings
+from app.database.jobs import JobOrchestrator
+from app.database.models import Coin, SupplyInfo, VenuePrice
+from app.database.price_stream import PriceStreamer
+from app.database.ticker_matcher import TickerMatcher
+from tests.conftest import fake_clients
+
+
+def matcher():
+    matcher = TickerMatcher(None)
+    matcher.coin_ids = ["bitcoin", "ethereum"]
+    matcher.pair_to_index = {
+        ("binance", "BTC/USDT"): 0, ("okex", "BTC/USDT"): 0, ("binance_futures", "BTC/USDT"): 0,
+        ("binance", "ETH/USDT"): 1,
+    }
+    return matcher
+
+
+@pytest.fixture
+def streamer(db, now):
+    with db.get_session() as session:
+        session.add_all([
+            Coin(id="bitcoin", symbol="BTC", name="Bitcoin", created_at=now, updated_at=now),
+            Coin(id="ethereum", symbol="ETH", name="Ethereum", created_at=now, updated_at=now),
+        ])
+        session.commit()
+    return PriceStreamer(session_factory=db.get_session, clients=fake_clients())
+
+
+def test_updates_are_merged_to_latest_ticker_per_pair(streamer, monkeypatch):
+    monkeypatch.setattr(settings, "PRICE_STREAM_USE_MID", False)
+    streamer._on_tickers(matcher(), "binance", {"BTC/USDT": {"last": 100.0, "quoteVolume": 10.0}})
+    streamer._on_tickers(matcher(), "binance", {
+        "BTC/USDT": {"last": 101.0, "quoteVolume": 20.0},
+        "BTC/BTC": {"last": 1.0},
+        "DOGE/USDT": {"last": 0.1},
+    })
+    streamer._on_tickers(matcher(), "okx", {"BTC/USDT": {"last": 103.0, "quoteVolume": 20.0}})
+
+    assert streamer.metrics.updates == 3
+    assert streamer._dirty == {"bitcoin"}
+    venues = streamer._venues["bitcoin"]
+    assert {key: value[:2] for key, value in venues.items()} == {
+        ("binance", "BTC/USDT"): (101.0, 20.0),
+        ("okx", "BTC/USDT"): (103.0, 20.0),
+    }
+
+
+def test_flush_writes_aggregated_prices_and_venues(streamer, db, monkeypatch):
+    monkeypatch.setattr(settings, "PRICE_STREAM_USE_MID", True)
+    streamer._on_tickers(matcher(), "binance", {
+        "BTC/USDT": {"last": 99.0, "bid": 100.0, "ask": 102.0, "quoteVolume": 10.0},
+        "BTC/USDT:USDT": {"last": 104.0, "quoteVolume": 30.0},
+        "ETH/USDT": {"last": 10.0, "quoteVolume": 5.0},
+    })
+    streamer._on_tickers(matcher(), "okx", {"BTC/USDT": {"last": 1000.0, "quoteVolume": 1e9}})
+
+    written = asyncio.run(streamer.flush())
+
+    assert written == 2
+    assert streamer._dirty == set()
+    with db.get_session() as session:
+        prices = dict(session.query(SupplyInfo.coin_id, SupplyInfo.cached_price).all())
+        venues = {
+            (row.exchange_name, row.market_type, row.coin_id): (row.pair_name, row.price, row.bid, row.ask)
+            for row in session.query(VenuePrice).all()
+        }
+    # 偏离中位数的 okx 行情被剔除，其余按成交额加权：(101 * 10 + 104 * 30) / 40
+    assert prices["bitcoin"] == pytest.approx(103.25)
+    assert prices["ethereum"] == pytest.approx(10.0)
+    assert venues[("binance", "spot", "bitcoin")] == ("BTC/USDT", 101.0, 100.0, 102.0)
+    assert venues[("binance_futures", "swap", "bitcoin")][:2] == ("BTC/USDT", 104.0)
+    assert venues[("okex", "spot", "bitcoin")][1] == 1000.0
+    assert streamer.metrics.flushes == 1
+    assert asyncio.run(streamer.flush()) == 0
+
+
+def test_stale_pairs_are_dropped(streamer, monkeypatch):
+    streamer._on_tickers(matcher(), "binance", {"BTC/USDT": {"last": 100.0, "quoteVolume": 10.0}})
+    key = ("binance", "BTC/USDT")
+    price, volume, bid, ask, _ = streamer._venues["bitcoin"][key]
+    streamer._venues["bitcoin"][key] = (price, volume, bid, ask, time.monotonic() - settings.PRICE_STREAM_STALE_SECONDS - 1)
+
+    assert asyncio.run(streamer.flush()) == 0
+    assert "bitcoin" not in streamer._venues
+
+
+def test_failed_write_keeps_coins_pending(streamer):
+    streamer._on_tickers(matcher(), "binance", {"BTC/USDT": {"last": 100.0, "quoteVolume": 10.0}})
+
+    def broken_session():
+        raise RuntimeError("database unavailable")
+
+    streamer.session_factory = broken_session
+    with pytest.raises(RuntimeError):
+        asyncio.run(streamer.flush())
+    assert streamer._dirty == {"bitcoin"}
+
+
+def test_flush_waits_for_orchestrator_write_lock(streamer, db):
+    jobs = JobOrchestrator(db.get_session, fake_clients())
+    streamer.write_lock = jobs.write_lock("price_stream")
+    streamer._on_tickers(matcher(), "binance", {"BTC/USDT": {"last": 100.0, "quoteVolume": 10.0}})
+    order = []
+
+    async def scenario():
+        async with jobs.write_lock("market_data")():
+            flush = asyncio.create_task(streamer.flush())
+            await asyncio.sleep(0.05)
+            assert not flush.done()
+            order.append("job write")
+        order.append(await flush)
+
+    asyncio.run(scenario())
+    assert order == ["job write", 1]
@@ -0,0 +1,97 @@
+import asyncio
+
+from fastapi.testclient import TestClient
+
+from app.blueprints.coins import get_db_session
+from app.database.fts import refresh_coin_search
+from app.database.models import Coin, ExchangeSpot
+from app.database.query import AsyncCoinRepository, CoinRepository
+from app.graphql.loaders import GraphQLLoaders
+from main import app, schema
+
+
+def seed(db, now):
+    with db.get_session() as session:
+        session.add_all([
+            Coin(id="bitcoin", symbol="BTC", name="Bitcoin", created_at=now, updated_at=now),
+            Coin(id="ethereum", symbol="ETH", name="Ethereum", created_at=now, updated_at=now),
+        ])
+        session.add_all([
+            ExchangeSpot(coin_id="bitcoin", exchange_name="binance", spot_name="BTC/USDT", updated_at=now),
+            ExchangeSpot(coin_id="ethereum", exchange_name="okex", spot_name="ETH/USDT", updated_at=now),
+        ])
+        session.commit()
+
+
+def test_repository_filters_accept_positional_arguments(db, now):
+    seed(db, now)
+    with db.get_read_session() as session:
+        repository = CoinRepository(session)
+        assert [coin.id for coin in repository.get_coins_with_filters("bitcoin")] == ["bitcoin"]
+        assert [coin.id for coin in repository.get_coins_with_filters(None, "ETH")] == ["ethereum"]
+        assert len(repository.get_coins_with_filters(None, None, None, None, 1, 0)) == 1
+        spots = repository.get_exchange_spots_with_filters(None, "okex", 10, 0)
+        assert [spot.spot_name for spot in spots] == ["ETH/USDT"]
+        assert spots[0].coin.id == "ethereum"
+        assert repository.get_holder_with_filters("0xmissing", None) is None
+
+
+def test_async_repository_filters_accept_positional_arguments(db, now):
+    seed(db, now)
+
+    async def query():
+        async with db.get_async_session() as session:
+            repository = AsyncCoinRepository(session)
+            coins = await repository.get_coins_with_filters("bitcoin", with_relations=False)
+            spots = await repository.get_exchange_spots_with_filters(None, "binance", 10, 0, False)
+            return [coin.id for coin in coins], [spot.spot_name for spot in spots]
+
+    assert asyncio.run(query()) == (["bitcoin"], ["BTC/USDT"])
+
+
+def test_coin_routes_use_read_only_service(db, now):
+    seed(db, now)
+    with db.get_session() as session:
+        refresh_coin_search(session)
+
+    def read_session():
+        with db.get_read_session() as session:
+            yield session
+
+    app.dependency_overrides[get_db_session] = read_session
+    try:
+        client = TestClient(app)
+        with db.get_read_session() as session:
+            spot_id = session.query(ExchangeSpot.id).filter(ExchangeSpot.spot_name == "BTC/USDT").scalar()
+        response = client.get(f"/exchange_spots/{spot_id}")
+        assert response.status_code == 200
+        assert response.json()["spot_name"] == "BTC/USDT"
+        assert response.json()["coin"]["symbol"] == "BTC"
+        assert client.get("/exchange_spots/0").status_code == 404
+        assert client.get("/coins/ethereum").json()["name"] == "Ethereum"
+        assert client.get("/coins/missing").status_code == 404
+        assert [coin["id"] for coin in client.get("/coins/search", params={"q": "bitc"}).json()] == ["bitcoin"]
+        assert client.get("/coins/search", params={"q": "btc", "limit": 0}).status_code == 422
+    finally:
+        app.dependency_overrides.clear()
+
+
+def test_graphql_exchange_spot_and_search(db, now):
+    seed(db, now)
+    with db.get_session() as session:
+        refresh_coin_search(session)
+        spot_id = session.query(ExchangeSpot.id).filter(ExchangeSpot.spot_name == "ETH/USDT").scalar()
+
+    async def execute():
+        context = {"session_factory": db.get_async_session, "loaders": GraphQLLoaders(db.get_async_session)}
+        return await schema.execute(
+            "query($id: Int!) { exchangeSpot(id: $id) { spotName coin { id } } searchCoins(term: \"eth usdt\") { id } }",
+            variable_values={"id": spot_id}, context_value=context
+        )
+
+    result = asyncio.run(execute())
+    assert result.errors is None
+    assert result.data == {
+        "exchangeSpot": {"spotName": "ETH/USDT", "coin": {"id": "ethereum"}},
+        "searchCoins": [{"id": "ethereum"}],
+    }
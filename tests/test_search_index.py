@@ -0,0 +1,100 @@
+from app.database.models import Coin, ExchangeSpot, OnChainInfo, SupplyInfo
+from app.search_index import QuickSearchIndex
+
+
+def seed(db, now, coins, spots=(), contracts=()):
+    """coins: (coin_id, symbol, name, market_cap)"""
+    with db.get_session() as session:
+        for coin_id, symbol, name, market_cap in coins:
+            session.add(Coin(id=coin_id, symbol=symbol, name=name, created_at=now, updated_at=now))
+            if market_cap is not None:
+                session.add(SupplyInfo(coin_id=coin_id, market_cap=market_cap, updated_at=now))
+        for coin_id, exchange_name, spot_name in spots:
+            session.add(ExchangeSpot(coin_id=coin_id, exchange_name=exchange_name, spot_name=spot_name, updated_at=now))
+        for coin_id, chain_name, contract_address in contracts:
+            session.add(OnChainInfo(coin_id=coin_id, chain_name=chain_name, contract_address=contract_address, updated_at=now))
+        session.commit()
+
+
+def rebuilt(db) -> QuickSearchIndex:
+    index = QuickSearchIndex()
+    with db.get_read_session() as session:
+        index.rebuild(session)
+    return index
+
+
+def ids(entries):
+    return [entry.coin_id for entry in entries]
+
+
+def test_prefix_matches_symbol_name_words_pairs_and_contracts(db, now):
+    seed(
+        db, now,
+        [("bitcoin", "BTC", "Bitcoin", 100.0), ("shiba", "SHIB", "Shiba Inu", 10.0), ("usdc", "USDC", "USD Coin", 50.0)],
+        spots=[("shiba", "binance", "SHIB/USDT")],
+        contracts=[("usdc", "ethereum", "0xA0b86991")],
+    )
+    index = rebuilt(db)
+
+    assert ids(index.search("bitc")) == ["bitcoin"]
+    # 名称中的单词
+    assert ids(index.search("inu")) == ["shiba"]
+    # 交易对与合约地址（大小写不敏感）
+    assert ids(index.search("shib/us")) == ["shiba"]
+    assert ids(index.search("0xa0B8")) == ["usdc"]
+    # 区间上下界：前缀之后的相邻词不匹配
+    assert ids(index.search("bitcoinx")) == []
+    assert ids(index.search("  ")) == []
+    assert index.search("c", limit=1)[0].coin_id == "usdc"
+
+
+def test_ranking_by_market_cap_with_exact_symbol_first(db, now):
+    seed(db, now, [
+        ("ethereum", "ETH", "Ethereum", 300.0),
+        ("ethena", "ENA", "Ethena", 20.0),
+        ("ether-fi", "ETHFI", "ether.fi", None),
+        ("eth-clone", "ETHC", "Eth Clone", 1.0),
+    ])
+    index = rebuilt(db)
+
+    # 市值降序，无市值的排在最后
+    assert ids(index.search("eth")) == ["ethereum", "ethena", "eth-clone", "ether-fi"]
+    assert ids(index.search("eth", limit=2)) == ["ethereum", "ethena"]
+    # symbol 完全匹配的排在最前，即使市值更低
+    assert ids(index.search("ethc")) == ["eth-clone"]
+    assert ids(index.search("en")) == ["ethena"]
+    index.update_market_caps({"eth-clone": 1000.0})
+    assert ids(index.search("e"))[:2] == ["eth-clone", "ethereum"]
+
+
+def test_short_prefix_cache_follows_incremental_updates(db, now):
+    seed(db, now, [("solana", "SOL", "Solana", 80.0)])
+    index = rebuilt(db)
+    assert ids(index.search("so")) == ["solana"]
+    assert "so" in index._state.prefix_cache
+
+    index.upsert_coins([("solv", "SOLV", "Solv Protocol")])
+    index.update_market_caps({"solv": 90.0})
+    assert ids(index.search("so")) == ["solv", "solana"]
+
+    index.add_sources([(("exchange_spots", "okex", "SOON/USDT"), "solana", "SOON/USDT")])
+    assert ids(index.search("soo")) == ["solana"]
+    index.remove_sources([("exchange_spots", "okex", "SOON/USDT")])
+    assert ids(index.search("soo")) == []
+    assert "soon/usdt" not in index._state.terms
+
+
+def test_rebuild_replaces_cached_prefixes(db, now):
+    seed(db, now, [("dogecoin", "DOGE", "Dogecoin", 20.0)])
+    index = QuickSearchIndex()
+    with db.get_read_session() as session:
+        index.rebuild(session)
+    assert ids(index.search("d")) == ["dogecoin"]
+    assert index._state.prefix_cache["d"] == ["dogecoin"]
+
+    seed(db, now, [("dai", "DAI", "Dai", 30.0)])
+    with db.get_read_session() as session:
+        index.rebuild(session)
+    assert ids(index.search("d")) == ["dai", "dogecoin"]
+    assert ids(index.search("do")) == ["dogecoin"]
+    assert index.stats()["coins"] == 2
@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+
+from app.database.ticker_matcher import TickerColumns, TickerMatcher, aggregate_prices, parse_symbol, ticker_values
+
+
+def columns(*rows):
+    """rows: (币种下标, 价格, 成交额)"""
+    coin_index, price, volume = zip(*rows) if rows else ((), (), ())
+    return TickerColumns(
+        np.asarray(coin_index, dtype=np.int64), np.asarray(price, dtype=np.float64), np.asarray(volume, dtype=np.float64)
+    )
+
+
+def aggregate(*rows, max_deviation=0.1):
+    coins, prices = aggregate_prices(columns(*rows), max_deviation)
+    return dict(zip(coins.tolist(), prices.tolist()))
+
+
+def test_outliers_are_rejected_before_vwap():
+    result = aggregate(
+        (0, 100.0, 10.0), (0, 102.0, 30.0), (0, 101.0, 0.0),
+        # 偏离中位数超过 10%，成交额再大也不参与
+        (0, 150.0, 1e9), (0, 50.0, 1e9),
+    )
+    assert result[0] == pytest.approx((100.0 * 10 + 102.0 * 30) / 40)
+
+
+def test_median_with_even_number_of_venues():
+    # 中位数为 (100 + 110) / 2 = 105，两条都在 10% 以内
+    assert aggregate((0, 100.0, 1.0), (0, 110.0, 3.0))[0] == pytest.approx(107.5)
+    # 收紧阈值后两条都被剔除，回退为中位数
+    assert aggregate((0, 100.0, 1.0), (0, 110.0, 3.0), max_deviation=0.01)[0] == pytest.approx(105.0)
+
+
+def test_zero_and_invalid_volume_falls_back_to_median():
+    result = aggregate((0, 10.0, 0.0), (0, 11.0, np.nan), (0, 10.5, -5.0))
+    assert result[0] == pytest.approx(10.5)
+
+
+def test_single_venue_and_multiple_coins():
+    result = aggregate((3, 42.0, 0.0), (1, 2.0, 5.0), (1, 4.0, 5.0), (1, 3.0, 5.0))
+    assert result == {1: pytest.approx(3.0), 3: pytest.approx(42.0)}
+
+
+def test_invalid_prices_are_dropped():
+    assert aggregate((0, 0.0, 10.0), (0, np.nan, 10.0), (1, np.inf, 1.0), (2, 5.0, 1.0)) == {2: pytest.approx(5.0)}
+    coins, prices = aggregate_prices(columns(), 0.1)
+    assert len(coins) == 0 and len(prices) == 0
+
+
+def test_normalize_matches_pairs_and_collects_venue_rows():
+    matcher = TickerMatcher(None)
+    matcher.coin_ids = ["bitcoin"]
+    matcher.pair_to_index = {("binance", "BTC/USDT"): 0, ("binance", "BTC/USDC"): 0, ("binance_futures", "BTC/USDT"): 0}
+    venue_rows = {}
+    result = matcher.normalize("binance", {
+        "BTC/USDT": {"last": 100.0, "quoteVolume": 10.0, "bid": 99.0, "ask": 101.0},
+        "BTC/USDC": {"last": 100.5, "quoteVolume": 20.0},
+        "BTC/USDT:USDT": {"last": 101.0, "baseVolume": 2.0},
+        "BTC/EUR": {"last": 90.0, "quoteVolume": 1.0},
+        "ETH/USDT": {"last": 5.0, "quoteVolume": 1.0},
+    }, venue_rows=venue_rows)
+
+    assert result.coin_index.tolist() == [0, 0, 0]
+    assert result.price.tolist() == [100.0, 100.5, 101.0]
+    # 没有 quoteVolume 时按 baseVolume * 价格
+    assert result.volume.tolist() == [10.0, 20.0, 202.0]
+    # 同一市场保留成交额最大的交易对
+    assert venue_rows[("binance", "spot", "bitcoin")]["pair_name"] == "BTC/USDC"
+    assert venue_rows[("binance_futures", "swap", "bitcoin")]["volume"] == 202.0
+
+
+def test_ticker_values_and_symbol_parsing():
+    assert ticker_values({"bid": 9.0, "ask": 11.0, "last": 12.0, "quoteVolume": 1.0}, use_mid=True) == (10.0, 1.0)
+    assert ticker_values({"bid": 9.0, "last": 12.0, "quoteVolume": 1.0}, use_mid=True) == (12.0, 1.0)
+    assert ticker_values({"last": None, "close": None}) is None
+    assert parse_symbol("okx", "ETH/USDT:USDT") == ("okex_swap", "swap", "ETH/USDT")
+    assert parse_symbol("okx", "ETH/BTC") is None
+    assert parse_symbol("unknown", "ETH/USDT") is None